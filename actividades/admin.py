@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Actividad
+from .models import Actividad, EjecucionODS
+
+
+class EjecucionODSInline(admin.TabularInline):
+    model = EjecucionODS
+    extra = 0
 
 
 @admin.register(Actividad)
@@ -9,3 +14,4 @@ class ActividadAdmin(admin.ModelAdmin):
     search_fields = ('descripcion',)
     list_editable = ('estado', 'avance')
     ordering = ('proyecto', 'fecha_programada')
+    inlines = [EjecucionODSInline]
@@ -0,0 +1,83 @@
+import time
+from dataclasses import dataclass, asdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from edp_project.transacciones import al_confirmar
+from .models import Actividad
+
+# La versión forma parte de la clave: subirla deja obsoletas las estadísticas guardadas
+CLAVE_VERSION = 'actividades:estadisticas:version'
+
+
+@dataclass(frozen=True)
+class EstadisticasActividades:
+    """Conteos globales de actividades por estado y avance promedio."""
+    total: int = 0
+    completadas: int = 0
+    en_ejecucion: int = 0
+    pendientes: int = 0
+    atrasadas: int = 0
+    avance_promedio: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _version() -> int:
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Partir del reloj y no de 1: si la caché perdió solo la versión, no se
+        # reutilizan estadísticas guardadas con una versión anterior
+        cache.add(CLAVE_VERSION, time.time_ns(), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def calcular() -> EstadisticasActividades:
+    """Estadísticas con una sola consulta GROUP BY estado."""
+    por_estado = {
+        fila['estado']: fila
+        for fila in Actividad.objects.order_by().values('estado').annotate(n=Count('id'), avance=Sum('avance'))
+    }
+    total = sum(fila['n'] for fila in por_estado.values())
+    suma_avance = sum(fila['avance'] or 0 for fila in por_estado.values())
+
+    def conteo(estado):
+        return por_estado.get(estado, {}).get('n', 0)
+
+    return EstadisticasActividades(
+        total=total,
+        completadas=conteo('completada'),
+        en_ejecucion=conteo('en_ejecucion'),
+        pendientes=conteo('pendiente'),
+        atrasadas=conteo('atrasada'),
+        avance_promedio=round(float(suma_avance) / total, 2) if total else 0.0,
+    )
+
+
+def estadisticas_globales() -> EstadisticasActividades:
+    """Estadísticas desde la caché; se recalculan solo si cambió la versión o venció el plazo."""
+    clave = f'actividades:estadisticas:{_version()}'
+    estadisticas = cache.get(clave)
+    if estadisticas is None:
+        estadisticas = calcular()
+        cache.set(clave, estadisticas, settings.EDP_ESTADISTICAS_TIMEOUT)
+    return estadisticas
+
+
+def _subir_version() -> None:
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:  # la versión no estaba en la caché
+        _version()
+
+
+def invalidar() -> None:
+    """
+    Deja obsoletas las estadísticas. Dentro de una transacción la versión se
+    sube una sola vez al confirmarla (no antes, o una lectura concurrente
+    guardaría los datos viejos con la versión nueva), aunque se borren miles
+    de actividades en cascada.
+    """
+    al_confirmar(CLAVE_VERSION, lambda: _subir_version)
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actividades', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actividad',
+            name='huella',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['proyecto', 'item'], name='actividad_proyecto_item_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:36
+
+from decimal import Decimal, InvalidOperation
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Etiquetas con que importar_edp_completo guardaba la partida en observaciones
+ETIQUETAS = {'Unidad': 'unidad', 'Cantidad': 'cantidad', 'PU': 'precio_unitario', 'Total': 'cantidad_ejecutada'}
+# Máximo que admite cada columna decimal (max_digits - decimal_places dígitos enteros)
+LIMITES = {'cantidad': Decimal(10) ** 10, 'precio_unitario': Decimal(10) ** 14, 'cantidad_ejecutada': Decimal(10) ** 10}
+
+
+def _partida(observaciones):
+    """Campos de 'Unidad: m2 | Cantidad: 10.0 | ...', o None si el texto no es solo eso."""
+    campos = {}
+    for parte in observaciones.split(' | '):
+        etiqueta, separador, valor = parte.partition(': ')
+        if not separador or etiqueta not in ETIQUETAS:
+            return None
+        if etiqueta == 'Unidad':
+            campos['unidad'] = valor[:20]
+            continue
+        try:
+            numero = Decimal(valor)
+        except InvalidOperation:
+            return None
+        if not numero.is_finite() or abs(numero) >= LIMITES[ETIQUETAS[etiqueta]]:
+            return None
+        campos[ETIQUETAS[etiqueta]] = numero
+    return campos
+
+
+def separar_observaciones(apps, schema_editor):
+    Actividad = apps.get_model('actividades', 'Actividad')
+    campos = ['unidad', 'cantidad', 'precio_unitario', 'cantidad_ejecutada', 'observaciones']
+    pendientes = []
+    filas = Actividad.objects.filter(observaciones__regex=r'^(Unidad|Cantidad|PU|Total): ').only('id', 'observaciones')
+    for actividad in filas.iterator(chunk_size=2000):
+        partida = _partida(actividad.observaciones)
+        if partida is None:
+            continue
+        for campo, valor in partida.items():
+            setattr(actividad, campo, valor)
+        actividad.observaciones = ''
+        pendientes.append(actividad)
+        if len(pendientes) >= 1000:
+            Actividad.objects.bulk_update(pendientes, campos)
+            pendientes = []
+    Actividad.objects.bulk_update(pendientes, campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actividades', '0004_actividad_huella'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actividad',
+            name='cantidad',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='actividad',
+            name='cantidad_ejecutada',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='actividad',
+            name='precio_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='actividad',
+            name='unidad',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='EjecucionODS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ods', models.CharField(max_length=30)),
+                ('cantidad', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('actividad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejecuciones_ods', to='actividades.actividad')),
+            ],
+            options={
+                'verbose_name': 'Ejecución ODS',
+                'verbose_name_plural': 'Ejecuciones ODS',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ejecucionods',
+            constraint=models.UniqueConstraint(fields=('actividad', 'ods'), name='ejecucion_ods_actividad_ods_uniq'),
+        ),
+        migrations.RunPython(separar_observaciones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actividades', '0005_partida_estructurada'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['fecha_programada', 'id'], name='actividad_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['proyecto', 'fecha_programada', 'id'], name='actividad_proy_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['estado', 'fecha_programada', 'id'], name='actividad_estado_fecha_id_idx'),
+        ),
+    ]
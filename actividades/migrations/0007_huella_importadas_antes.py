@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:10
+
+from django.db import migrations
+from django.db.models import Q
+
+# Huella que no coincide con ninguna fila: la próxima reimportación empareja la
+# actividad, la actualiza y le guarda su huella real
+HUELLA_LEGADO = 'legado'
+
+
+def marcar_importadas(apps, schema_editor):
+    """
+    Marca como importadas las actividades sin huella que traen partida (unidad,
+    cantidad, PU o total). Solo importar_edp_completo las llenaba, en
+    observaciones hasta que 0005 las separó; el dashboard y la API no las piden,
+    así que las actividades creadas a mano quedan sin huella.
+    """
+    Actividad = apps.get_model('actividades', 'Actividad')
+    Actividad.objects.filter(huella='').filter(
+        ~Q(unidad='') | Q(cantidad__isnull=False) | Q(precio_unitario__isnull=False)
+        | Q(cantidad_ejecutada__isnull=False)
+    ).update(huella=HUELLA_LEGADO)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actividades', '0006_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(marcar_importadas, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F
 from django.conf import settings
 from proyectos.models import Proyecto
 
@@ -29,11 +31,66 @@ class Actividad(models.Model):
         choices=ESTADO_CHOICES,
         default='pendiente'
     )
+    # Partida del EDP completo: unidad, cantidad contratada, precio unitario y cantidad ejecutada (TOTALES)
+    unidad = models.CharField(max_length=20, blank=True, default='')
+    cantidad = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    precio_unitario = models.DecimalField(max_digits=16, decimal_places=2, blank=True, null=True)
+    cantidad_ejecutada = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    # SHA-256 de la fila de origen de la última importación (vacío si se creó a mano)
+    huella = models.CharField(max_length=64, blank=True, default='', editable=False)
 
     class Meta:
         verbose_name = "Actividad"
         verbose_name_plural = "Actividades"
         ordering = ['proyecto', 'fecha_programada']
+        indexes = [
+            models.Index(fields=['proyecto', 'item'], name='actividad_proyecto_item_idx'),
+            # Paginación por cursor de la lista de actividades, sin filtro y filtrada por proyecto o estado
+            models.Index(fields=['fecha_programada', 'id'], name='actividad_fecha_id_idx'),
+            models.Index(fields=['proyecto', 'fecha_programada', 'id'], name='actividad_proy_fecha_id_idx'),
+            models.Index(fields=['estado', 'fecha_programada', 'id'], name='actividad_estado_fecha_id_idx'),
+        ]
+
+    def montos(self) -> tuple:
+        """
+        (cantidad × PU, avance × cantidad × PU) de la partida, como MONTO_CONTRATADO y
+        AVANCE_VALORIZADO pero en Python; (0, 0) si le falta cantidad o PU.
+        """
+        if self.cantidad is None or self.precio_unitario is None:
+            return Decimal(0), Decimal(0)
+        monto = Decimal(str(self.cantidad)) * Decimal(str(self.precio_unitario))
+        return monto, Decimal(str(self.avance or 0)) * monto
 
     def __str__(self) -> str:
         return f"{self.proyecto.codigo} - {self.descripcion[:50]}"
+
+
+class EjecucionODS(models.Model):
+    """Cantidad ejecutada de una partida en una orden de servicio (columnas ``ODS n`` del EDP completo)."""
+    actividad = models.ForeignKey(Actividad, on_delete=models.CASCADE, related_name='ejecuciones_ods')
+    ods = models.CharField(max_length=30)
+    cantidad = models.DecimalField(max_digits=14, decimal_places=4)
+
+    class Meta:
+        verbose_name = "Ejecución ODS"
+        verbose_name_plural = "Ejecuciones ODS"
+        constraints = [
+            models.UniqueConstraint(fields=['actividad', 'ods'], name='ejecucion_ods_actividad_ods_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.ods}: {self.cantidad}"
+
+
+# Montos por partida para agregar en SQL, p. ej.
+# Actividad.objects.values('proyecto').annotate(valor=Sum(MONTO_CONTRATADO), ejecutado=Sum(MONTO_EJECUTADO))
+MONTO_CONTRATADO = ExpressionWrapper(
+    F('cantidad') * F('precio_unitario'), output_field=DecimalField(max_digits=30, decimal_places=6)
+)
+MONTO_EJECUTADO = ExpressionWrapper(
+    F('cantidad_ejecutada') * F('precio_unitario'), output_field=DecimalField(max_digits=30, decimal_places=6)
+)
+# Avance (%) ponderado por el monto de la partida; Σ AVANCE_VALORIZADO / Σ MONTO_CONTRATADO da el avance ponderado
+AVANCE_VALORIZADO = ExpressionWrapper(
+    F('avance') * F('cantidad') * F('precio_unitario'), output_field=DecimalField(max_digits=34, decimal_places=8)
+)
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .estadisticas import invalidar
+from .models import Actividad
+
+
+@receiver(post_save, sender=Actividad)
+@receiver(post_delete, sender=Actividad)
+def invalidar_estadisticas(sender, **kwargs):
+    invalidar()
@@ -1,3 +1,49 @@
+from datetime import date
+from django.core.cache import cache
 from django.test import TestCase
+from empresas.models import Empresa
+from proyectos.models import Proyecto
+from .estadisticas import CLAVE_VERSION, estadisticas_globales, invalidar
+from .models import Actividad
 
-# Create your tests here.
+
+class EstadisticasGlobalesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.proyecto = Proyecto.objects.create(
+            codigo='P1', nombre='P1', cliente=Empresa.objects.create(nombre='Cliente'), fecha_inicio=date(2025, 1, 1),
+        )
+        Actividad.objects.bulk_create([
+            Actividad(proyecto=self.proyecto, descripcion='A', estado='completada', avance=100),
+            Actividad(proyecto=self.proyecto, descripcion='B', estado='en_ejecucion', avance=50),
+            Actividad(proyecto=self.proyecto, descripcion='C'),
+        ])
+
+    def test_una_consulta_y_luego_cache(self):
+        with self.assertNumQueries(1):
+            estadisticas = estadisticas_globales()
+        self.assertEqual(
+            (estadisticas.total, estadisticas.completadas, estadisticas.en_ejecucion, estadisticas.pendientes),
+            (3, 1, 1, 1),
+        )
+        self.assertEqual(estadisticas.avance_promedio, 50.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(estadisticas_globales(), estadisticas)
+
+    def test_senales_invalidan_al_confirmar(self):
+        estadisticas_globales()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Actividad.objects.create(proyecto=self.proyecto, descripcion='D', estado='atrasada')
+            Actividad.objects.filter(descripcion='C').delete()
+        # Una sola invalidación por transacción
+        self.assertEqual(len([c for c in callbacks if getattr(c, 'clave', None) == CLAVE_VERSION]), 1)
+        estadisticas = estadisticas_globales()
+        self.assertEqual((estadisticas.total, estadisticas.atrasadas, estadisticas.pendientes), (3, 1, 0))
+
+    def test_bulk_create_requiere_invalidar(self):
+        estadisticas_globales()
+        Actividad.objects.bulk_create([Actividad(proyecto=self.proyecto, descripcion='E')])
+        self.assertEqual(estadisticas_globales().total, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar()
+        self.assertEqual(estadisticas_globales().total, 4)
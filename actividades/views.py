@@ -1,8 +1,11 @@
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets
+from proyectos.versiones import condicional
 from .models import Actividad
 from .serializers import ActividadSerializer
 
 
+@method_decorator(condicional(), name='list')
 class ActividadViewSet(viewsets.ModelViewSet):
     queryset = Actividad.objects.all()
     serializer_class = ActividadSerializer
@@ -0,0 +1,15 @@
+from django.contrib import admin
+from .models import TerminoBusqueda
+
+
+@admin.register(TerminoBusqueda)
+class TerminoBusquedaAdmin(admin.ModelAdmin):
+    list_display = ('termino', 'tipo', 'objeto_id', 'id_proyecto', 'peso')
+    list_filter = ('tipo',)
+    search_fields = ('=termino',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BusquedaConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "busqueda"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,252 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+from edp_project.transacciones import al_confirmar
+from .models import TerminoBusqueda
+
+LARGO_TERMINO = TerminoBusqueda._meta.get_field('termino').max_length
+PESO_MAXIMO = 32767
+MAX_PALABRAS = 8  # palabras de la consulta que se consideran
+CLAVE_PENDIENTE = 'busqueda:indexado'
+
+# Palabras demasiado frecuentes en español para distinguir un resultado
+PALABRAS_VACIAS = frozenset(
+    'a al con de del el en es la las lo los o para por se sin su sus un una y'.split()
+)
+
+
+@dataclass(frozen=True)
+class Fuente:
+    """Modelo indexado: campos con su peso y, si aplica, el campo que indica su proyecto."""
+    modelo: str
+    campos: dict
+    codigos: tuple = ()  # campos tipo código que también se indexan compactos ("P-001" -> "p001")
+    campo_proyecto: str = None
+
+    @property
+    def model(self):
+        return apps.get_model(self.modelo)
+
+    @property
+    def columnas(self) -> list:
+        columnas = ['id', *self.campos]
+        if self.campo_proyecto and self.campo_proyecto != 'id':
+            columnas.append(self.campo_proyecto)
+        return columnas
+
+
+FUENTES = {
+    'empresa': Fuente('empresas.Empresa', {'nombre': 3, 'rut': 3}, ('rut',)),
+    'proyecto': Fuente('proyectos.Proyecto', {'codigo': 3, 'nombre': 2, 'supervisor': 1}, ('codigo',), 'id'),
+    'actividad': Fuente('actividades.Actividad', {'item': 3, 'descripcion': 1}, ('item',), 'proyecto_id'),
+    'noc': Fuente(
+        'noc.NoConformidad', {'codigo': 3, 'descripcion': 1, 'causa': 1, 'accion_correctiva': 1},
+        ('codigo',), 'proyecto_id',
+    ),
+}
+TIPOS_POR_MODELO = {fuente.modelo: tipo for tipo, fuente in FUENTES.items()}
+
+
+def normalizar(texto) -> str:
+    """Minúsculas y sin tildes: "Ejecución" -> "ejecucion", "Año" -> "ano"."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def _palabras(texto) -> list:
+    return re.findall(r'[a-z0-9]+', normalizar(texto))
+
+
+def tokens(texto) -> list:
+    """Términos indexables del texto: sin palabras vacías ni letras sueltas."""
+    return [
+        palabra[:LARGO_TERMINO] for palabra in _palabras(texto)
+        if palabra not in PALABRAS_VACIAS and (len(palabra) > 1 or palabra.isdigit())
+    ]
+
+
+def palabras_consulta(consulta: str) -> list:
+    """
+    Palabras de la consulta, cada una buscada como prefijo. Se ignoran las palabras
+    vacías salvo que la consulta tenga solo esas (p. ej. "de" mientras se escribe "desarrollo").
+    """
+    palabras = [palabra[:LARGO_TERMINO] for palabra in _palabras(consulta or '')]
+    utiles = [palabra for palabra in palabras if palabra not in PALABRAS_VACIAS]
+    return list(dict.fromkeys(utiles or palabras))[:MAX_PALABRAS]
+
+
+def terminos(fuente: Fuente, fila: dict) -> Counter:
+    """Peso de cada término de una fila: suma del peso del campo por aparición."""
+    pesos = Counter()
+    for campo, peso in fuente.campos.items():
+        texto = fila.get(campo)
+        if not texto:
+            continue
+        palabras = tokens(texto)
+        for palabra in palabras:
+            pesos[palabra] += peso
+        if campo in fuente.codigos:
+            compacto = ''.join(_palabras(texto))[:LARGO_TERMINO]
+            if compacto and compacto not in palabras:
+                pesos[compacto] += peso
+    return pesos
+
+
+def _filas_indice(tipo: str, filas, modelo_indice=TerminoBusqueda):
+    fuente = FUENTES[tipo]
+    for fila in filas:
+        proyecto_id = fila.get(fuente.campo_proyecto) if fuente.campo_proyecto else None
+        for termino, peso in terminos(fuente, fila).items():
+            yield modelo_indice(
+                termino=termino, tipo=tipo, objeto_id=fila['id'],
+                id_proyecto=proyecto_id, peso=min(peso, PESO_MAXIMO),
+            )
+
+
+def _guardar(tipo: str, queryset, batch_size: int, modelo_indice=TerminoBusqueda) -> int:
+    """Indexa las filas del queryset por lotes; devuelve cuántos objetos se indexaron."""
+    objetos = 0
+    lote = []
+    for fila in queryset.values(*FUENTES[tipo].columnas).order_by().iterator(chunk_size=batch_size):
+        objetos += 1
+        lote.extend(_filas_indice(tipo, [fila], modelo_indice))
+        if len(lote) >= batch_size:
+            modelo_indice.objects.bulk_create(lote, batch_size=batch_size)
+            lote = []
+    if lote:
+        modelo_indice.objects.bulk_create(lote, batch_size=batch_size)
+    return objetos
+
+
+def indexar(tipo: str, ids, batch_size: int = 1000) -> None:
+    """Reemplaza los términos de los objetos indicados; los que ya no existen quedan fuera del índice."""
+    ids = sorted(set(ids))
+    modelo = FUENTES[tipo].model
+    with transaction.atomic():
+        for inicio in range(0, len(ids), batch_size):
+            tramo = ids[inicio:inicio + batch_size]
+            TerminoBusqueda.objects.filter(tipo=tipo, objeto_id__in=tramo).delete()
+            _guardar(tipo, modelo.objects.filter(id__in=tramo), batch_size)
+
+
+def indexar_proyecto(proyecto_id, batch_size: int = 1000) -> None:
+    """
+    Reindexa el proyecto con sus actividades y NOC. Lo usan los importadores,
+    que escriben con bulk_create/bulk_update y por tanto no emiten señales.
+    """
+    with transaction.atomic():
+        indexar('proyecto', [proyecto_id], batch_size)
+        for tipo in ('actividad', 'noc'):
+            TerminoBusqueda.objects.filter(id_proyecto=proyecto_id, tipo=tipo).delete()
+            _guardar(tipo, FUENTES[tipo].model.objects.filter(proyecto_id=proyecto_id), batch_size)
+
+
+def reconstruir(tipos=None, batch_size: int = 2000, registro=apps) -> dict:
+    """
+    Vacía y vuelve a llenar el índice de los tipos indicados (todos si es None).
+    Una migración pasa su ``apps`` como ``registro`` para usar los modelos históricos.
+    """
+    modelo_indice = registro.get_model('busqueda', 'TerminoBusqueda')
+    conteos = {}
+    for tipo in tipos or FUENTES:
+        with transaction.atomic():
+            modelo_indice.objects.filter(tipo=tipo).delete()
+            modelo = registro.get_model(FUENTES[tipo].modelo)
+            conteos[tipo] = _guardar(tipo, modelo.objects.all(), batch_size, modelo_indice)
+    return conteos
+
+
+class _IndexadoPendiente:
+    """Objetos a reindexar al confirmar la transacción en curso."""
+
+    def __init__(self):
+        self.ids = defaultdict(set)
+
+    def __call__(self) -> None:
+        for tipo, ids in self.ids.items():
+            indexar(tipo, ids)
+
+
+def programar_indexado(tipo: str, ids) -> None:
+    """
+    Marca objetos cuyo texto cambió (o que se borraron). Dentro de una
+    transacción se reindexan todos juntos al confirmarla, así un borrado en
+    cascada no ejecuta una consulta por actividad. Fuera de una transacción se
+    aplica de inmediato.
+    """
+    ids = [i for i in ids if i]
+    al_confirmar(CLAVE_PENDIENTE, _IndexadoPendiente, lambda pendiente: pendiente.ids[tipo].update(ids))
+
+
+def buscar(consulta: str, tipos=None):
+    """
+    Resultados de la consulta como filas {tipo, objeto_id, puntaje}, de mayor a
+    menor puntaje, en una sola consulta GROUP BY sobre el índice.
+
+    Cada palabra se busca como prefijo de un término y un objeto debe contener
+    todas las palabras. El puntaje suma los pesos de los términos coincidentes
+    y cuenta doble los que coinciden completos.
+    """
+    palabras = palabras_consulta(consulta)
+    if not palabras:
+        return TerminoBusqueda.objects.none().values('tipo', 'objeto_id')
+
+    # istartswith y no startswith: en MySQL startswith usa LIKE BINARY, que no
+    # aprovecha el índice; los términos ya están en minúsculas
+    terminos_qs = TerminoBusqueda.objects.filter(
+        reduce(or_, (Q(termino__istartswith=palabra) for palabra in palabras))
+    )
+    if tipos:
+        terminos_qs = terminos_qs.filter(tipo__in=tipos)
+
+    contiene = {
+        f'contiene_{i}': Max(Case(
+            When(termino__istartswith=palabra, then=Value(1)), default=Value(0), output_field=IntegerField(),
+        ))
+        for i, palabra in enumerate(palabras)
+    } if len(palabras) > 1 else {}
+    return (
+        terminos_qs.order_by()
+        .values('tipo', 'objeto_id')
+        .annotate(
+            puntaje=Sum('peso') + Sum(Case(
+                When(termino__in=palabras, then=F('peso')), default=Value(0), output_field=IntegerField(),
+            )),
+            **contiene,
+        )
+        .filter(**{nombre: 1 for nombre in contiene})
+        .order_by('-puntaje', 'tipo', 'objeto_id')
+    )
+
+
+def ids_coincidentes(consulta: str, tipo: str):
+    """Subconsulta con los ids de un tipo que coinciden, para filtrar con ``id__in``."""
+    return buscar(consulta, [tipo]).values('objeto_id')
+
+
+def cargar(filas) -> list:
+    """
+    Agrega a cada fila de ``buscar`` su objeto, con una consulta por tipo.
+    Se omiten las filas cuyo objeto ya no existe.
+    """
+    por_tipo = defaultdict(list)
+    for fila in filas:
+        por_tipo[fila['tipo']].append(fila['objeto_id'])
+    objetos = {}
+    for tipo, ids in por_tipo.items():
+        queryset = FUENTES[tipo].model.objects.all()
+        if FUENTES[tipo].campo_proyecto == 'proyecto_id':
+            queryset = queryset.select_related('proyecto')
+        elif tipo == 'proyecto':
+            queryset = queryset.select_related('cliente')
+        objetos[tipo] = queryset.in_bulk(ids)
+    return [
+        {**fila, 'objeto': objetos[fila['tipo']][fila['objeto_id']]}
+        for fila in filas if fila['objeto_id'] in objetos[fila['tipo']]
+    ]
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from busqueda.indice import FUENTES, reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de empresas, proyectos, actividades y NOC"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo', choices=list(FUENTES), action='append', help='Tipo a reconstruir (por defecto todos)'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Filas por lote de bulk_create')
+
+    def handle(self, *args, **options):
+        conteos = reconstruir(options['tipo'], options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+        for tipo, total in conteos.items():
+            self.stdout.write(self.style.SUCCESS(f'{tipo}: {total} objetos indexados'))
+        self.stdout.write(self.style.SUCCESS('=' * 50))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=40)),
+                ('tipo', models.CharField(choices=[('empresa', 'Empresa'), ('proyecto', 'Proyecto'), ('actividad', 'Actividad'), ('noc', 'No Conformidad')], max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('id_proyecto', models.BigIntegerField(blank=True, null=True)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Término de búsqueda',
+                'verbose_name_plural': 'Términos de búsqueda',
+                'indexes': [models.Index(fields=['termino', 'tipo', 'objeto_id', 'peso'], name='busqueda_termino_idx'), models.Index(fields=['tipo', 'objeto_id'], name='busqueda_objeto_idx'), models.Index(fields=['id_proyecto', 'tipo'], name='busqueda_proyecto_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:02
+
+from django.db import migrations
+
+
+def llenar_indice(apps, schema_editor):
+    """Indexa los datos existentes, para que la búsqueda no quede vacía tras migrar."""
+    from busqueda.indice import reconstruir
+
+    reconstruir(registro=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('busqueda', '0001_initial'),
+        ('empresas', '0003_indices_autocompletar'),
+        ('proyectos', '0008_control_valor_avance'),
+        ('actividades', '0006_indices_paginacion'),
+        ('noc', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(llenar_indice, migrations.RunPython.noop),
+    ]
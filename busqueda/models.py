@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class TerminoBusqueda(models.Model):
+    """
+    Índice invertido de búsqueda: una fila por término normalizado de cada objeto.
+
+    Los términos se guardan en minúsculas y sin tildes (ver busqueda.indice), de
+    modo que una búsqueda por prefijo recorre el índice (termino, …) en vez de
+    escanear las tablas con LIKE '%texto%'.
+    """
+    TIPO_CHOICES = [
+        ('empresa', 'Empresa'),
+        ('proyecto', 'Proyecto'),
+        ('actividad', 'Actividad'),
+        ('noc', 'No Conformidad'),
+    ]
+
+    termino = models.CharField(max_length=40)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    # Proyecto al que pertenece el objeto, para reindexar un proyecto completo tras importar
+    id_proyecto = models.BigIntegerField(blank=True, null=True)
+    peso = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Término de búsqueda"
+        verbose_name_plural = "Términos de búsqueda"
+        indexes = [
+            # Cubre la búsqueda: prefijo del término, agrupación por objeto y suma de pesos
+            models.Index(fields=['termino', 'tipo', 'objeto_id', 'peso'], name='busqueda_termino_idx'),
+            models.Index(fields=['tipo', 'objeto_id'], name='busqueda_objeto_idx'),
+            models.Index(fields=['id_proyecto', 'tipo'], name='busqueda_proyecto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.termino} → {self.tipo} {self.objeto_id}"
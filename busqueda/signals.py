@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from empresas.models import Empresa
+from proyectos.models import Proyecto
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from .indice import TIPOS_POR_MODELO, programar_indexado
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+@receiver(post_save, sender=Proyecto)
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_save, sender=Actividad)
+@receiver(post_delete, sender=Actividad)
+@receiver(post_save, sender=NoConformidad)
+@receiver(post_delete, sender=NoConformidad)
+def actualizar_indice(sender, instance, **kwargs):
+    programar_indexado(TIPOS_POR_MODELO[sender._meta.label], [instance.pk])
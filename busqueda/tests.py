@@ -0,0 +1,97 @@
+from datetime import date
+from django.test import TestCase
+from django.urls import reverse
+from empresas.models import Empresa
+from proyectos.models import Proyecto
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from users.models import User
+from .indice import CLAVE_PENDIENTE, buscar, cargar, indexar_proyecto, reconstruir, tokens
+from .models import TerminoBusqueda
+
+
+def resultados(consulta, tipos=None):
+    return [(fila['tipo'], fila['objeto_id']) for fila in buscar(consulta, tipos)]
+
+
+class BusquedaTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa = Empresa.objects.create(nombre='Minera Cóndor', rut='76.123.456-7')
+            self.proyecto = Proyecto.objects.create(
+                codigo='P-001', nombre='Planta de Ejecución', cliente=self.empresa, fecha_inicio=date(2025, 1, 1),
+                responsable=User.objects.create(username='responsable'),
+            )
+            self.topografia = Actividad.objects.create(
+                proyecto=self.proyecto, item='1.1', descripcion='Servicios de topografía',
+            )
+            self.excavacion = Actividad.objects.create(
+                proyecto=self.proyecto, item='1.2', descripcion='Excavación y servicios de ejecución',
+            )
+
+    def test_tokens_sin_tildes_ni_palabras_vacias(self):
+        self.assertEqual(tokens('Ejecución de la Obra Año 2'), ['ejecucion', 'obra', 'ano', '2'])
+
+    def test_prefijo_sin_tildes_y_todas_las_palabras(self):
+        self.assertEqual(resultados('TOPOGRAFIA'), [('actividad', self.topografia.id)])
+        self.assertEqual(
+            set(resultados('ejecuci')),
+            {('proyecto', self.proyecto.id), ('actividad', self.excavacion.id)},
+        )
+        self.assertEqual(resultados('servicios exca'), [('actividad', self.excavacion.id)])
+        self.assertEqual(resultados('ejecución', ['actividad']), [('actividad', self.excavacion.id)])
+        self.assertEqual(resultados('  -- '), [])
+
+    def test_codigos_compactos_y_orden_por_puntaje(self):
+        self.assertEqual(resultados('p001'), [('proyecto', self.proyecto.id)])
+        self.assertEqual(resultados('761234567'), [('empresa', self.empresa.id)])
+        # El código pesa más que la descripción
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = Actividad.objects.create(proyecto=self.proyecto, item='TOPO-1', descripcion='Replanteo')
+        self.assertEqual(resultados('topo')[0], ('actividad', nueva.id))
+
+    def test_senales_mantienen_el_indice(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.topografia.descripcion = 'Levantamiento'
+            self.topografia.save()
+            self.excavacion.delete()
+        # Un solo reindexado por transacción
+        self.assertEqual(len([c for c in callbacks if getattr(c, 'clave', None) == CLAVE_PENDIENTE]), 1)
+        self.assertEqual(resultados('topografia'), [])
+        self.assertEqual(resultados('levantamiento'), [('actividad', self.topografia.id)])
+        self.assertFalse(TerminoBusqueda.objects.filter(tipo='actividad', objeto_id=self.excavacion.id).exists())
+
+    def test_importacion_y_reconstruccion(self):
+        Actividad.objects.bulk_create([Actividad(proyecto=self.proyecto, item='9', descripcion='Hormigonado')])
+        NoConformidad.objects.bulk_create([NoConformidad(
+            proyecto=self.proyecto, codigo='NC-9', descripcion='Hormigón fuera de norma', fecha_detectada=date(2025, 2, 1),
+        )])
+        self.assertEqual(resultados('hormig'), [])
+        indexar_proyecto(self.proyecto.id)
+        self.assertEqual({tipo for tipo, _ in resultados('hormig')}, {'actividad', 'noc'})
+
+        TerminoBusqueda.objects.all().delete()
+        self.assertEqual(reconstruir(), {'empresa': 1, 'proyecto': 1, 'actividad': 3, 'noc': 1})
+        self.assertEqual(len(resultados('hormig')), 2)
+
+    def test_migracion_llena_el_indice_con_modelos_historicos(self):
+        from django.db import connection
+        from django.db.migrations.loader import MigrationLoader
+
+        historicas = MigrationLoader(connection).project_state(('busqueda', '0002_llenar_indice')).apps
+        TerminoBusqueda.objects.all().delete()
+        self.assertEqual(reconstruir(registro=historicas), {'empresa': 1, 'proyecto': 1, 'actividad': 2, 'noc': 0})
+        self.assertEqual(resultados('topografia'), [('actividad', self.topografia.id)])
+
+    def test_cargar_y_vistas(self):
+        filas = list(buscar('ejecucion'))
+        with self.assertNumQueries(2):  # una por tipo
+            filas = cargar(filas)
+        self.assertEqual({fila['objeto'] for fila in filas}, {self.proyecto, self.excavacion})
+
+        respuesta = self.client.get(reverse('dashboard:buscar'), {'q': 'condor'})
+        self.assertContains(respuesta, 'Minera Cóndor')
+        respuesta = self.client.get(reverse('dashboard:proyectos_lista'), {'search': 'condor'})
+        self.assertEqual(list(respuesta.context['page_obj']), [self.proyecto])
+        respuesta = self.client.get(reverse('dashboard:actividades_lista'), {'search': 'topografia'})
+        self.assertEqual(list(respuesta.context['page_obj']), [self.topografia])
@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from proyectos.models import Proyecto
+from empresas.models import Empresa
+from users.models import User
+
+LIMITE_POR_DEFECTO = 10
+LIMITE_MAXIMO = 50
+
+
+@dataclass(frozen=True)
+class FuenteAutocompletar:
+    """Modelo para autocompletar: campos buscados por prefijo y cómo armar la etiqueta."""
+    modelo: type
+    campos: tuple
+    etiqueta: tuple
+    filtros: dict = None
+
+    def queryset(self):
+        return self.modelo.objects.filter(**(self.filtros or {}))
+
+    def texto(self, valores: tuple) -> str:
+        return ' - '.join(str(valor) for valor in valores if valor)
+
+
+FUENTES = {
+    'proyectos': FuenteAutocompletar(Proyecto, ('codigo', 'nombre'), ('codigo', 'nombre')),
+    'empresas': FuenteAutocompletar(Empresa, ('nombre', 'rut'), ('nombre', 'rut')),
+    'usuarios': FuenteAutocompletar(
+        User, ('username', 'first_name', 'last_name'), ('username', 'first_name', 'last_name'), {'is_active': True},
+    ),
+}
+
+
+def sugerencias(tipo: str, consulta: str, limite: int = LIMITE_POR_DEFECTO) -> list:
+    """
+    Hasta ``limite`` coincidencias como [{id, texto}].
+
+    Cada campo se consulta por separado con ``LIKE 'texto%'`` ordenado por ese
+    mismo campo, así cada consulta recorre solo el tramo del índice del campo y
+    se corta en ``limite`` filas; un OR entre campos obligaría a leerlos todos.
+    """
+    fuente = FUENTES[tipo]
+    consulta = (consulta or '').strip()
+    columnas = ('id', *fuente.etiqueta)
+    encontrados = {}
+    for campo in fuente.campos:
+        faltan = limite - len(encontrados)
+        if faltan <= 0:
+            break
+        queryset = fuente.queryset()
+        if consulta:
+            queryset = queryset.filter(**{f'{campo}__istartswith': consulta})
+        if encontrados:
+            queryset = queryset.exclude(id__in=list(encontrados))
+        for fila in queryset.order_by(campo, 'id').values_list(*columnas)[:faltan]:
+            encontrados[fila[0]] = fuente.texto(fila[1:])
+        if not consulta:
+            break  # sin texto basta con los primeros por el primer campo
+    return [{'id': id_, 'texto': texto} for id_, texto in encontrados.items()]
+
+
+def seleccionado(tipo: str, id_) -> dict:
+    """{id, texto} del valor ya elegido en un formulario, o None (también si el id no es un número)."""
+    if not id_ or not str(id_).isdigit():
+        return None
+    fuente = FUENTES[tipo]
+    fila = fuente.modelo.objects.filter(id=id_).values_list('id', *fuente.etiqueta).first()
+    return {'id': fila[0], 'texto': fuente.texto(fila[1:])} if fila else None
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.db.models import Avg, Count, F, IntegerField, Value
+from django.db.models.functions import Cast, Floor, Least
+from proyectos.models import Proyecto
+
+# Proyectos en el modo top (por defecto y máximo) y ancho de tramo del histograma
+LIMITE_POR_DEFECTO = 30
+LIMITE_MAXIMO = 200
+ANCHO_POR_DEFECTO = 10
+
+
+def campo_avance() -> str:
+    """Avance con que se ordena y agrupa: el ponderado por monto si está activo."""
+    return 'control__avance_ponderado' if settings.EDP_AVANCE_PONDERADO else 'control__avance_global'
+
+
+def _numero(valor):
+    return float(valor) if valor is not None else None
+
+
+def proyectos_filtrados(estado: str = '', empresa_id=None):
+    proyectos = Proyecto.objects.all()
+    if estado:
+        proyectos = proyectos.filter(estado=estado)
+    if empresa_id:
+        proyectos = proyectos.filter(cliente_id=empresa_id)
+    return proyectos
+
+
+def avance_por_proyecto(proyectos, limite: int = LIMITE_POR_DEFECTO, mayor: bool = True) -> dict:
+    """
+    Los ``limite`` proyectos de mayor (o menor) avance y un resumen del resto:
+    dos consultas, sin importar el tamaño de la cartera.
+    """
+    campo = F(campo_avance())
+    orden = campo.desc(nulls_last=True) if mayor else campo.asc(nulls_last=True)
+    filas = list(
+        proyectos.order_by(orden, 'codigo')
+        .values_list('id', 'codigo', 'control__avance_global', 'control__avance_ponderado')[:limite]
+    )
+    resto = proyectos.exclude(id__in=[fila[0] for fila in filas]).aggregate(
+        proyectos=Count('id'), avance_promedio=Avg(campo_avance()),
+    )
+    return {
+        'modo': 'top',
+        'labels': [codigo for _, codigo, _, _ in filas],
+        'values': [_numero(avance) or 0 for _, _, avance, _ in filas],
+        # null deja la barra vacía en proyectos sin cantidades ni precios
+        'ponderado': [_numero(ponderado) for _, _, _, ponderado in filas],
+        'resto': {
+            'proyectos': resto['proyectos'],
+            'avance_promedio': round(_numero(resto['avance_promedio']), 2) if resto['avance_promedio'] is not None else None,
+        },
+    }
+
+
+def avance_por_tramos(proyectos, ancho: int = ANCHO_POR_DEFECTO) -> dict:
+    """
+    Histograma: cuántos proyectos hay en cada tramo de avance (0–10 %, 10–20 %, …),
+    con un GROUP BY sobre el tramo. El 100 % cae en el último tramo.
+    """
+    ultimo = -(-100 // ancho) - 1
+    campo = campo_avance()
+    conteos = dict(
+        proyectos.filter(**{f'{campo}__isnull': False})
+        .annotate(tramo=Least(Cast(Floor(F(campo) / ancho), IntegerField()), Value(ultimo)))
+        .order_by().values('tramo').annotate(n=Count('id'))
+        .values_list('tramo', 'n')
+    )
+    return {
+        'modo': 'tramos',
+        'labels': [f'{i * ancho}–{min((i + 1) * ancho, 100)}%' for i in range(ultimo + 1)],
+        'values': [conteos.get(i, 0) for i in range(ultimo + 1)],
+        'sin_datos': proyectos.filter(**{f'{campo}__isnull': True}).count(),
+    }
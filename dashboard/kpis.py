@@ -0,0 +1,65 @@
+from dataclasses import dataclass, asdict
+from django.db.models import Count, Avg, Q, Subquery, Value
+from proyectos.models import Proyecto
+from actividades.models import Actividad
+from noc.models import NoConformidad
+
+
+@dataclass(frozen=True)
+class DashboardKPIs:
+    """Indicadores globales del dashboard."""
+    total_proyectos: int
+    proyectos_activos: int
+    proyectos_finalizados: int
+    total_actividades: int
+    completadas: int
+    avance_promedio: float
+    noc_abiertas: int
+    noc_proceso: int
+    noc_cerradas: int
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _agregado_escalar(queryset, agregado) -> Subquery:
+    """Subconsulta que devuelve un único agregado sobre todo el queryset (sin GROUP BY)."""
+    return Subquery(
+        queryset.order_by()
+        .annotate(_uno=Value(1))
+        .values('_uno')
+        .annotate(valor=agregado)
+        .values('valor')
+    )
+
+
+def calcular_kpis() -> DashboardKPIs:
+    """
+    Calcula todos los contadores del dashboard en un solo round trip.
+
+    Proyecto se agrega con conteos condicionales; Actividad y NoConformidad
+    se resuelven como subconsultas escalares dentro de la misma sentencia.
+    """
+    actividades = Actividad.objects.all()
+    nocs = NoConformidad.objects.all()
+
+    fila = (
+        Proyecto.objects.order_by()
+        .annotate(_uno=Value(1))
+        .values('_uno')
+        .annotate(
+            total_proyectos=Count('id'),
+            proyectos_activos=Count('id', filter=Q(estado='en_ejecucion')),
+            proyectos_finalizados=Count('id', filter=Q(estado='finalizado')),
+            total_actividades=_agregado_escalar(actividades, Count('id')),
+            completadas=_agregado_escalar(actividades, Count('id', filter=Q(estado='completada'))),
+            avance_promedio=_agregado_escalar(actividades, Avg('avance')),
+            noc_abiertas=_agregado_escalar(nocs, Count('id', filter=Q(estado='abierta'))),
+            noc_proceso=_agregado_escalar(nocs, Count('id', filter=Q(estado='en_proceso'))),
+            noc_cerradas=_agregado_escalar(nocs, Count('id', filter=Q(estado='cerrada'))),
+        )
+        .get()
+    )
+    fila.pop('_uno')
+    fila['avance_promedio'] = round(float(fila['avance_promedio'] or 0), 2)
+    return DashboardKPIs(**fila)
@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import date
+from django.db import connection
+from django.db.models import Q
+
+
+def _codificar(fecha, id_) -> str:
+    valor = json.dumps([fecha.isoformat() if fecha else None, id_])
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor: str):
+    """(fecha, id) del cursor, o None si no es válido."""
+    try:
+        fecha, id_ = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return (date.fromisoformat(fecha) if fecha else None), int(id_)
+    except (ValueError, TypeError):
+        return None
+
+
+class PaginaCursor:
+    """
+    Página de actividades por cursor (keyset) sobre (fecha_programada, id), en
+    orden descendente.
+
+    En vez de OFFSET, cada página continúa desde la última fila de la anterior
+    (``despues``) o retrocede desde la primera de la siguiente (``antes``), así
+    que cualquier página cuesta lo mismo y usa los índices (…, fecha_programada, id).
+    Las filas sin fecha van donde las pone la base de datos (al final en MySQL y
+    SQLite, al principio en PostgreSQL). Un cursor inválido muestra la primera página.
+    """
+
+    def __init__(self, queryset, por_pagina: int = 20, despues: str = None, antes: str = None):
+        self.por_pagina = por_pagina
+        clave_despues = _decodificar(despues) if despues else None
+        clave_antes = _decodificar(antes) if antes else None
+
+        if clave_antes and not clave_despues:
+            filas = list(self._seek(queryset, clave_antes, 'gt').order_by('fecha_programada', 'id')[:por_pagina + 1])
+            self.tiene_anterior = len(filas) > por_pagina
+            self.tiene_siguiente = True
+            self.objetos = filas[:por_pagina][::-1]
+        else:
+            if clave_despues:
+                queryset = self._seek(queryset, clave_despues, 'lt')
+            filas = list(queryset.order_by('-fecha_programada', '-id')[:por_pagina + 1])
+            self.tiene_siguiente = len(filas) > por_pagina
+            self.tiene_anterior = clave_despues is not None
+            self.objetos = filas[:por_pagina]
+
+    @staticmethod
+    def _seek(queryset, clave, op: str):
+        """Filas posteriores a ``clave`` en el sentido de ``op`` (lt: descendente, gt: ascendente)."""
+        fecha, id_ = clave
+        # Con NULL como el menor valor (MySQL, SQLite) los nulos van al final del recorrido descendente
+        nulos_al_final = (op == 'lt') != connection.features.nulls_order_largest
+        if fecha is None:
+            condicion = Q(fecha_programada__isnull=True, **{f'id__{op}': id_})
+            if not nulos_al_final:
+                condicion |= Q(fecha_programada__isnull=False)
+        else:
+            condicion = Q(**{f'fecha_programada__{op}': fecha}) | Q(fecha_programada=fecha, **{f'id__{op}': id_})
+            if nulos_al_final:
+                condicion |= Q(fecha_programada__isnull=True)
+        return queryset.filter(condicion)
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self) -> int:
+        return len(self.objetos)
+
+    @property
+    def cursor_siguiente(self):
+        if not self.tiene_siguiente or not self.objetos:
+            return None
+        ultima = self.objetos[-1]
+        return _codificar(ultima.fecha_programada, ultima.id)
+
+    @property
+    def cursor_anterior(self):
+        if not self.tiene_anterior or not self.objetos:
+            return None
+        primera = self.objetos[0]
+        return _codificar(primera.fecha_programada, primera.id)
+
+
+def contar(queryset, limite: int = 0) -> tuple:
+    """
+    Total de filas del queryset como (total, exacto). Con ``limite`` se cuenta a
+    lo más hasta ``limite`` filas (un COUNT sobre una subconsulta con LIMIT), de
+    modo que el costo no crece con la tabla; si se alcanza, ``exacto`` es False.
+    """
+    if not limite:
+        return queryset.count(), True
+    total = queryset.order_by()[:limite + 1].count()
+    return min(total, limite), total <= limite
@@ -1,3 +1,377 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from empresas.models import Empresa
+from proyectos.models import Proyecto, CuadroControl, TrabajoImportacion
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from users.models import User
+from .kpis import calcular_kpis
 
-# Create your tests here.
+
+def crear_proyecto(codigo, empresa, estado='en_ejecucion', actividades=0, nocs=0):
+    responsable, _ = User.objects.get_or_create(username='responsable')
+    proyecto = Proyecto.objects.create(
+        codigo=codigo,
+        nombre=f'Proyecto {codigo}',
+        cliente=empresa,
+        responsable=responsable,
+        fecha_inicio=date(2025, 1, 1),
+        estado=estado,
+    )
+    CuadroControl.objects.create(proyecto=proyecto)
+    Actividad.objects.bulk_create([
+        Actividad(
+            proyecto=proyecto,
+            descripcion=f'Actividad {i}',
+            avance=100 if i % 2 else 0,
+            estado='completada' if i % 2 else 'pendiente',
+        )
+        for i in range(actividades)
+    ])
+    NoConformidad.objects.bulk_create([
+        NoConformidad(
+            proyecto=proyecto,
+            codigo=f'NOC-{i}',
+            descripcion='NOC',
+            fecha_detectada=date(2025, 1, 1),
+            estado=['abierta', 'en_proceso', 'cerrada'][i % 3],
+        )
+        for i in range(nocs)
+    ])
+    return proyecto
+
+
+class DashboardKPIsTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Cliente')
+
+    def test_kpis_sin_datos(self):
+        kpis = calcular_kpis()
+        self.assertEqual(kpis.total_proyectos, 0)
+        self.assertEqual(kpis.total_actividades, 0)
+        self.assertEqual(kpis.avance_promedio, 0)
+
+    def test_kpis_valores(self):
+        crear_proyecto('P1', self.empresa, actividades=4, nocs=3)
+        crear_proyecto('P2', self.empresa, estado='finalizado', actividades=2)
+        with self.assertNumQueries(1):
+            kpis = calcular_kpis()
+        self.assertEqual(kpis.total_proyectos, 2)
+        self.assertEqual(kpis.proyectos_activos, 1)
+        self.assertEqual(kpis.proyectos_finalizados, 1)
+        self.assertEqual(kpis.total_actividades, 6)
+        self.assertEqual(kpis.completadas, 3)
+        self.assertEqual(kpis.avance_promedio, 50.0)
+        self.assertEqual((kpis.noc_abiertas, kpis.noc_proceso, kpis.noc_cerradas), (1, 1, 1))
+
+    def test_dashboard_consultas_acotadas(self):
+        url = reverse('dashboard:dashboard')
+        for cantidad in (1, 25):
+            for i in range(cantidad):
+                crear_proyecto(f'P{cantidad}-{i}', self.empresa, actividades=3, nocs=2)
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(consultas), 3)
+
+    def test_kpis_api(self):
+        crear_proyecto('P1', self.empresa, actividades=2)
+        response = self.client.get(reverse('dashboard:kpis_api'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_actividades'], 2)
+
+
+class ProyectosListaTests(TestCase):
+    def setUp(self):
+        empresa = Empresa.objects.create(nombre='Cliente')
+        for i in range(30):
+            crear_proyecto(f'P{i:02d}', empresa, actividades=i % 4, nocs=i % 3)
+
+    def test_consultas_independientes_de_cantidad(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('dashboard:proyectos_lista'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 20)
+        self.assertLessEqual(len(consultas), 2)
+
+    def test_orden_por_columna_calculada(self):
+        response = self.client.get(reverse('dashboard:proyectos_lista'), {'orden': '-actividades'})
+        proyectos = list(response.context['page_obj'])
+        self.assertEqual(proyectos[0].total_actividades, 3)
+        self.assertEqual(proyectos[-1].total_actividades, 1)
+        self.assertEqual(proyectos[0].actividades_completadas, 1)
+
+    def test_paginacion_codifica_los_filtros(self):
+        from busqueda.indice import reconstruir
+
+        reconstruir()  # el índice se llena al confirmar, y el TestCase no confirma
+        response = self.client.get(reverse('dashboard:proyectos_lista'), {'search': 'Cliente #', 'orden': 'codigo'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 30)
+        self.assertContains(response, 'href="?page=2&search=Cliente+%23&amp;orden=codigo"')
+
+
+@override_settings(EDP_ACTIVIDADES_CURSOR=True)
+class ActividadesCursorTests(TestCase):
+    def setUp(self):
+        proyecto = crear_proyecto('P1', Empresa.objects.create(nombre='Cliente'), actividades=45)
+        # Fechas repetidas y sin fecha para probar el desempate por id y los nulos
+        for i, actividad in enumerate(proyecto.actividades.order_by('id')):
+            actividad.fecha_programada = date(2025, 1, 1 + i // 4) if i < 37 else None
+            actividad.save()
+
+    def _recorrer(self, parametros=None):
+        ids, parametros = [], dict(parametros or {})
+        while True:
+            pagina = self.client.get(reverse('dashboard:actividades_lista'), parametros).context['page_obj']
+            ids.extend(actividad.id for actividad in pagina)
+            if not pagina.cursor_siguiente:
+                return ids, pagina
+            parametros['despues'] = pagina.cursor_siguiente
+
+    def test_recorre_todo_en_orden_y_vuelve(self):
+        ids, ultima = self._recorrer()
+        esperado = list(
+            Actividad.objects.order_by('-fecha_programada', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperado)
+        self.assertEqual(len(ultima), 5)
+
+        anterior = self.client.get(
+            reverse('dashboard:actividades_lista'), {'antes': ultima.cursor_anterior}
+        ).context['page_obj']
+        self.assertEqual([a.id for a in anterior], esperado[20:40])
+        self.assertTrue(anterior.tiene_anterior)
+
+    def test_filtro_y_cursor_invalido(self):
+        ids, _ = self._recorrer({'estado': 'completada'})
+        self.assertEqual(len(ids), 22)
+        response = self.client.get(reverse('dashboard:actividades_lista'), {'despues': 'basura'})
+        self.assertEqual(len(response.context['page_obj']), 20)
+
+    @override_settings(EDP_CONTEO_APROXIMADO=10)
+    def test_conteo_acotado(self):
+        response = self.client.get(reverse('dashboard:actividades_lista'))
+        self.assertEqual((response.context['total_filtradas'], response.context['total_exacto']), (10, False))
+        self.assertContains(response, 'más de 10 actividades')
+
+
+class ImportacionesTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(
+            MEDIA_ROOT=directorio.name, EDP_CACHE_DIR=os.path.join(directorio.name, 'cache')
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        User.objects.create_superuser('admin', 'admin@example.com', 'x')
+
+    def _libro_completo(self, filas) -> bytes:
+        import io
+        import openpyxl
+
+        libro = openpyxl.Workbook()
+        libro.active.append(['Nº', 'ITEM', 'Cantidad', 'TOTALES'])
+        for i in range(filas):
+            libro.active.append([f'1.{i}', f'Partida {i}', 10, 10])
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        return contenido.getvalue()
+
+    def test_subida_encola_y_worker_procesa(self):
+        archivo = SimpleUploadedFile('edp.xlsx', self._libro_completo(7))
+        response = self.client.post(
+            reverse('dashboard:importaciones'), {'archivo': archivo, 'tipo': 'edp_completo', 'codigo': 'WEB-1'}
+        )
+        self.assertRedirects(response, reverse('dashboard:importaciones'))
+        trabajo = TrabajoImportacion.objects.get()
+        self.assertEqual(trabajo.estado, 'pendiente')
+        self.assertFalse(Proyecto.objects.exists())
+
+        call_command('procesar_importaciones', una_vez=True, tamano_bloque=3, stdout=StringIO())
+
+        datos = self.client.get(reverse('dashboard:importacion_progreso', args=[trabajo.id])).json()
+        self.assertEqual(datos['estado'], 'completado')
+        self.assertEqual(datos['filas_procesadas'], 7)
+        self.assertEqual(Proyecto.objects.get(codigo='WEB-1').actividades.count(), 7)
+
+    def test_archivo_invalido_queda_con_error(self):
+        archivo = SimpleUploadedFile('roto.xlsx', b'no es un libro')
+        self.client.post(reverse('dashboard:importaciones'), {'archivo': archivo, 'tipo': 'edp_completo'})
+        call_command('procesar_importaciones', una_vez=True, stdout=StringIO())
+        trabajo = TrabajoImportacion.objects.get()
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertIn('Error al leer el archivo', trabajo.mensaje)
+
+    def test_acepta_csv(self):
+        archivo = SimpleUploadedFile('edp.csv', 'Nº,ITEM,Cantidad,TOTALES\n1.1,Topografía,10,10\n'.encode('utf-8'))
+        self.client.post(reverse('dashboard:importaciones'), {'archivo': archivo, 'tipo': 'edp_completo', 'codigo': 'CSV-1'})
+        call_command('procesar_importaciones', una_vez=True, stdout=StringIO())
+        self.assertEqual(TrabajoImportacion.objects.get().estado, 'completado')
+        self.assertEqual(Proyecto.objects.get(codigo='CSV-1').actividades.count(), 1)
+
+    def test_trabajo_abandonado_se_cierra_con_error(self):
+        archivo = SimpleUploadedFile('edp.xlsx', self._libro_completo(1))
+        self.client.post(reverse('dashboard:importaciones'), {'archivo': archivo, 'tipo': 'edp_completo'})
+        hace = timezone.now() - timedelta(seconds=settings.EDP_IMPORTACION_TIMEOUT + 1)
+        TrabajoImportacion.objects.update(estado='en_proceso', fecha_actualizacion=hace)
+        call_command('procesar_importaciones', una_vez=True, stdout=StringIO())
+        trabajo = TrabajoImportacion.objects.get()
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertIn('Sin avance', trabajo.mensaje)
+
+    def test_rechaza_archivos_no_admitidos(self):
+        archivo = SimpleUploadedFile('datos.txt', b'a,b')
+        response = self.client.post(reverse('dashboard:importaciones'), {'archivo': archivo, 'tipo': 'edp'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(TrabajoImportacion.objects.exists())
+
+
+class ProyectoDetalleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyecto = crear_proyecto('P1', Empresa.objects.create(nombre='Cliente'), actividades=5, nocs=4)
+        self.url = reverse('dashboard:proyecto_detalle', args=[self.proyecto.id])
+
+    def test_conteos_agrupados_y_fragmentos_en_cache(self):
+        with self.assertNumQueries(6):  # versión, proyecto, 2 GROUP BY y 2 tablas
+            response = self.client.get(self.url)
+        self.assertEqual(
+            (response.context['total_actividades'], response.context['act_completadas'],
+             response.context['act_pendientes'], response.context['total_noc'], response.context['noc_abiertas']),
+            (5, 2, 3, 4, 2),
+        )
+        self.assertContains(response, 'NOC-3')
+
+        with self.assertNumQueries(2):  # versión y proyecto
+            response = self.client.get(self.url)
+        self.assertContains(response, 'NOC-3')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NoConformidad.objects.filter(codigo='NOC-3').update(codigo='NOC-X', estado='cerrada')
+            NoConformidad.objects.get(codigo='NOC-X').save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'NOC-X')
+        self.assertEqual(response.context['noc_cerradas'], 2)
+
+
+class GraficoAvanceTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa = Empresa.objects.create(nombre='Cliente')
+            otra = Empresa.objects.create(nombre='Otra')
+            for codigo, avance, empresa in (('A', 100, self.empresa), ('B', 35, self.empresa), ('C', 5, otra), ('D', 60, otra)):
+                proyecto = crear_proyecto(codigo, empresa)
+                CuadroControl.objects.filter(proyecto=proyecto).update(avance_global=avance)
+        self.url = reverse('dashboard:grafico_avance')
+
+    def test_top_resto_y_filtros(self):
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get(self.url, {'limite': 2}).json()
+        self.assertEqual(len(consultas), 3)  # versión de datos, top y resto
+        self.assertEqual((datos['labels'], datos['values']), (['A', 'D'], [100.0, 60.0]))
+        self.assertEqual(datos['resto'], {'proyectos': 2, 'avance_promedio': 20.0})
+
+        datos = self.client.get(self.url, {'orden': 'menor', 'empresa': self.empresa.id}).json()
+        self.assertEqual(datos['labels'], ['B', 'A'])
+        self.assertEqual(self.client.get(self.url, {'estado': 'finalizado'}).json()['labels'], [])
+        self.assertEqual(self.client.get(self.url, {'limite': 'x'}).status_code, 400)
+
+    def test_tramos(self):
+        datos = self.client.get(self.url, {'modo': 'tramos', 'ancho': 25}).json()
+        self.assertEqual(datos['labels'], ['0–25%', '25–50%', '50–75%', '75–100%'])
+        self.assertEqual(datos['values'], [1, 1, 1, 1])
+        self.assertEqual(datos['sin_datos'], 0)
+
+    def test_get_condicional_y_pagina_sin_datos(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            control = CuadroControl.objects.get(proyecto__codigo='C')
+            control.avance_global = 90
+            control.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        pagina = self.client.get(reverse('dashboard:dashboard'))
+        self.assertNotContains(pagina, 'chart-data')
+        self.assertContains(pagina, self.url)
+
+
+class AutocompletarTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Minera Norte', rut='76.000.001-1')
+        Empresa.objects.create(nombre='Constructora Sur', rut='77.000.002-2')
+        self.proyecto = crear_proyecto('MN-01', self.empresa)
+        crear_proyecto('OTRO', self.empresa)
+        self.usuario = User.objects.create(username='jperez', first_name='Juana', last_name='Pérez')
+        User.objects.create(username='inactivo', first_name='Juan', is_active=False)
+
+    def _sugerencias(self, tipo, **parametros):
+        response = self.client.get(reverse('dashboard:autocompletar', args=[tipo]), parametros)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_prefijo_en_varios_campos(self):
+        self.assertEqual(
+            self._sugerencias('proyectos', q='mn'), [{'id': self.proyecto.id, 'texto': 'MN-01 - Proyecto MN-01'}]
+        )
+        # Coincide por código y por nombre ("Proyecto ..."), sin repetir
+        self.assertEqual(len(self._sugerencias('proyectos', q='pro')), 2)
+        self.assertEqual(
+            [s['id'] for s in self._sugerencias('empresas', q='76.')], [self.empresa.id]
+        )
+        self.assertEqual(
+            self._sugerencias('usuarios', q='jua'), [{'id': self.usuario.id, 'texto': 'jperez - Juana - Pérez'}]
+        )
+        self.assertEqual(len(self._sugerencias('empresas', limite=1)), 1)
+        self.assertEqual(self.client.get(reverse('dashboard:autocompletar', args=['otro'])).status_code, 404)
+
+    def test_formularios_cargan_solo_el_valor_elegido(self):
+        actividad = self.proyecto.actividades.create(descripcion='Excavación', responsable=self.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('dashboard:actividad_editar', args=[actividad.id]))
+        self.assertEqual(response.context['proyecto_seleccionado']['id'], self.proyecto.id)
+        self.assertContains(response, 'jperez - Juana - Pérez')
+        self.assertNotContains(response, 'OTRO')
+        self.assertFalse(any('"users_user"' in q['sql'] and 'is_active' in q['sql'] for q in consultas))
+
+        response = self.client.get(reverse('dashboard:proyecto_editar', args=[self.proyecto.id]))
+        self.assertEqual(response.context['cliente_seleccionado']['texto'], 'Minera Norte - 76.000.001-1')
+        self.assertEqual(self.client.get(reverse('dashboard:noc_crear_proyecto', args=[999])).status_code, 404)
+
+    def test_post_con_error_conserva_lo_escrito(self):
+        datos = {
+            'codigo': 'NUEVO & Cía', 'nombre': 'Planta', 'cliente': 'abc', 'responsable': str(self.usuario.id),
+            'fecha_inicio': '2025-03-01', 'estado': 'suspendido',
+        }
+        response = self.client.post(reverse('dashboard:proyecto_crear'), datos)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['cliente_seleccionado'])
+        self.assertEqual(response.context['responsable_seleccionado']['id'], self.usuario.id)
+        self.assertContains(response, 'value="NUEVO &amp; Cía"')
+        self.assertContains(response, 'value="2025-03-01"')
+        self.assertContains(response, '<option value="suspendido" selected>')
+
+        actividad = self.proyecto.actividades.create(descripcion='Excavación', avance=10)
+        response = self.client.get(reverse('dashboard:actividad_editar', args=[actividad.id]))
+        self.assertEqual(response.context['valores']['avance'], '10.00')
+        response = self.client.post(reverse('dashboard:actividad_editar', args=[actividad.id]), {
+            'proyecto': 'x', 'descripcion': 'Relleno', 'avance': '55', 'estado': 'atrasada',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['proyecto_seleccionado'])
+        self.assertContains(response, '>Relleno</textarea>')
+        self.assertContains(response, 'value="55"')
@@ -6,6 +6,9 @@ app_name = 'dashboard'
 urlpatterns = [
     # Dashboard principal
     path('', views.dashboard, name='dashboard'),
+    path('api/kpis/', views.kpis_api, name='kpis_api'),
+    path('api/grafico-avance/', views.grafico_avance, name='grafico_avance'),
+    path('buscar/', views.buscar, name='buscar'),
     
     # Proyectos
     path('proyectos/', views.proyectos_lista, name='proyectos_lista'),
@@ -32,4 +35,11 @@ urlpatterns = [
     path('noc/crear/<int:proyecto_id>/', views.noc_crear, name='noc_crear_proyecto'),
     path('noc/<int:noc_id>/editar/', views.noc_editar, name='noc_editar'),
     path('noc/<int:noc_id>/eliminar/', views.noc_eliminar, name='noc_eliminar'),
+
+    # Importaciones
+    path('importaciones/', views.importaciones, name='importaciones'),
+    path('api/importaciones/<int:trabajo_id>/', views.importacion_progreso, name='importacion_progreso'),
+
+    # Autocompletar (proyectos, empresas, usuarios)
+    path('api/autocompletar/<slug:tipo>/', views.autocompletar, name='autocompletar'),
 ]
@@ -1,56 +1,113 @@
+from decimal import Decimal
+from urllib.parse import urlencode
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Count, Avg, Q
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.views.generic import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from proyectos.models import Proyecto, CuadroControl
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from proyectos.importacion.lectura import EXTENSIONES_ARCHIVO
+from proyectos.models import Proyecto, CuadroControl, TrabajoImportacion
+from proyectos.versiones import condicional, obtener as obtener_version
+from actividades.estadisticas import estadisticas_globales
 from actividades.models import Actividad
 from noc.models import NoConformidad
-from empresas.models import Empresa
-from users.models import User
+from empresas.models import Empresa, ResumenEmpresa
+from busqueda.indice import buscar as buscar_indice, cargar, ids_coincidentes
+from busqueda.models import TerminoBusqueda
+from .autocompletar import FUENTES as FUENTES_AUTOCOMPLETAR, LIMITE_MAXIMO, LIMITE_POR_DEFECTO, seleccionado, sugerencias
+from . import graficos
+from .kpis import calcular_kpis
+from .paginacion import PaginaCursor, contar
 
 
+@condicional()
 def dashboard(request):
-    proyectos = Proyecto.objects.all().select_related('control')
-    total_proyectos = proyectos.count()
-    proyectos_finalizados = proyectos.filter(estado='finalizado').count()
-    proyectos_activos = proyectos.filter(estado='en_ejecucion').count()
-
-    actividades = Actividad.objects.all()
-    total_actividades = actividades.count()
-    completadas = actividades.filter(estado='completada').count()
-    avance_promedio = actividades.aggregate(Avg('avance'))['avance__avg'] or 0
-
-    noc_abiertas = NoConformidad.objects.filter(estado='abierta').count()
-    noc_proceso = NoConformidad.objects.filter(estado='en_proceso').count()
-    noc_cerradas = NoConformidad.objects.filter(estado='cerrada').count()
-
-    data_chart = {
-        "labels": [p.codigo for p in proyectos],
-        "values": [float(p.control.avance_global) if hasattr(p, 'control') else 0 for p in proyectos],
-    }
+    kpis = calcular_kpis()
 
-    context = {
-        "total_proyectos": total_proyectos,
-        "proyectos_activos": proyectos_activos,
-        "proyectos_finalizados": proyectos_finalizados,
-        "total_actividades": total_actividades,
-        "completadas": completadas,
-        "avance_promedio": round(avance_promedio, 2),
-        "noc_abiertas": noc_abiertas,
-        "noc_proceso": noc_proceso,
-        "noc_cerradas": noc_cerradas,
-        "chart": data_chart,
-    }
+    # El gráfico se pide aparte a grafico_avance una vez cargada la página
+    context = kpis.as_dict()
+    context["avance_ponderado"] = settings.EDP_AVANCE_PONDERADO
+    context["estados"] = Proyecto.ESTADO_CHOICES
     return render(request, "dashboard/dashboard.html", context)
 
 
+@api_view(['GET'])
+@condicional()
+def grafico_avance(request):
+    """
+    Datos del gráfico de avance por proyecto, filtrables por ``estado`` y ``empresa``.
+
+    ``modo=top`` (por defecto) entrega los ``limite`` proyectos de mayor avance
+    (``orden=menor`` para los de menor avance) y un resumen del resto;
+    ``modo=tramos`` entrega cuántos proyectos hay en cada tramo de ``ancho`` %.
+    Responde 304 si los datos no cambiaron desde la copia del cliente.
+    """
+    parametros = request.query_params
+    empresa = parametros.get('empresa', '')
+    if empresa and not empresa.isdigit():
+        return Response({'detail': 'El id de empresa debe ser un número.'}, status=400)
+    try:
+        limite = int(parametros.get('limite', graficos.LIMITE_POR_DEFECTO))
+        ancho = int(parametros.get('ancho', graficos.ANCHO_POR_DEFECTO))
+    except ValueError:
+        return Response({'detail': 'limite y ancho deben ser números.'}, status=400)
+
+    proyectos = graficos.proyectos_filtrados(parametros.get('estado', ''), empresa)
+    if parametros.get('modo') == 'tramos':
+        datos = graficos.avance_por_tramos(proyectos, min(max(ancho, 1), 100))
+    else:
+        datos = graficos.avance_por_proyecto(
+            proyectos, min(max(limite, 1), graficos.LIMITE_MAXIMO), parametros.get('orden') != 'menor',
+        )
+    return Response(datos)
+
+
+@api_view(['GET'])
+@condicional()
+def kpis_api(request):
+    """KPIs globales del dashboard en formato JSON"""
+    return Response(calcular_kpis().as_dict())
+
+
+PROYECTOS_ORDEN = {
+    'codigo': 'codigo',
+    'nombre': 'nombre',
+    'fecha_inicio': 'fecha_inicio',
+    'actividades': 'total_actividades',
+    'completadas': 'actividades_completadas',
+    'noc': 'total_noc',
+    'noc_abiertas': 'noc_abiertas',
+    'avance': 'avance_global',
+}
+
+
+def _conteo_por_proyecto(queryset, **filtros) -> Coalesce:
+    """Subconsulta correlacionada que cuenta las filas del queryset por proyecto."""
+    conteo = (
+        queryset.filter(proyecto=OuterRef('pk'), **filtros)
+        .order_by()
+        .values('proyecto')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(conteo), 0)
+
+
 def proyectos_lista(request):
-    """Lista de todos los proyectos con filtros"""
+    """Lista de todos los proyectos con filtros, orden y paginación"""
     estado_filter = request.GET.get('estado', '')
     search = request.GET.get('search', '')
+    orden = request.GET.get('orden', '')
     
-    proyectos = Proyecto.objects.all().select_related('cliente', 'responsable', 'control')
+    proyectos = Proyecto.objects.all().select_related('cliente', 'responsable')
     
     # Filtros
     if estado_filter:
@@ -58,61 +115,91 @@ def proyectos_lista(request):
     
     if search:
         proyectos = proyectos.filter(
-            Q(codigo__icontains=search) | 
-            Q(nombre__icontains=search) |
-            Q(cliente__nombre__icontains=search)
+            Q(id__in=ids_coincidentes(search, 'proyecto')) |
+            Q(cliente_id__in=ids_coincidentes(search, 'empresa'))
         )
     
-    # Agregar estadísticas por proyecto
-    proyectos_data = []
-    for proyecto in proyectos:
-        total_act = proyecto.actividades.count()
-        completadas = proyecto.actividades.filter(estado='completada').count()
-        total_noc = proyecto.noc.count()
-        noc_abiertas = proyecto.noc.filter(estado='abierta').count()
-        avance = proyecto.control.avance_global if hasattr(proyecto, 'control') else 0
-        
-        proyectos_data.append({
-            'proyecto': proyecto,
-            'total_actividades': total_act,
-            'actividades_completadas': completadas,
-            'total_noc': total_noc,
-            'noc_abiertas': noc_abiertas,
-            'avance_global': avance,
-        })
+    # Estadísticas por proyecto calculadas en la misma consulta
+    proyectos = proyectos.annotate(
+        total_actividades=_conteo_por_proyecto(Actividad.objects.all()),
+        actividades_completadas=_conteo_por_proyecto(Actividad.objects.all(), estado='completada'),
+        total_noc=_conteo_por_proyecto(NoConformidad.objects.all()),
+        noc_abiertas=_conteo_por_proyecto(NoConformidad.objects.all(), estado='abierta'),
+        avance_global=Coalesce(F('control__avance_global'), Value(Decimal('0'))),
+    )
+    
+    # Orden (por defecto el de Meta.ordering)
+    campo_orden = PROYECTOS_ORDEN.get(orden.lstrip('-'))
+    if campo_orden:
+        prefijo = '-' if orden.startswith('-') else ''
+        proyectos = proyectos.order_by(f'{prefijo}{campo_orden}', 'id')
+    else:
+        orden = ''
+        proyectos = proyectos.order_by('-fecha_inicio', 'id')
+    
+    # Paginación
+    paginator = Paginator(proyectos, 20)  # 20 proyectos por página
+    page_obj = paginator.get_page(request.GET.get('page', 1))
     
     context = {
-        'proyectos_data': proyectos_data,
+        'page_obj': page_obj,
         'estado_filter': estado_filter,
         'search': search,
+        'orden': orden,
         'estados': Proyecto.ESTADO_CHOICES,
+        'filtros_query': urlencode({
+            clave: valor for clave, valor in
+            (('estado', estado_filter), ('search', search), ('orden', orden)) if valor
+        }),
     }
     return render(request, "dashboard/proyectos_lista.html", context)
 
 
+def _conteos_por_estado(proyecto_id, version) -> dict:
+    """
+    Actividades y NOC del proyecto por estado: un GROUP BY estado por tabla,
+    guardado en la caché bajo la versión de datos del proyecto.
+    """
+    clave = f'proyecto:{proyecto_id}:estados:{version}:{settings.EDP_VERSION_CODIGO}'
+    conteos = cache.get(clave)
+    if conteos is None:
+        conteos = {
+            modelo._meta.model_name: dict(
+                modelo.objects.filter(proyecto_id=proyecto_id).order_by()
+                .values('estado').annotate(n=Count('id')).values_list('estado', 'n')
+            )
+            for modelo in (Actividad, NoConformidad)
+        }
+        cache.set(clave, conteos, settings.EDP_DETALLE_TIMEOUT)
+    return conteos
+
+
+@condicional('proyecto_id')
 def proyecto_detalle(request, proyecto_id):
     """Detalle completo de un proyecto"""
     proyecto = get_object_or_404(
         Proyecto.objects.select_related('cliente', 'responsable', 'control'),
         id=proyecto_id
     )
-    
-    # Actividades del proyecto
+    version = getattr(request, 'version_datos', None)
+    if version is None:
+        version = obtener_version(proyecto.id)[1]
+    
+    # Estadísticas de actividades y NOC (en caché hasta que cambie el proyecto)
+    conteos = _conteos_por_estado(proyecto.id, version)
+    por_estado = conteos['actividad']
+    act_completadas = por_estado.get('completada', 0)
+    act_en_ejecucion = por_estado.get('en_ejecucion', 0)
+    act_pendientes = por_estado.get('pendiente', 0)
+    act_atrasadas = por_estado.get('atrasada', 0)
+    por_estado = conteos['noconformidad']
+    noc_abiertas = por_estado.get('abierta', 0)
+    noc_proceso = por_estado.get('en_proceso', 0)
+    noc_cerradas = por_estado.get('cerrada', 0)
+    
+    # Las tablas se consultan solo si su fragmento no está en la caché
     actividades = proyecto.actividades.all().select_related('responsable').order_by('-fecha_programada')
-    
-    # Estadísticas de actividades
-    total_actividades = actividades.count()
-    act_completadas = actividades.filter(estado='completada').count()
-    act_en_ejecucion = actividades.filter(estado='en_ejecucion').count()
-    act_pendientes = actividades.filter(estado='pendiente').count()
-    act_atrasadas = actividades.filter(estado='atrasada').count()
-    
-    # No conformidades
     nocs = proyecto.noc.all().select_related('responsable').order_by('-fecha_detectada')
-    total_noc = nocs.count()
-    noc_abiertas = nocs.filter(estado='abierta').count()
-    noc_proceso = nocs.filter(estado='en_proceso').count()
-    noc_cerradas = nocs.filter(estado='cerrada').count()
     
     # Gráfico de actividades por estado
     chart_actividades = {
@@ -131,33 +218,34 @@ def proyecto_detalle(request, proyecto_id):
     context = {
         'proyecto': proyecto,
         'actividades': actividades[:20],  # Últimas 20 actividades
-        'total_actividades': total_actividades,
+        'total_actividades': sum(conteos['actividad'].values()),
         'act_completadas': act_completadas,
         'act_en_ejecucion': act_en_ejecucion,
         'act_pendientes': act_pendientes,
         'act_atrasadas': act_atrasadas,
         'nocs': nocs[:10],  # Últimas 10 NOC
-        'total_noc': total_noc,
+        'total_noc': sum(conteos['noconformidad'].values()),
         'noc_abiertas': noc_abiertas,
         'noc_proceso': noc_proceso,
         'noc_cerradas': noc_cerradas,
         'chart_actividades': chart_actividades,
         'chart_noc': chart_noc,
+        'version_datos': version,
+        'version_codigo': settings.EDP_VERSION_CODIGO,
+        'detalle_timeout': settings.EDP_DETALLE_TIMEOUT,
     }
     return render(request, "dashboard/proyecto_detalle.html", context)
 
 
 def actividades_lista(request):
     """Lista de todas las actividades con filtros y paginación"""
-    from django.core.paginator import Paginator
-    
     # Filtros
     estado_filter = request.GET.get('estado', '')
     proyecto_filter = request.GET.get('proyecto', '')
     search = request.GET.get('search', '')
     
     # Query base
-    actividades = Actividad.objects.all().select_related('proyecto', 'responsable').order_by('-fecha_programada')
+    actividades = Actividad.objects.all().select_related('proyecto', 'responsable').order_by('-fecha_programada', '-id')
     
     # Aplicar filtros
     if estado_filter:
@@ -168,26 +256,25 @@ def actividades_lista(request):
     
     if search:
         actividades = actividades.filter(
-            Q(item__icontains=search) | 
-            Q(descripcion__icontains=search) |
-            Q(proyecto__codigo__icontains=search)
+            Q(id__in=ids_coincidentes(search, 'actividad')) |
+            Q(proyecto_id__in=ids_coincidentes(search, 'proyecto'))
         )
     
-    # Estadísticas generales
-    total_actividades = Actividad.objects.count()
-    completadas = Actividad.objects.filter(estado='completada').count()
-    en_ejecucion = Actividad.objects.filter(estado='en_ejecucion').count()
-    pendientes = Actividad.objects.filter(estado='pendiente').count()
-    atrasadas = Actividad.objects.filter(estado='atrasada').count()
-    avance_promedio = Actividad.objects.aggregate(Avg('avance'))['avance__avg'] or 0
+    # Estadísticas generales (desde la caché; se invalidan al cambiar actividades)
+    estadisticas = estadisticas_globales()
     
     # Estadísticas filtradas
-    total_filtradas = actividades.count()
+    total_filtradas, total_exacto = contar(actividades, settings.EDP_CONTEO_APROXIMADO)
     
-    # Paginación
-    paginator = Paginator(actividades, 20)  # 20 actividades por página
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Paginación: por cursor (keyset) o por número de página
+    if settings.EDP_ACTIVIDADES_CURSOR:
+        page_obj = PaginaCursor(
+            actividades, 20, despues=request.GET.get('despues'), antes=request.GET.get('antes'),
+        )
+    else:
+        paginator = Paginator(actividades, 20)  # 20 actividades por página
+        page_number = request.GET.get('page', 1)
+        page_obj = paginator.get_page(page_number)
     
     # Proyectos para el filtro
     proyectos = Proyecto.objects.all().order_by('codigo')
@@ -195,19 +282,27 @@ def actividades_lista(request):
     # Gráfico de actividades por estado
     chart_data = {
         'labels': ['Completadas', 'En Ejecución', 'Pendientes', 'Atrasadas'],
-        'values': [completadas, en_ejecucion, pendientes, atrasadas],
+        'values': [
+            estadisticas.completadas, estadisticas.en_ejecucion, estadisticas.pendientes, estadisticas.atrasadas,
+        ],
         'colors': ['#28a745', '#007bff', '#ffc107', '#dc3545']
     }
     
     context = {
         'page_obj': page_obj,
-        'total_actividades': total_actividades,
-        'completadas': completadas,
-        'en_ejecucion': en_ejecucion,
-        'pendientes': pendientes,
-        'atrasadas': atrasadas,
-        'avance_promedio': round(avance_promedio, 2),
+        'total_actividades': estadisticas.total,
+        'completadas': estadisticas.completadas,
+        'en_ejecucion': estadisticas.en_ejecucion,
+        'pendientes': estadisticas.pendientes,
+        'atrasadas': estadisticas.atrasadas,
+        'avance_promedio': estadisticas.avance_promedio,
         'total_filtradas': total_filtradas,
+        'total_exacto': total_exacto,
+        'paginacion_cursor': settings.EDP_ACTIVIDADES_CURSOR,
+        'filtros_query': urlencode({
+            clave: valor for clave, valor in
+            (('estado', estado_filter), ('proyecto', proyecto_filter), ('search', search)) if valor
+        }),
         'estado_filter': estado_filter,
         'proyecto_filter': proyecto_filter,
         'search': search,
@@ -218,34 +313,87 @@ def actividades_lista(request):
     return render(request, "dashboard/actividades_lista.html", context)
 
 
+def buscar(request):
+    """Búsqueda global en empresas, proyectos, actividades y NOC, ordenada por relevancia"""
+    consulta = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo', '')
+    tipos = dict(TerminoBusqueda.TIPO_CHOICES)
+
+    # Una consulta agrupada por página y luego una por tipo para cargar los objetos
+    paginator = Paginator(buscar_indice(consulta, [tipo] if tipo in tipos else None), 20)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    resultados = [
+        {**resultado, 'tipo_nombre': tipos[resultado['tipo']]} for resultado in cargar(page_obj.object_list)
+    ]
+
+    context = {
+        'page_obj': page_obj,
+        'resultados': resultados,
+        'q': consulta,
+        'tipo': tipo,
+        'tipos': TerminoBusqueda.TIPO_CHOICES,
+        'filtros_query': urlencode({clave: valor for clave, valor in (('q', consulta), ('tipo', tipo)) if valor}),
+    }
+    return render(request, "dashboard/buscar.html", context)
+
+
 # ==================== CRUD PROYECTOS ====================
 
+CAMPOS_PROYECTO = ('codigo', 'nombre', 'cliente', 'responsable', 'supervisor', 'fecha_inicio', 'fecha_termino', 'estado')
+CAMPOS_ACTIVIDAD = (
+    'proyecto', 'item', 'descripcion', 'responsable', 'fecha_programada', 'fecha_real', 'avance', 'estado',
+    'observaciones',
+)
+CAMPOS_NOC = (
+    'proyecto', 'codigo', 'descripcion', 'responsable', 'fecha_detectada', 'fecha_cierre', 'estado',
+    'accion_correctiva',
+)
+
+
+def _valores_formulario(request, objeto, campos) -> dict:
+    """
+    Valores con que se llena un formulario: tras un POST con error, lo que
+    escribió el usuario; si no, los guardados en ``objeto`` (ids para las FK).
+    """
+    if request.method == 'POST':
+        return {campo: request.POST.get(campo, '') for campo in campos}
+    if objeto is None:
+        return {}
+    valores = {}
+    for campo in campos:
+        valor = getattr(objeto, objeto._meta.get_field(campo).attname)
+        valores[campo] = '' if valor is None else valor.isoformat() if hasattr(valor, 'isoformat') else str(valor)
+    return valores
+
+
 def proyecto_crear(request):
     """Crear nuevo proyecto"""
     if request.method == 'POST':
         try:
-            proyecto = Proyecto.objects.create(
-                codigo=request.POST['codigo'],
-                nombre=request.POST['nombre'],
-                cliente_id=request.POST['cliente'],
-                responsable_id=request.POST['responsable'],
-                supervisor=request.POST.get('supervisor', ''),
-                fecha_inicio=request.POST['fecha_inicio'],
-                fecha_termino=request.POST.get('fecha_termino') or None,
-                estado=request.POST['estado']
-            )
-            # Crear cuadro de control
-            CuadroControl.objects.create(proyecto=proyecto)
+            with transaction.atomic():
+                proyecto = Proyecto.objects.create(
+                    codigo=request.POST['codigo'],
+                    nombre=request.POST['nombre'],
+                    cliente_id=request.POST['cliente'],
+                    responsable_id=request.POST['responsable'],
+                    supervisor=request.POST.get('supervisor', ''),
+                    fecha_inicio=request.POST['fecha_inicio'],
+                    fecha_termino=request.POST.get('fecha_termino') or None,
+                    estado=request.POST['estado']
+                )
+                # Crear cuadro de control
+                CuadroControl.objects.create(proyecto=proyecto)
             messages.success(request, f'Proyecto {proyecto.codigo} creado exitosamente.')
             return redirect('dashboard:proyecto_detalle', proyecto_id=proyecto.id)
         except Exception as e:
             messages.error(request, f'Error al crear proyecto: {e}')
     
-    empresas = Empresa.objects.all()
-    usuarios = User.objects.filter(is_active=True)
+    # Solo el valor elegido; las opciones se piden a los endpoints de autocompletar
+    valores = _valores_formulario(request, None, CAMPOS_PROYECTO)
     context = {
-        'empresas': empresas,
-        'usuarios': usuarios,
+        'valores': valores,
+        'cliente_seleccionado': seleccionado('empresas', valores.get('cliente')),
+        'responsable_seleccionado': seleccionado('usuarios', valores.get('responsable')),
         'estados': Proyecto.ESTADO_CHOICES,
     }
     return render(request, 'dashboard/proyecto_form.html', context)
@@ -257,26 +405,27 @@ def proyecto_editar(request, proyecto_id):
     
     if request.method == 'POST':
         try:
-            proyecto.codigo = request.POST['codigo']
-            proyecto.nombre = request.POST['nombre']
-            proyecto.cliente_id = request.POST['cliente']
-            proyecto.responsable_id = request.POST['responsable']
-            proyecto.supervisor = request.POST.get('supervisor', '')
-            proyecto.fecha_inicio = request.POST['fecha_inicio']
-            proyecto.fecha_termino = request.POST.get('fecha_termino') or None
-            proyecto.estado = request.POST['estado']
-            proyecto.save()
+            with transaction.atomic():
+                proyecto.codigo = request.POST['codigo']
+                proyecto.nombre = request.POST['nombre']
+                proyecto.cliente_id = request.POST['cliente']
+                proyecto.responsable_id = request.POST['responsable']
+                proyecto.supervisor = request.POST.get('supervisor', '')
+                proyecto.fecha_inicio = request.POST['fecha_inicio']
+                proyecto.fecha_termino = request.POST.get('fecha_termino') or None
+                proyecto.estado = request.POST['estado']
+                proyecto.save()
             messages.success(request, f'Proyecto {proyecto.codigo} actualizado exitosamente.')
             return redirect('dashboard:proyecto_detalle', proyecto_id=proyecto.id)
         except Exception as e:
             messages.error(request, f'Error al actualizar proyecto: {e}')
     
-    empresas = Empresa.objects.all()
-    usuarios = User.objects.filter(is_active=True)
+    valores = _valores_formulario(request, proyecto, CAMPOS_PROYECTO)
     context = {
         'proyecto': proyecto,
-        'empresas': empresas,
-        'usuarios': usuarios,
+        'valores': valores,
+        'cliente_seleccionado': seleccionado('empresas', valores['cliente']),
+        'responsable_seleccionado': seleccionado('usuarios', valores['responsable']),
         'estados': Proyecto.ESTADO_CHOICES,
     }
     return render(request, 'dashboard/proyecto_form.html', context)
@@ -302,37 +451,38 @@ def actividad_crear(request, proyecto_id=None):
     """Crear nueva actividad"""
     if request.method == 'POST':
         try:
-            actividad = Actividad.objects.create(
-                proyecto_id=request.POST['proyecto'],
-                item=request.POST.get('item', ''),
-                descripcion=request.POST['descripcion'],
-                responsable_id=request.POST.get('responsable') or None,
-                fecha_programada=request.POST.get('fecha_programada') or None,
-                fecha_real=request.POST.get('fecha_real') or None,
-                avance=request.POST.get('avance', 0),
-                estado=request.POST['estado'],
-                observaciones=request.POST.get('observaciones', '')
-            )
-            # Actualizar cuadro de control
-            if hasattr(actividad.proyecto, 'control'):
-                actividad.proyecto.control.actualizar()
+            with transaction.atomic():
+                actividad = Actividad.objects.create(
+                    proyecto_id=request.POST['proyecto'],
+                    item=request.POST.get('item', ''),
+                    descripcion=request.POST['descripcion'],
+                    responsable_id=request.POST.get('responsable') or None,
+                    fecha_programada=request.POST.get('fecha_programada') or None,
+                    fecha_real=request.POST.get('fecha_real') or None,
+                    avance=request.POST.get('avance', 0),
+                    estado=request.POST['estado'],
+                    observaciones=request.POST.get('observaciones', '')
+                )
+                # Actualizar cuadro de control (incremental)
+                CuadroControl.registrar_cambio(
+                    actividad.proyecto_id, estado_nuevo=actividad.estado, montos_nuevos=actividad.montos(),
+                )
             
             messages.success(request, 'Actividad creada exitosamente.')
-            return redirect('dashboard:proyecto_detalle', proyecto_id=actividad.proyecto.id)
+            return redirect('dashboard:proyecto_detalle', proyecto_id=actividad.proyecto_id)
         except Exception as e:
             messages.error(request, f'Error al crear actividad: {e}')
     
-    proyectos = Proyecto.objects.all()
-    usuarios = User.objects.filter(is_active=True)
-    proyecto_seleccionado = None
-    if proyecto_id:
-        proyecto_seleccionado = get_object_or_404(Proyecto, id=proyecto_id)
+    valores = _valores_formulario(request, None, CAMPOS_ACTIVIDAD)
+    proyecto_seleccionado = seleccionado('proyectos', valores.get('proyecto') or proyecto_id)
+    if proyecto_id and proyecto_seleccionado is None:
+        raise Http404('Proyecto no encontrado')
     
     context = {
-        'proyectos': proyectos,
-        'usuarios': usuarios,
+        'valores': valores,
         'estados': Actividad.ESTADO_CHOICES,
         'proyecto_seleccionado': proyecto_seleccionado,
+        'responsable_seleccionado': seleccionado('usuarios', valores.get('responsable')),
     }
     return render(request, 'dashboard/actividad_form.html', context)
 
@@ -342,33 +492,45 @@ def actividad_editar(request, actividad_id):
     actividad = get_object_or_404(Actividad, id=actividad_id)
     
     if request.method == 'POST':
+        proyecto_anterior, estado_anterior = actividad.proyecto_id, actividad.estado
+        montos_anteriores = actividad.montos()
         try:
-            actividad.proyecto_id = request.POST['proyecto']
-            actividad.item = request.POST.get('item', '')
-            actividad.descripcion = request.POST['descripcion']
-            actividad.responsable_id = request.POST.get('responsable') or None
-            actividad.fecha_programada = request.POST.get('fecha_programada') or None
-            actividad.fecha_real = request.POST.get('fecha_real') or None
-            actividad.avance = request.POST.get('avance', 0)
-            actividad.estado = request.POST['estado']
-            actividad.observaciones = request.POST.get('observaciones', '')
-            actividad.save()
+            with transaction.atomic():
+                actividad.proyecto_id = request.POST['proyecto']
+                actividad.item = request.POST.get('item', '')
+                actividad.descripcion = request.POST['descripcion']
+                actividad.responsable_id = request.POST.get('responsable') or None
+                actividad.fecha_programada = request.POST.get('fecha_programada') or None
+                actividad.fecha_real = request.POST.get('fecha_real') or None
+                actividad.avance = request.POST.get('avance', 0)
+                actividad.estado = request.POST['estado']
+                actividad.observaciones = request.POST.get('observaciones', '')
+                actividad.save()
             
-            # Actualizar cuadro de control
-            if hasattr(actividad.proyecto, 'control'):
-                actividad.proyecto.control.actualizar()
+                # Actualizar cuadro de control (incremental)
+                if str(proyecto_anterior) == str(actividad.proyecto_id):
+                    CuadroControl.registrar_cambio(
+                        proyecto_anterior, estado_anterior, actividad.estado, montos_anteriores, actividad.montos(),
+                    )
+                else:
+                    CuadroControl.registrar_cambio(
+                        proyecto_anterior, estado_anterior=estado_anterior, montos_anteriores=montos_anteriores,
+                    )
+                    CuadroControl.registrar_cambio(
+                        actividad.proyecto_id, estado_nuevo=actividad.estado, montos_nuevos=actividad.montos(),
+                    )
             
             messages.success(request, 'Actividad actualizada exitosamente.')
-            return redirect('dashboard:proyecto_detalle', proyecto_id=actividad.proyecto.id)
+            return redirect('dashboard:proyecto_detalle', proyecto_id=actividad.proyecto_id)
         except Exception as e:
             messages.error(request, f'Error al actualizar actividad: {e}')
     
-    proyectos = Proyecto.objects.all()
-    usuarios = User.objects.filter(is_active=True)
+    valores = _valores_formulario(request, actividad, CAMPOS_ACTIVIDAD)
     context = {
         'actividad': actividad,
-        'proyectos': proyectos,
-        'usuarios': usuarios,
+        'valores': valores,
+        'proyecto_seleccionado': seleccionado('proyectos', valores['proyecto']),
+        'responsable_seleccionado': seleccionado('usuarios', valores['responsable']),
         'estados': Actividad.ESTADO_CHOICES,
     }
     return render(request, 'dashboard/actividad_form.html', context)
@@ -377,14 +539,14 @@ def actividad_editar(request, actividad_id):
 def actividad_eliminar(request, actividad_id):
     """Eliminar actividad"""
     actividad = get_object_or_404(Actividad, id=actividad_id)
-    proyecto_id = actividad.proyecto.id
+    proyecto_id = actividad.proyecto_id
     
     if request.method == 'POST':
-        actividad.delete()
-        # Actualizar cuadro de control
-        proyecto = Proyecto.objects.get(id=proyecto_id)
-        if hasattr(proyecto, 'control'):
-            proyecto.control.actualizar()
+        estado, montos = actividad.estado, actividad.montos()
+        with transaction.atomic():
+            actividad.delete()
+            # Actualizar cuadro de control (incremental)
+            CuadroControl.registrar_cambio(proyecto_id, estado_anterior=estado, montos_anteriores=montos)
         
         messages.success(request, 'Actividad eliminada exitosamente.')
         return redirect('dashboard:proyecto_detalle', proyecto_id=proyecto_id)
@@ -450,21 +612,22 @@ def empresa_eliminar(request, empresa_id):
 def empresas_lista(request):
     """Lista de empresas"""
     search = request.GET.get('search', '')
-    empresas = Empresa.objects.all()
+    empresas = Empresa.objects.all().select_related('resumen')
     
     if search:
-        empresas = empresas.filter(
-            Q(nombre__icontains=search) | 
-            Q(rut__icontains=search)
-        )
+        empresas = empresas.filter(id__in=ids_coincidentes(search, 'empresa'))
     
-    # Agregar conteo de proyectos por empresa
+    # Conteos precalculados (ver empresas.resumen)
     empresas_data = []
     for empresa in empresas:
+        resumen = getattr(empresa, 'resumen', None) or ResumenEmpresa(empresa=empresa)
         empresas_data.append({
             'empresa': empresa,
-            'total_proyectos': empresa.proyectos.count(),
-            'proyectos_activos': empresa.proyectos.filter(estado='en_ejecucion').count(),
+            'total_proyectos': resumen.total_proyectos,
+            'proyectos_activos': resumen.proyectos_activos,
+            'total_actividades': resumen.total_actividades,
+            'actividades_completadas': resumen.actividades_completadas,
+            'noc_abiertas': resumen.noc_abiertas,
         })
     
     context = {
@@ -480,32 +643,32 @@ def noc_crear(request, proyecto_id=None):
     """Crear nueva no conformidad"""
     if request.method == 'POST':
         try:
-            noc = NoConformidad.objects.create(
-                proyecto_id=request.POST['proyecto'],
-                codigo=request.POST['codigo'],
-                descripcion=request.POST['descripcion'],
-                responsable_id=request.POST.get('responsable') or None,
-                fecha_detectada=request.POST['fecha_detectada'],
-                fecha_cierre=request.POST.get('fecha_cierre') or None,
-                estado=request.POST['estado'],
-                accion_correctiva=request.POST.get('accion_correctiva', '')
-            )
+            with transaction.atomic():
+                noc = NoConformidad.objects.create(
+                    proyecto_id=request.POST['proyecto'],
+                    codigo=request.POST['codigo'],
+                    descripcion=request.POST['descripcion'],
+                    responsable_id=request.POST.get('responsable') or None,
+                    fecha_detectada=request.POST['fecha_detectada'],
+                    fecha_cierre=request.POST.get('fecha_cierre') or None,
+                    estado=request.POST['estado'],
+                    accion_correctiva=request.POST.get('accion_correctiva', '')
+                )
             messages.success(request, f'NOC {noc.codigo} creada exitosamente.')
             return redirect('dashboard:proyecto_detalle', proyecto_id=noc.proyecto.id)
         except Exception as e:
             messages.error(request, f'Error al crear NOC: {e}')
     
-    proyectos = Proyecto.objects.all()
-    usuarios = User.objects.filter(is_active=True)
-    proyecto_seleccionado = None
-    if proyecto_id:
-        proyecto_seleccionado = get_object_or_404(Proyecto, id=proyecto_id)
+    valores = _valores_formulario(request, None, CAMPOS_NOC)
+    proyecto_seleccionado = seleccionado('proyectos', valores.get('proyecto') or proyecto_id)
+    if proyecto_id and proyecto_seleccionado is None:
+        raise Http404('Proyecto no encontrado')
     
     context = {
-        'proyectos': proyectos,
-        'usuarios': usuarios,
+        'valores': valores,
         'estados': NoConformidad.ESTADO_CHOICES,
         'proyecto_seleccionado': proyecto_seleccionado,
+        'responsable_seleccionado': seleccionado('usuarios', valores.get('responsable')),
     }
     return render(request, 'dashboard/noc_form.html', context)
 
@@ -516,26 +679,27 @@ def noc_editar(request, noc_id):
     
     if request.method == 'POST':
         try:
-            noc.proyecto_id = request.POST['proyecto']
-            noc.codigo = request.POST['codigo']
-            noc.descripcion = request.POST['descripcion']
-            noc.responsable_id = request.POST.get('responsable') or None
-            noc.fecha_detectada = request.POST['fecha_detectada']
-            noc.fecha_cierre = request.POST.get('fecha_cierre') or None
-            noc.estado = request.POST['estado']
-            noc.accion_correctiva = request.POST.get('accion_correctiva', '')
-            noc.save()
+            with transaction.atomic():
+                noc.proyecto_id = request.POST['proyecto']
+                noc.codigo = request.POST['codigo']
+                noc.descripcion = request.POST['descripcion']
+                noc.responsable_id = request.POST.get('responsable') or None
+                noc.fecha_detectada = request.POST['fecha_detectada']
+                noc.fecha_cierre = request.POST.get('fecha_cierre') or None
+                noc.estado = request.POST['estado']
+                noc.accion_correctiva = request.POST.get('accion_correctiva', '')
+                noc.save()
             messages.success(request, f'NOC {noc.codigo} actualizada exitosamente.')
             return redirect('dashboard:proyecto_detalle', proyecto_id=noc.proyecto.id)
         except Exception as e:
             messages.error(request, f'Error al actualizar NOC: {e}')
     
-    proyectos = Proyecto.objects.all()
-    usuarios = User.objects.filter(is_active=True)
+    valores = _valores_formulario(request, noc, CAMPOS_NOC)
     context = {
         'noc': noc,
-        'proyectos': proyectos,
-        'usuarios': usuarios,
+        'valores': valores,
+        'proyecto_seleccionado': seleccionado('proyectos', valores['proyecto']),
+        'responsable_seleccionado': seleccionado('usuarios', valores['responsable']),
         'estados': NoConformidad.ESTADO_CHOICES,
     }
     return render(request, 'dashboard/noc_form.html', context)
@@ -554,3 +718,55 @@ def noc_eliminar(request, noc_id):
     
     context = {'noc': noc}
     return render(request, 'dashboard/noc_confirm_delete.html', context)
+
+
+# ==================== IMPORTACIONES ====================
+
+def importaciones(request):
+    """Subir un archivo EDP; la importación la ejecuta el worker procesar_importaciones"""
+    if request.method == 'POST':
+        archivo = request.FILES.get('archivo')
+        tipo = request.POST.get('tipo', 'edp')
+        if not archivo or not archivo.name.lower().endswith(EXTENSIONES_ARCHIVO):
+            messages.error(request, f'Selecciona un archivo {", ".join(EXTENSIONES_ARCHIVO)}.')
+        elif tipo not in dict(TrabajoImportacion.TIPO_CHOICES):
+            messages.error(request, 'Tipo de importación no válido.')
+        else:
+            trabajo = TrabajoImportacion.objects.create(
+                archivo=archivo,
+                tipo=tipo,
+                codigo=request.POST.get('codigo', '').strip(),
+                creado_por=request.user if request.user.is_authenticated else None,
+            )
+            messages.success(request, f'Archivo {archivo.name} en cola (trabajo {trabajo.id}).')
+            return redirect('dashboard:importaciones')
+
+    context = {
+        'trabajos': TrabajoImportacion.objects.select_related('creado_por')[:20],
+        'tipos': TrabajoImportacion.TIPO_CHOICES,
+        'extensiones': ','.join(EXTENSIONES_ARCHIVO),
+    }
+    return render(request, 'dashboard/importaciones.html', context)
+
+
+@api_view(['GET'])
+def importacion_progreso(request, trabajo_id):
+    """Estado, filas procesadas, filas/s y errores de un trabajo de importación"""
+    trabajo = get_object_or_404(TrabajoImportacion, id=trabajo_id)
+    return Response(trabajo.as_dict())
+
+
+@api_view(['GET'])
+def autocompletar(request, tipo):
+    """
+    Sugerencias para los campos de proyecto, empresa y usuario de los formularios:
+    coincidencias por prefijo con ``?q=`` como [{id, texto}], a lo más ``limite``.
+    """
+    if tipo not in FUENTES_AUTOCOMPLETAR:
+        raise Http404('Tipo no válido')
+    try:
+        limite = int(request.query_params.get('limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        return Response({'detail': 'limite debe ser un número.'}, status=400)
+    limite = min(max(limite, 1), LIMITE_MAXIMO)
+    return Response(sugerencias(tipo, request.query_params.get('q', ''), limite))
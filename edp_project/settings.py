@@ -59,6 +59,7 @@ INSTALLED_APPS = [
     "proyectos",
     "actividades",
     "noc",
+    "busqueda",
     "dashboard",
 ]
 
@@ -161,6 +162,37 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Caché de Django: compartida entre procesos en producción (p. ej. redis://localhost:6379/1)
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# Segundos que se guardan las estadísticas globales de actividades (las señales las invalidan antes)
+EDP_ESTADISTICAS_TIMEOUT = env.int('EDP_ESTADISTICAS_TIMEOUT', default=3600)
+
+# Segundos que se guardan los conteos y tablas del detalle de proyecto; la clave
+# incluye la versión de datos del proyecto, así que un cambio los deja obsoletos antes
+EDP_DETALLE_TIMEOUT = env.int('EDP_DETALLE_TIMEOUT', default=86400)
+
+# Versión del código desplegado (p. ej. el commit o el tag del release): forma parte
+# de los ETag y de las claves de caché del dashboard, así tras un despliegue no se
+# sirven respuestas ni fragmentos generados por la versión anterior
+EDP_VERSION_CODIGO = env('EDP_VERSION_CODIGO', default='')
+
+# Caché de hojas Excel ya leídas por los importadores EDP
+EDP_CACHE_DIR = env('EDP_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'edp'))
+EDP_CACHE_MAX_MB = env.int('EDP_CACHE_MAX_MB', default=512)
+
+# Segundos sin avance tras los que un trabajo de importación en proceso se da por
+# perdido (worker caído) y se marca con error
+EDP_IMPORTACION_TIMEOUT = env.int('EDP_IMPORTACION_TIMEOUT', default=1800)
+
+# Avance que muestran el dashboard y la API: ponderado por monto (cantidad × PU) o por actividades completadas
+EDP_AVANCE_PONDERADO = env.bool('EDP_AVANCE_PONDERADO', default=False)
+
+# Lista de actividades: paginación por cursor (sin OFFSET) y tope del conteo de
+# resultados filtrados (0 = conteo exacto; N = contar hasta N y mostrar "más de N")
+EDP_ACTIVIDADES_CURSOR = env.bool('EDP_ACTIVIDADES_CURSOR', default=False)
+EDP_CONTEO_APROXIMADO = env.int('EDP_CONTEO_APROXIMADO', default=0)
+
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from .transacciones import al_confirmar
+
+
+class Acumulador:
+    def __init__(self):
+        self.valores = []
+        self.ejecuciones = 0
+
+    def __call__(self):
+        self.ejecuciones += 1
+
+
+def acumular(valor, pendientes):
+    def fabrica():
+        pendientes.append(Acumulador())
+        return pendientes[-1]
+
+    al_confirmar('prueba', fabrica, lambda pendiente: pendiente.valores.append(valor))
+
+
+class AlConfirmarTests(TestCase):
+    def test_una_tarea_por_transaccion_y_savepoints(self):
+        pendientes = []
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            acumular(1, pendientes)
+            with transaction.atomic():
+                acumular(2, pendientes)  # savepoint confirmado: misma tarea
+            acumular(3, pendientes)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([(p.valores, p.ejecuciones) for p in pendientes], [([1, 2, 3], 1)])
+
+        # Ya ejecutada: la siguiente transacción parte con una tarea nueva
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            acumular(4, pendientes)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([(p.valores, p.ejecuciones) for p in pendientes], [([1, 2, 3], 1), ([4], 1)])
+
+    def test_rollback_de_savepoint_descarta_la_tarea(self):
+        pendientes = []
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    acumular(1, pendientes)
+                    raise ValueError
+            except ValueError:
+                pass
+            acumular(2, pendientes)
+            acumular(3, pendientes)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([(p.valores, p.ejecuciones) for p in pendientes], [([1], 0), ([2, 3], 1)])
+
+    def test_otras_claves_no_se_mezclan(self):
+        pendientes = []
+        with self.captureOnCommitCallbacks() as callbacks:
+            acumular(1, pendientes)
+            al_confirmar('otra', Acumulador)
+        self.assertEqual([c.clave for c in callbacks], ['prueba', 'otra'])
+
+
+class AlConfirmarSinTransaccionTests(SimpleTestCase):
+    def test_se_ejecuta_de_inmediato(self):
+        pendientes = []
+        acumular(1, pendientes)
+        acumular(2, pendientes)
+        self.assertEqual([(p.valores, p.ejecuciones) for p in pendientes], [([1], 1), ([2], 1)])
@@ -0,0 +1,51 @@
+from django.db import transaction
+
+
+class _Tarea:
+    """Callback registrado con on_commit: ejecuta el objeto pendiente de una clave."""
+
+    def __init__(self, clave: str, pendiente):
+        self.clave = clave
+        self.pendiente = pendiente
+        self.ejecutada = False
+
+    def __call__(self) -> None:
+        self.ejecutada = True
+        self.pendiente()
+
+
+def _registrada(conexion, clave: str):
+    # La cola de on_commit es el único estado: tras un rollback (también de un
+    # savepoint) Django descarta las tareas de esa parte y tras el commit la vacía
+    # (captureOnCommitCallbacks las ejecuta sin sacarlas, de ahí ``ejecutada``).
+    # Cada elemento es (savepoints, callback[, robust]) según la versión de Django.
+    for item in conexion.run_on_commit:
+        tarea = item[1]
+        if isinstance(tarea, _Tarea) and tarea.clave == clave and not tarea.ejecutada:
+            return tarea
+    return None
+
+
+def al_confirmar(clave: str, fabrica, agregar=None) -> None:
+    """
+    Acumula trabajo en un único objeto pendiente por transacción y lo ejecuta al confirmarla.
+
+    ``fabrica()`` crea el objeto pendiente (un callable) la primera vez que se
+    usa ``clave`` en la transacción en curso; ``agregar(pendiente)`` le suma los
+    datos de esta llamada. Así un borrado en cascada de miles de filas ejecuta
+    el trabajo una sola vez. Fuera de una transacción se ejecuta de inmediato.
+
+    Si se revierte un savepoint posterior al registro, lo agregado dentro de él
+    se ejecuta igual: el trabajo debe recalcular desde la base (reindexar, subir
+    una versión) y no aplicar deltas.
+    """
+    conexion = transaction.get_connection()
+    tarea = _registrada(conexion, clave) if conexion.in_atomic_block else None
+    nueva = tarea is None
+    if nueva:
+        tarea = _Tarea(clave, fabrica())
+    if agregar is not None:
+        agregar(tarea.pendiente)
+    if nueva:
+        # Fuera de una transacción on_commit ejecuta la tarea en el acto
+        transaction.on_commit(tarea)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Empresa
+from .models import Empresa, ResumenEmpresa
 from proyectos.models import Proyecto
 
 
@@ -14,7 +14,41 @@ class ProyectoInline(admin.TabularInline):
 
 @admin.register(Empresa)
 class EmpresaAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'rut', 'contacto', 'correo')
+    list_display = (
+        'nombre', 'rut', 'contacto', 'correo',
+        'total_proyectos', 'proyectos_activos', 'total_actividades', 'noc_abiertas',
+    )
+    list_select_related = ('resumen',)
     search_fields = ('nombre', 'rut')
     list_filter = ('nombre',)
     inlines = [ProyectoInline]
+
+    def _resumen(self, obj, campo):
+        resumen = getattr(obj, 'resumen', None)
+        return getattr(resumen, campo) if resumen else 0
+
+    @admin.display(description='Proyectos', ordering='resumen__total_proyectos')
+    def total_proyectos(self, obj):
+        return self._resumen(obj, 'total_proyectos')
+
+    @admin.display(description='Activos', ordering='resumen__proyectos_activos')
+    def proyectos_activos(self, obj):
+        return self._resumen(obj, 'proyectos_activos')
+
+    @admin.display(description='Actividades', ordering='resumen__total_actividades')
+    def total_actividades(self, obj):
+        return self._resumen(obj, 'total_actividades')
+
+    @admin.display(description='NOC abiertas', ordering='resumen__noc_abiertas')
+    def noc_abiertas(self, obj):
+        return self._resumen(obj, 'noc_abiertas')
+
+
+@admin.register(ResumenEmpresa)
+class ResumenEmpresaAdmin(admin.ModelAdmin):
+    list_display = (
+        'empresa', 'total_proyectos', 'proyectos_activos', 'total_actividades',
+        'actividades_completadas', 'noc_abiertas', 'fecha_actualizacion',
+    )
+    list_select_related = ('empresa',)
+    readonly_fields = list_display
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from empresas.resumen import recalcular_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de resúmenes por empresa en una sola pasada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', help='ID de empresa (se puede repetir)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Tamaño de lote para escritura')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        total = recalcular_resumenes(options['empresa'], batch_size=options['batch_size'])
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f'{total} resúmenes de empresa recalculados en {duracion:.2f}s'))
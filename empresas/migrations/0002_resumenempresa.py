@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEmpresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_proyectos', models.PositiveIntegerField(default=0)),
+                ('proyectos_activos', models.PositiveIntegerField(default=0)),
+                ('total_actividades', models.PositiveIntegerField(default=0)),
+                ('actividades_completadas', models.PositiveIntegerField(default=0)),
+                ('noc_abiertas', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('empresa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='empresas.empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Empresa',
+                'verbose_name_plural': 'Resúmenes de Empresas',
+            },
+        ),
+    ]
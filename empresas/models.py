@@ -11,6 +11,29 @@ class Empresa(models.Model):
         verbose_name = "Empresa"
         verbose_name_plural = "Empresas"
         ordering = ['nombre']
+        indexes = [
+            # Autocompletar por prefijo
+            models.Index(fields=['nombre'], name='empresa_nombre_idx'),
+            models.Index(fields=['rut'], name='empresa_rut_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.nombre
+
+
+class ResumenEmpresa(models.Model):
+    """Contadores precalculados por empresa (se mantienen vía señales)."""
+    empresa = models.OneToOneField(Empresa, on_delete=models.CASCADE, related_name='resumen')
+    total_proyectos = models.PositiveIntegerField(default=0)
+    proyectos_activos = models.PositiveIntegerField(default=0)
+    total_actividades = models.PositiveIntegerField(default=0)
+    actividades_completadas = models.PositiveIntegerField(default=0)
+    noc_abiertas = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen de Empresa"
+        verbose_name_plural = "Resúmenes de Empresas"
+
+    def __str__(self) -> str:
+        return f"Resumen {self.empresa.nombre}"
@@ -0,0 +1,142 @@
+import threading
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models import Count, F, Q, Subquery
+from django.utils import timezone
+from .models import Empresa, ResumenEmpresa
+
+CAMPOS_RESUMEN = [
+    'total_proyectos', 'proyectos_activos', 'total_actividades',
+    'actividades_completadas', 'noc_abiertas', 'fecha_actualizacion',
+]
+
+_estado = threading.local()
+
+
+@contextmanager
+def en_pausa():
+    """
+    Dentro del bloque las señales de actividades y NOC no tocan el resumen. Lo
+    usan los importadores entre ``conteos_proyecto`` y ``ajustar_proyecto``: un
+    borrado con señales dentro de ese tramo se descontaría dos veces.
+    """
+    anterior = pausado()
+    _estado.pausado = True
+    try:
+        yield
+    finally:
+        _estado.pausado = anterior
+
+
+def pausado() -> bool:
+    return getattr(_estado, 'pausado', False)
+
+
+def recalcular_resumenes(empresa_ids=None, batch_size: int = 500) -> int:
+    """
+    Recalcula ResumenEmpresa para las empresas indicadas (todas si es None).
+
+    Usa una consulta GROUP BY por tabla y escribe con bulk_update/bulk_create,
+    de modo que el costo no depende del número de empresas. Lo usa el comando
+    de reconstrucción; las escrituras del día a día aplican deltas con ``ajustar``.
+    """
+    from proyectos.models import Proyecto
+    from actividades.models import Actividad
+    from noc.models import NoConformidad
+
+    empresas = Empresa.objects.all()
+    proyectos = Proyecto.objects.all()
+    actividades = Actividad.objects.all()
+    nocs = NoConformidad.objects.filter(estado='abierta')
+    if empresa_ids is not None:
+        empresa_ids = set(empresa_ids)
+        empresas = empresas.filter(id__in=empresa_ids)
+        proyectos = proyectos.filter(cliente_id__in=empresa_ids)
+        actividades = actividades.filter(proyecto__cliente_id__in=empresa_ids)
+        nocs = nocs.filter(proyecto__cliente_id__in=empresa_ids)
+
+    por_proyectos = {
+        fila['cliente_id']: fila
+        for fila in proyectos.order_by().values('cliente_id').annotate(
+            total=Count('id'),
+            activos=Count('id', filter=Q(estado='en_ejecucion')),
+        )
+    }
+    por_actividades = {
+        fila['proyecto__cliente_id']: fila
+        for fila in actividades.order_by().values('proyecto__cliente_id').annotate(
+            total=Count('id'),
+            completadas=Count('id', filter=Q(estado='completada')),
+        )
+    }
+    por_noc = dict(
+        nocs.order_by().values('proyecto__cliente_id').annotate(total=Count('id'))
+        .values_list('proyecto__cliente_id', 'total')
+    )
+
+    existentes = {
+        r.empresa_id: r
+        for r in ResumenEmpresa.objects.filter(empresa__in=empresas)
+    }
+    ahora = timezone.now()
+    actualizar, crear = [], []
+    for empresa_id in empresas.values_list('id', flat=True):
+        resumen = existentes.get(empresa_id) or ResumenEmpresa(empresa_id=empresa_id)
+        p = por_proyectos.get(empresa_id, {})
+        a = por_actividades.get(empresa_id, {})
+        resumen.total_proyectos = p.get('total', 0)
+        resumen.proyectos_activos = p.get('activos', 0)
+        resumen.total_actividades = a.get('total', 0)
+        resumen.actividades_completadas = a.get('completadas', 0)
+        resumen.noc_abiertas = por_noc.get(empresa_id, 0)
+        resumen.fecha_actualizacion = ahora
+        (actualizar if resumen.pk else crear).append(resumen)
+
+    with transaction.atomic():
+        ResumenEmpresa.objects.bulk_update(actualizar, CAMPOS_RESUMEN, batch_size=batch_size)
+        ResumenEmpresa.objects.bulk_create(crear, batch_size=batch_size)
+    return len(actualizar) + len(crear)
+
+
+def ajustar(empresa_id=None, proyecto_id=None, **deltas) -> int:
+    """
+    Suma ``deltas`` (p. ej. ``total_actividades=1``) al resumen de la empresa,
+    o al de la empresa del proyecto, en un único UPDATE con expresiones F, sin
+    contar filas. No hace nada si todos los deltas son cero.
+    """
+    from proyectos.models import Proyecto
+
+    deltas = {campo: delta for campo, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    if empresa_id is None:
+        # Subconsulta sobre otra tabla: MySQL no admite leer la tabla que actualiza
+        empresa_id = Subquery(Proyecto.objects.filter(id=proyecto_id).values('cliente_id'))
+    return ResumenEmpresa.objects.filter(empresa_id=empresa_id).update(
+        **{campo: F(campo) + delta for campo, delta in deltas.items()},
+        fecha_actualizacion=timezone.now(),
+    )
+
+
+def conteos_proyecto(proyecto_id) -> dict:
+    """Lo que aporta un proyecto al resumen de su empresa, con dos consultas acotadas al proyecto."""
+    from actividades.models import Actividad
+    from noc.models import NoConformidad
+
+    conteos = Actividad.objects.filter(proyecto_id=proyecto_id).aggregate(
+        total_actividades=Count('id'),
+        actividades_completadas=Count('id', filter=Q(estado='completada')),
+    )
+    conteos['noc_abiertas'] = NoConformidad.objects.filter(proyecto_id=proyecto_id, estado='abierta').count()
+    return conteos
+
+
+def ajustar_proyecto(proyecto_id, antes: dict) -> int:
+    """
+    Aplica al resumen la diferencia entre los conteos actuales del proyecto y
+    ``antes`` (tomados con ``conteos_proyecto``). Lo usan los importadores, que
+    escriben con bulk_create/bulk_update y por tanto no emiten señales; lo que
+    borren con ``delete()`` en ese tramo debe ir dentro de ``en_pausa``.
+    """
+    despues = conteos_proyecto(proyecto_id)
+    return ajustar(proyecto_id=proyecto_id, **{campo: despues[campo] - antes[campo] for campo in despues})
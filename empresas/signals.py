@@ -0,0 +1,112 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from proyectos.models import Proyecto
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from .models import Empresa, ResumenEmpresa
+from .resumen import ajustar, conteos_proyecto, pausado
+
+# Lo que aporta una fila de detalle al resumen de su empresa según su estado
+APORTES = {
+    Actividad: lambda estado: {'total_actividades': 1, 'actividades_completadas': int(estado == 'completada')},
+    NoConformidad: lambda estado: {'noc_abiertas': int(estado == 'abierta')},
+}
+
+
+def _anterior(modelo, instance, *campos):
+    """Valores guardados antes de este save (None en un alta)."""
+    if not instance.pk:
+        return None
+    return modelo.objects.filter(pk=instance.pk).values_list(*campos).first()
+
+
+def _en_cascada(origin, *modelos) -> bool:
+    """Si el borrado viene de borrar un objeto (o un queryset) de ``modelos``."""
+    return isinstance(origin, modelos) or getattr(origin, 'model', None) in modelos
+
+
+def _negar(conteos: dict) -> dict:
+    return {campo: -valor for campo, valor in conteos.items()}
+
+
+@receiver(post_save, sender=Empresa)
+def crear_resumen_empresa(sender, instance, created, **kwargs):
+    if created:
+        ResumenEmpresa.objects.get_or_create(empresa=instance)
+
+
+@receiver(pre_save, sender=Proyecto)
+def guardar_proyecto_anterior(sender, instance, **kwargs):
+    """Recuerda cliente y estado previos para aplicar solo la diferencia."""
+    instance._anterior_resumen = _anterior(sender, instance, 'cliente_id', 'estado')
+
+
+@receiver(post_save, sender=Proyecto)
+def resumen_por_proyecto(sender, instance, **kwargs):
+    activo = int(instance.estado == 'en_ejecucion')
+    anterior = getattr(instance, '_anterior_resumen', None)
+    if anterior is None:
+        ajustar(empresa_id=instance.cliente_id, total_proyectos=1, proyectos_activos=activo)
+        return
+    cliente_anterior, estado_anterior = anterior
+    activo_antes = int(estado_anterior == 'en_ejecucion')
+    if str(cliente_anterior) == str(instance.cliente_id):
+        ajustar(empresa_id=cliente_anterior, proyectos_activos=activo - activo_antes)
+    else:
+        # El proyecto se lleva sus actividades y NOC a la otra empresa
+        conteos = conteos_proyecto(instance.pk)
+        ajustar(empresa_id=cliente_anterior, total_proyectos=-1, proyectos_activos=-activo_antes, **_negar(conteos))
+        ajustar(empresa_id=instance.cliente_id, total_proyectos=1, proyectos_activos=activo, **conteos)
+
+
+@receiver(pre_delete, sender=Proyecto)
+def guardar_conteos_proyecto(sender, instance, origin=None, **kwargs):
+    # Las actividades y NOC se borran en cascada antes que el proyecto sin tocar
+    # el resumen: aquí se cuentan una vez para descontarlas juntas
+    instance._conteos_resumen = None if _en_cascada(origin, Empresa) else conteos_proyecto(instance.pk)
+
+
+@receiver(post_delete, sender=Proyecto)
+def resumen_por_proyecto_borrado(sender, instance, **kwargs):
+    conteos = getattr(instance, '_conteos_resumen', None)
+    if conteos is not None:
+        ajustar(
+            empresa_id=instance.cliente_id, total_proyectos=-1,
+            proyectos_activos=-int(instance.estado == 'en_ejecucion'), **_negar(conteos),
+        )
+
+
+@receiver(pre_save, sender=Actividad)
+@receiver(pre_save, sender=NoConformidad)
+def guardar_detalle_anterior(sender, instance, **kwargs):
+    if pausado():
+        return
+    instance._anterior_resumen = _anterior(sender, instance, 'proyecto_id', 'estado')
+
+
+@receiver(post_save, sender=Actividad)
+@receiver(post_save, sender=NoConformidad)
+def resumen_por_detalle(sender, instance, **kwargs):
+    """Ajusta los contadores con la diferencia de estado (o de proyecto), como CuadroControl.registrar_cambio."""
+    if pausado():
+        return
+    aporte = APORTES[sender]
+    nuevo = aporte(instance.estado)
+    anterior = getattr(instance, '_anterior_resumen', None)
+    if anterior is None:
+        ajustar(proyecto_id=instance.proyecto_id, **nuevo)
+        return
+    proyecto_anterior, estado_anterior = anterior
+    previo = aporte(estado_anterior)
+    if str(proyecto_anterior) == str(instance.proyecto_id):
+        ajustar(proyecto_id=proyecto_anterior, **{campo: nuevo[campo] - previo[campo] for campo in nuevo})
+    else:
+        ajustar(proyecto_id=proyecto_anterior, **_negar(previo))
+        ajustar(proyecto_id=instance.proyecto_id, **nuevo)
+
+
+@receiver(post_delete, sender=Actividad)
+@receiver(post_delete, sender=NoConformidad)
+def resumen_por_detalle_borrado(sender, instance, origin=None, **kwargs):
+    if not pausado() and not _en_cascada(origin, Proyecto, Empresa):
+        ajustar(proyecto_id=instance.proyecto_id, **_negar(APORTES[sender](instance.estado)))
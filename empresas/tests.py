@@ -1,3 +1,137 @@
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from proyectos.models import Proyecto
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from users.models import User
+from .models import Empresa, ResumenEmpresa
+from .resumen import recalcular_resumenes
 
-# Create your tests here.
+CAMPOS = ('total_proyectos', 'proyectos_activos', 'total_actividades', 'actividades_completadas', 'noc_abiertas')
+
+
+def contadores(empresa):
+    return ResumenEmpresa.objects.filter(empresa=empresa).values_list(*CAMPOS).get()
+
+
+class ResumenEmpresaTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Cliente')
+
+    def crear_proyecto(self, codigo, estado='en_ejecucion', empresa=None):
+        return Proyecto.objects.create(
+            codigo=codigo, nombre=codigo, cliente=empresa or self.empresa,
+            fecha_inicio=date(2025, 1, 1), estado=estado,
+        )
+
+    def assertIgualARecalculo(self, *empresas):
+        esperados = [contadores(empresa) for empresa in empresas]
+        recalcular_resumenes()
+        self.assertEqual([contadores(empresa) for empresa in empresas], esperados)
+
+    def test_señales_mantienen_resumen(self):
+        proyecto = self.crear_proyecto('P1')
+        self.crear_proyecto('P2', estado='finalizado')
+        Actividad.objects.create(proyecto=proyecto, descripcion='A', estado='completada')
+        Actividad.objects.create(proyecto=proyecto, descripcion='B')
+        NoConformidad.objects.create(
+            proyecto=proyecto, codigo='N1', descripcion='N', fecha_detectada=date(2025, 1, 1),
+        )
+        self.assertEqual(contadores(self.empresa), (2, 1, 2, 1, 1))
+
+        proyecto.delete()
+        self.assertEqual(contadores(self.empresa), (1, 0, 0, 0, 0))
+        self.assertIgualARecalculo(self.empresa)
+
+    def test_deltas_por_estado_y_por_traslado(self):
+        otra = Empresa.objects.create(nombre='Otra')
+        proyecto = self.crear_proyecto('P1')
+        destino = self.crear_proyecto('P2', estado='planificado', empresa=otra)
+        actividad = Actividad.objects.create(proyecto=proyecto, descripcion='A')
+        noc = NoConformidad.objects.create(
+            proyecto=proyecto, codigo='N1', descripcion='N', fecha_detectada=date(2025, 1, 1),
+        )
+
+        # Cambio de estado: lectura del estado anterior, UPDATE de la fila y un UPDATE con F
+        actividad.estado = 'completada'
+        with self.assertNumQueries(3):
+            actividad.save()
+        # Sin cambio de estado no se toca el resumen
+        actividad.descripcion = 'A2'
+        with self.assertNumQueries(2):
+            actividad.save()
+        noc.estado = 'cerrada'
+        noc.save()
+        self.assertEqual(contadores(self.empresa), (1, 1, 1, 1, 0))
+
+        actividad.proyecto = destino
+        actividad.save()
+        self.assertEqual((contadores(self.empresa), contadores(otra)), ((1, 1, 0, 0, 0), (1, 0, 1, 1, 0)))
+
+        # El proyecto se lleva sus actividades y NOC a la otra empresa
+        Actividad.objects.create(proyecto=proyecto, descripcion='B')
+        proyecto.cliente = otra
+        proyecto.estado = 'finalizado'
+        proyecto.save()
+        self.assertEqual((contadores(self.empresa), contadores(otra)), ((0, 0, 0, 0, 0), (2, 0, 2, 1, 0)))
+
+        actividad.delete()
+        noc.delete()
+        self.assertEqual(contadores(otra), (2, 0, 1, 0, 0))
+        self.assertIgualARecalculo(self.empresa, otra)
+
+    def test_borrado_en_cascada_no_ajusta_por_fila(self):
+        proyecto = self.crear_proyecto('P1')
+        Actividad.objects.bulk_create([Actividad(proyecto=proyecto, descripcion=str(i)) for i in range(30)])
+        recalcular_resumenes()
+        # Los conteos se descuentan una vez, no con un UPDATE por actividad
+        with self.assertNumQueries(10):
+            proyecto.delete()
+        self.assertEqual(contadores(self.empresa), (0, 0, 0, 0, 0))
+
+    def test_comando_reconstruye_resumen(self):
+        proyecto = self.crear_proyecto('P1')
+        Actividad.objects.bulk_create([Actividad(proyecto=proyecto, descripcion=str(i)) for i in range(3)])
+        ResumenEmpresa.objects.all().delete()
+        call_command('recalcular_resumen_empresas', stdout=StringIO())
+        resumen = ResumenEmpresa.objects.get(empresa=self.empresa)
+        self.assertEqual((resumen.total_proyectos, resumen.total_actividades), (1, 3))
+
+
+class ReimportacionResumenTests(TestCase):
+    """Reimportar con --eliminar-faltantes descuenta las actividades borradas una sola vez."""
+
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        ajustes = self.settings(EDP_CACHE_DIR=os.path.join(self.directorio, 'cache'))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _csv(self, filas) -> str:
+        ruta = os.path.join(self.directorio, 'EDP-R.csv')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('Nº,ITEM,Cantidad,TOTALES\n')
+            for i in range(filas):
+                archivo.write(f'1.{i},Partida {i},10,{10 if i % 2 else 0}\n')
+        return ruta
+
+    def test_importar_edp_completo(self):
+        call_command('importar_edp_completo', self._csv(10), codigo='EDP-R', stdout=StringIO())
+        call_command('importar_edp_completo', self._csv(4), codigo='EDP-R', eliminar_faltantes=True, stdout=StringIO())
+        proyecto = Proyecto.objects.get(codigo='EDP-R')
+        self.assertEqual(proyecto.actividades.count(), 4)
+        self.assertEqual(contadores(proyecto.cliente), (1, 1, 4, 2, 0))
+
+    def test_importar_edp_lote(self):
+        call_command('importar_edp_lote', self._csv(10), workers=1, stdout=StringIO())
+        call_command('importar_edp_lote', self._csv(4), workers=1, eliminar_faltantes=True, stdout=StringIO())
+        proyecto = Proyecto.objects.get(codigo='EDP-R')
+        self.assertEqual(proyecto.actividades.count(), 4)
+        self.assertEqual(contadores(proyecto.cliente), (1, 1, 4, 2, 0))
@@ -1,8 +1,11 @@
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets
+from proyectos.versiones import condicional
 from .models import Empresa
 from .serializers import EmpresaSerializer
 
 
+@method_decorator(condicional(), name='list')
 class EmpresaViewSet(viewsets.ModelViewSet):
     queryset = Empresa.objects.all()
     serializer_class = EmpresaSerializer
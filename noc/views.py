@@ -1,8 +1,11 @@
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets
+from proyectos.versiones import condicional
 from .models import NoConformidad
 from .serializers import NoConformidadSerializer
 
 
+@method_decorator(condicional(), name='list')
 class NoConformidadViewSet(viewsets.ModelViewSet):
     queryset = NoConformidad.objects.all()
     serializer_class = NoConformidadSerializer
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Proyecto, CuadroControl
+from .models import Proyecto, CuadroControl, HistorialControl, TrabajoImportacion
 from actividades.models import Actividad
 from noc.models import NoConformidad
 
@@ -24,8 +24,11 @@ class NoConformidadInline(admin.TabularInline):
 class CuadroControlInline(admin.StackedInline):
     model = CuadroControl
     extra = 0
-    fields = ('total_actividades', 'completadas', 'avance_global', 'fecha_actualizacion')
-    readonly_fields = ('total_actividades', 'completadas', 'avance_global', 'fecha_actualizacion')
+    fields = (
+        'total_actividades', 'completadas', 'avance_global', 'valor_contratado', 'avance_ponderado',
+        'fecha_actualizacion',
+    )
+    readonly_fields = fields
     can_delete = False
 
 
@@ -52,17 +55,41 @@ class ProyectoAdmin(admin.ModelAdmin):
 
 @admin.register(CuadroControl)
 class CuadroControlAdmin(admin.ModelAdmin):
-    list_display = ('proyecto', 'total_actividades', 'completadas', 'avance_global', 'fecha_actualizacion')
-    readonly_fields = ('total_actividades', 'completadas', 'avance_global', 'fecha_actualizacion')
+    list_display = ('proyecto', 'total_actividades', 'completadas', 'avance_global', 'avance_ponderado', 'fecha_actualizacion')
+    readonly_fields = (
+        'total_actividades', 'completadas', 'avance_global', 'valor_contratado', 'avance_ponderado',
+        'fecha_actualizacion',
+    )
     
     fieldsets = (
         ('Proyecto', {
             'fields': ('proyecto',)
         }),
         ('Estadísticas', {
-            'fields': ('total_actividades', 'completadas', 'avance_global')
+            'fields': ('total_actividades', 'completadas', 'avance_global', 'valor_contratado', 'avance_ponderado')
         }),
         ('Actualización', {
             'fields': ('fecha_actualizacion',)
         }),
     )
+
+
+@admin.register(HistorialControl)
+class HistorialControlAdmin(admin.ModelAdmin):
+    list_display = ('proyecto', 'fecha', 'total_actividades', 'completadas', 'avance_global', 'avance_ponderado')
+    list_filter = ('empresa',)
+    date_hierarchy = 'fecha'
+    list_select_related = ('proyecto',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TrabajoImportacion)
+class TrabajoImportacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'archivo', 'tipo', 'estado', 'filas_procesadas', 'creado_por', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('filas_procesadas', 'errores', 'mensaje', 'fecha_inicio', 'fecha_fin', 'fecha_actualizacion')
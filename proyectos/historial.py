@@ -0,0 +1,87 @@
+from dataclasses import dataclass, asdict
+from datetime import date
+from django.db.models import F, Q, Sum
+from .models import HistorialControl
+
+# Puntos por serie si el cliente no pide otra cantidad, y máximo permitido
+PUNTOS_POR_DEFECTO = 365
+MAX_PUNTOS = 2000
+
+
+@dataclass(frozen=True)
+class PuntoHistorial:
+    """Estado de un proyecto (o de la suma de los proyectos de una empresa) en una fecha."""
+    fecha: date
+    total_actividades: int
+    completadas: int
+    avance_global: float
+    avance_ponderado: float = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _rango(historial, desde=None, hasta=None):
+    if desde:
+        historial = historial.filter(fecha__gte=desde)
+    if hasta:
+        historial = historial.filter(fecha__lte=hasta)
+    return historial.order_by('fecha')
+
+
+def serie_proyecto(proyecto_id, desde: date = None, hasta: date = None) -> list:
+    """Fotos de un proyecto en el rango; recorre el índice único (proyecto, fecha)."""
+    filas = _rango(HistorialControl.objects.filter(proyecto_id=proyecto_id), desde, hasta).values_list(
+        'fecha', 'total_actividades', 'completadas', 'avance_global', 'avance_ponderado'
+    )
+    return [
+        PuntoHistorial(
+            fecha, total, completadas, float(avance), float(ponderado) if ponderado is not None else None
+        )
+        for fecha, total, completadas, avance, ponderado in filas
+    ]
+
+
+def serie_empresa(empresa_id, desde: date = None, hasta: date = None) -> list:
+    """
+    Suma diaria de los proyectos de una empresa con un GROUP BY fecha sobre el
+    índice (empresa, fecha). El avance ponderado se pondera por el valor contratado
+    de cada proyecto.
+    """
+    filas = (
+        _rango(HistorialControl.objects.filter(empresa_id=empresa_id), desde, hasta)
+        .values('fecha')
+        .annotate(
+            total=Sum('total_actividades'),
+            completadas_total=Sum('completadas'),
+            valor=Sum('valor_contratado', filter=Q(avance_ponderado__isnull=False)),
+            valor_avance=Sum(F('avance_ponderado') * F('valor_contratado')),
+        )
+    )
+    return [
+        PuntoHistorial(
+            fila['fecha'],
+            fila['total'],
+            fila['completadas_total'],
+            round(fila['completadas_total'] * 100 / fila['total'], 2) if fila['total'] else 0.0,
+            round(float(fila['valor_avance'] / fila['valor']), 2) if fila['valor'] else None,
+        )
+        for fila in filas
+    ]
+
+
+def reducir(serie: list, puntos: int) -> list:
+    """
+    Reduce la serie a lo más ``puntos`` puntos: divide el rango de fechas en
+    tramos de igual duración y conserva la última foto de cada tramo (el estado
+    al cierre del tramo, que es lo que muestra un gráfico burn-up).
+    """
+    if len(serie) <= puntos:
+        return serie
+    inicio = serie[0].fecha
+    dias = (serie[-1].fecha - inicio).days + 1
+    ancho = -(-dias // puntos)  # división hacia arriba
+    ultimos = {}
+    for punto in serie:
+        ultimos[(punto.fecha - inicio).days // ancho] = punto
+    return list(ultimos.values())
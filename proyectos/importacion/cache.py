@@ -0,0 +1,196 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+# Versión del formato de los bloques: forma parte de la clave, así las entradas
+# de un formato anterior nunca se leen y terminan desalojadas
+FORMATO = 'json-1'
+EXTENSION = '.json'
+
+
+def _codificar(valor):
+    """Valor de celda a JSON; los tipos que JSON no distingue van etiquetados."""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if valor is pd.NaT:
+        return {'$nat': None}
+    if valor is pd.NA:
+        return {'$na': None}
+    if isinstance(valor, pd.Timestamp):
+        return {'$marca': valor.isoformat()}
+    if isinstance(valor, datetime.datetime):
+        return {'$fecha_hora': valor.isoformat()}
+    if isinstance(valor, datetime.date):
+        return {'$fecha': valor.isoformat()}
+    if isinstance(valor, datetime.time):
+        return {'$hora': valor.isoformat()}
+    if isinstance(valor, (pd.Timedelta, datetime.timedelta)):
+        return {'$duracion': pd.Timedelta(valor).value}
+    raise TypeError(f'Valor no admitido en la caché: {type(valor).__name__}')
+
+
+DECODIFICADORES = {
+    '$nat': lambda _: pd.NaT,
+    '$na': lambda _: pd.NA,
+    '$marca': pd.Timestamp,
+    '$fecha_hora': datetime.datetime.fromisoformat,
+    '$fecha': datetime.date.fromisoformat,
+    '$hora': datetime.time.fromisoformat,
+    '$duracion': pd.Timedelta,
+}
+
+
+def _decodificar(valor):
+    if isinstance(valor, dict):
+        (etiqueta, dato), = valor.items()
+        return DECODIFICADORES[etiqueta](dato)
+    return valor
+
+
+def _serie(datos: dict):
+    valores = [_decodificar(valor) for valor in datos['valores']]
+    return pd.Series(valores, dtype=datos['dtype'])
+
+
+def escribir_bloque(bloque: pd.DataFrame, ruta) -> None:
+    """Guarda un bloque como JSON con el dtype de cada columna y del índice."""
+    contenido = {
+        'indice': {'dtype': str(bloque.index.dtype), 'valores': [_codificar(v) for v in bloque.index]},
+        'columnas': [
+            {
+                'nombre': _codificar(nombre),
+                'dtype': str(serie.dtype),
+                'valores': [_codificar(v) for v in serie.tolist()],
+            }
+            for nombre, serie in bloque.items()
+        ],
+    }
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, ensure_ascii=False)
+
+
+def leer_bloque(ruta) -> pd.DataFrame:
+    """Inverso de ``escribir_bloque``; solo interpreta JSON, nunca ejecuta código."""
+    with open(ruta, encoding='utf-8') as archivo:
+        contenido = json.load(archivo)
+    indice = pd.Index(_serie(contenido['indice']))
+    columnas = contenido['columnas']
+    bloque = pd.DataFrame(
+        {numero: _serie(columna).set_axis(indice) for numero, columna in enumerate(columnas)},
+        index=indice,
+    )
+    # Los nombres se asignan al final: pueden repetirse o no ser texto
+    bloque.columns = [_decodificar(columna['nombre']) for columna in columnas]
+    return bloque
+
+
+def huella_archivo(ruta, tamano_lectura: int = 1 << 20) -> str:
+    """SHA-256 del contenido del archivo, leído por partes."""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for parte in iter(lambda: archivo.read(tamano_lectura), b''):
+            sha.update(parte)
+    return sha.hexdigest()
+
+
+class CacheHojas:
+    """
+    Caché en disco de hojas ya leídas, para no volver a parsear un Excel sin cambios.
+
+    Cada entrada es un directorio con los bloques de una hoja (uno por archivo),
+    identificado por el SHA-256 del libro, el motor de lectura, el nombre de la
+    hoja y el tamaño de bloque (un acierto entrega los bloques tal como se
+    leyeron). Los bloques se guardan como JSON con el dtype de cada columna (ver
+    ``escribir_bloque``), así leer la caché nunca deserializa objetos
+    arbitrarios. No se usa Parquet/Arrow porque pyarrow es una dependencia
+    opcional (solo la pide LectorTabular para leer .parquet) y la caché debe
+    funcionar sin ella; además Parquet no conserva las columnas de tipos
+    mezclados que entrega el Excel (texto y números en la misma columna). Las entradas se escriben en un directorio temporal y se
+    publican con un rename, así un proceso que falla a mitad no deja entradas
+    incompletas.
+    Al superar ``max_bytes`` se eliminan las entradas usadas hace más tiempo
+    (la fecha de modificación del directorio se renueva en cada acierto).
+    """
+
+    PREFIJO_TEMPORAL = '.tmp-'
+
+    def __init__(self, directorio, max_bytes: int):
+        self.directorio = str(directorio)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def desde_settings(cls) -> 'CacheHojas':
+        from django.conf import settings
+
+        return cls(settings.EDP_CACHE_DIR, settings.EDP_CACHE_MAX_MB * 1024 * 1024)
+
+    def _ruta(self, huella: str, motor: str, hoja, tamano_bloque=None) -> str:
+        clave = f'{FORMATO}\0{huella}\0{motor}\0{hoja}\0{tamano_bloque}'
+        clave = hashlib.sha256(clave.encode('utf-8')).hexdigest()
+        return os.path.join(self.directorio, clave)
+
+    def obtener(self, huella: str, motor: str, hoja, tamano_bloque=None):
+        """Iterador de los bloques guardados, o None si la hoja no está en caché."""
+        ruta = self._ruta(huella, motor, hoja, tamano_bloque)
+        try:
+            archivos = sorted(archivo for archivo in os.listdir(ruta) if archivo.endswith(EXTENSION))
+            os.utime(ruta)
+        except FileNotFoundError:
+            return None
+        return (leer_bloque(os.path.join(ruta, archivo)) for archivo in archivos)
+
+    def guardar(self, huella: str, motor: str, hoja, bloques, tamano_bloque=None):
+        """
+        Entrega los bloques a medida que se leen y los guarda en disco; la entrada
+        se publica solo si el iterador se consume completo. Una hoja con valores
+        que el formato no admite se entrega igual, sin guardarla.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = os.path.join(self.directorio, f'{self.PREFIJO_TEMPORAL}{uuid.uuid4().hex}')
+        os.mkdir(temporal)
+        publicar = True
+        try:
+            for numero, bloque in enumerate(bloques):
+                if publicar:
+                    try:
+                        escribir_bloque(bloque, os.path.join(temporal, f'{numero:06d}{EXTENSION}'))
+                    except TypeError:
+                        publicar = False
+                yield bloque
+            if publicar:
+                try:
+                    os.rename(temporal, self._ruta(huella, motor, hoja, tamano_bloque))
+                except OSError:
+                    pass  # otro proceso publicó la misma entrada primero
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+        self.desalojar()
+
+    def desalojar(self) -> int:
+        """Elimina las entradas menos usadas hasta quedar bajo ``max_bytes``. Devuelve cuántas borró."""
+        entradas = []
+        for entrada in os.scandir(self.directorio):
+            if not entrada.is_dir() or entrada.name.startswith(self.PREFIJO_TEMPORAL):
+                continue
+            try:
+                tamano = sum(archivo.stat().st_size for archivo in os.scandir(entrada.path))
+                entradas.append((entrada.stat().st_mtime, tamano, entrada.path))
+            except FileNotFoundError:
+                continue  # eliminada por otro proceso
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        eliminadas = 0
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(ruta, ignore_errors=True)
+            total -= tamano
+            eliminadas += 1
+        return eliminadas
@@ -0,0 +1,113 @@
+from collections import Counter
+from django.db import transaction
+
+MODOS_TRANSACCION = ('archivo', 'lote')
+
+
+class EscritorLotes:
+    """
+    Etapa de escritura compartida por los importadores EDP.
+
+    Acumula instancias por modelo y las inserta con ``bulk_create`` (o las
+    modifica con ``bulk_update``) cada ``batch_size`` filas. Con ``transaccion='archivo'`` toda la importación va
+    en una sola transacción y cualquier error la revierte completa; con
+    ``transaccion='lote'`` cada lote se confirma por separado y un error solo
+    revierte el lote en curso.
+
+    Uso::
+
+        with EscritorLotes(batch_size=1000) as escritor:
+            for fila in filas:
+                escritor.agregar(Actividad(...))
+    """
+
+    def __init__(self, batch_size: int = 1000, transaccion: str = 'archivo'):
+        if batch_size < 1:
+            raise ValueError('batch_size debe ser mayor que 0')
+        if transaccion not in MODOS_TRANSACCION:
+            raise ValueError(f'transaccion debe ser uno de {MODOS_TRANSACCION}')
+        self.batch_size = batch_size
+        self.transaccion = transaccion
+        self.insertados = Counter()
+        self.actualizados = Counter()
+        self._pendientes = {}
+        self._modificaciones = {}
+        self._atomic = None
+
+    def __enter__(self):
+        if self.transaccion == 'archivo':
+            self._atomic = transaction.atomic()
+            self._atomic.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.vaciar()
+            except Exception as error:
+                exc_type, exc, tb = type(error), error, error.__traceback__
+                self._cerrar(exc_type, exc, tb)
+                raise
+        self._cerrar(exc_type, exc, tb)
+        return False
+
+    def _cerrar(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._pendientes.clear()
+            self._modificaciones.clear()
+            if self._atomic is not None:
+                self.insertados.clear()
+                self.actualizados.clear()
+        if self._atomic is not None:
+            atomic, self._atomic = self._atomic, None
+            atomic.__exit__(exc_type, exc, tb)
+
+    def agregar(self, instancia) -> None:
+        """Encola una instancia; se escribe al completar el lote de su modelo."""
+        modelo = type(instancia)
+        pendientes = self._pendientes.setdefault(modelo, [])
+        pendientes.append(instancia)
+        if len(pendientes) >= self.batch_size:
+            self._vaciar_modelo(modelo)
+
+    def modificar(self, instancia, campos) -> None:
+        """Encola una instancia existente para ``bulk_update`` de ``campos``."""
+        clave = (type(instancia), tuple(campos))
+        pendientes = self._modificaciones.setdefault(clave, [])
+        pendientes.append(instancia)
+        if len(pendientes) >= self.batch_size:
+            self._vaciar_modificaciones(clave)
+
+    def vaciar(self) -> None:
+        """Escribe todo lo pendiente de todos los modelos."""
+        for modelo in list(self._pendientes):
+            self._vaciar_modelo(modelo)
+        for clave in list(self._modificaciones):
+            self._vaciar_modificaciones(clave)
+
+    def _vaciar_modelo(self, modelo) -> None:
+        pendientes = self._pendientes.pop(modelo, [])
+        if not pendientes:
+            return
+        if self.transaccion == 'lote':
+            with transaction.atomic():
+                modelo.objects.bulk_create(pendientes, batch_size=self.batch_size)
+        else:
+            modelo.objects.bulk_create(pendientes, batch_size=self.batch_size)
+        self.insertados[modelo] += len(pendientes)
+
+    def _vaciar_modificaciones(self, clave) -> None:
+        pendientes = self._modificaciones.pop(clave, [])
+        if not pendientes:
+            return
+        modelo, campos = clave
+        if self.transaccion == 'lote':
+            with transaction.atomic():
+                modelo.objects.bulk_update(pendientes, campos, batch_size=self.batch_size)
+        else:
+            modelo.objects.bulk_update(pendientes, campos, batch_size=self.batch_size)
+        self.actualizados[modelo] += len(pendientes)
+
+    def total(self, modelo) -> int:
+        """Cantidad de instancias de ``modelo`` ya insertadas."""
+        return self.insertados[modelo]
@@ -0,0 +1,289 @@
+from itertools import islice
+import os
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+MOTORES = ('pandas', 'streaming')
+EXTENSIONES_TABULARES = ('.csv', '.parquet')
+# Archivos que aceptan los importadores (abrir_lector elige el lector)
+EXTENSIONES_ARCHIVO = ('.xlsx',) + EXTENSIONES_TABULARES
+
+# Columnas de texto de los EDP: en CSV se leen como texto para que '1.10' no se convierta en 1.1
+COLUMNAS_TEXTO = (
+    'Nº', 'ITEM', 'U', 'Item', 'Descripción', 'Actividad', 'Observaciones', 'Código', 'Causa',
+    'Acción Correctiva', 'Estado', 'Cliente', 'Nombre Proyecto', 'Supervisor',
+    'Fecha Programada', 'Fecha Real', 'Fecha Detectada', 'Fecha Cierre',
+)
+
+
+def abrir_lector(ruta, motor: str = 'pandas', tamano_bloque: int = 5000, cache=None):
+    """
+    Lector según la entrada: CSV o Parquet (un archivo, o un directorio con un
+    archivo por hoja) usan ``LectorTabular``; el resto, ``LectorExcel``.
+    """
+    if os.path.isdir(ruta) or str(ruta).lower().endswith(EXTENSIONES_TABULARES):
+        return LectorTabular(ruta, tamano_bloque)
+    return LectorExcel(ruta, motor, tamano_bloque, cache)
+
+
+class LectorExcel:
+    """
+    Lector de hojas de un libro EDP con dos motores intercambiables.
+
+    - ``pandas``: ``pd.ExcelFile``; cada hoja se carga completa en un DataFrame.
+    - ``streaming``: openpyxl en modo ``read_only``; las filas se convierten en
+      DataFrames de ``tamano_bloque`` filas, así la memoria no crece con el largo
+      de la hoja.
+
+    Ambos motores entregan DataFrames con los mismos nombres de columna, valores
+    nulos e índice de fila que ``pd.read_excel``, de modo que la lógica de mapeo
+    de los importadores no cambia. Diferencias del motor streaming: los textos
+    no se convierten a números, las columnas numéricas se entregan como float
+    (igual que pandas cuando la columna tiene celdas vacías, como las filas de
+    sección de un EDP) y el ancho de la hoja se toma del primer bloque.
+
+    Con ``cache`` (un ``CacheHojas``) las hojas ya leídas de un archivo sin
+    cambios se recuperan del disco y el libro Excel no llega a abrirse.
+    """
+
+    def __init__(self, ruta, motor: str = 'pandas', tamano_bloque: int = 5000, cache=None):
+        if motor not in MOTORES:
+            raise ValueError(f'motor debe ser uno de {MOTORES}')
+        if tamano_bloque < 1:
+            raise ValueError('tamano_bloque debe ser mayor que 0')
+        self.ruta = ruta
+        self.motor = motor
+        self.tamano_bloque = tamano_bloque
+        self.cache = cache
+        self._libro = None
+        self._huella = None
+        if cache is None:
+            self._abrir()  # sin caché el libro siempre se lee: los errores de formato aparecen aquí
+
+    def _abrir(self):
+        if self._libro is None:
+            if self.motor == 'pandas':
+                self._libro = pd.ExcelFile(self.ruta)
+            else:
+                import openpyxl
+
+                self._libro = openpyxl.load_workbook(self.ruta, read_only=True, data_only=True)
+        return self._libro
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+    def cerrar(self) -> None:
+        if self._libro is not None:
+            self._libro.close()
+
+    @property
+    def hojas(self) -> list:
+        libro = self._abrir()
+        return list(libro.sheet_names if self.motor == 'pandas' else libro.sheetnames)
+
+    def hoja(self, nombre=0, columnas=None) -> pd.DataFrame:
+        """Hoja completa como un único DataFrame."""
+        bloques = list(self.bloques(nombre, columnas))
+        return pd.concat(bloques) if len(bloques) > 1 else bloques[0]
+
+    def bloques(self, nombre=0, columnas=None):
+        """
+        Itera la hoja en DataFrames de a lo más ``tamano_bloque`` filas. ``columnas``
+        (función que recibe el nombre de la columna) deja solo las columnas necesarias.
+        """
+        bloques = self._bloques_completos(nombre)
+        if columnas is None:
+            return bloques
+        return (bloque[[c for c in bloque.columns if columnas(c)]] for bloque in bloques)
+
+    def _bloques_completos(self, nombre):
+        if self.cache is None:
+            return self._leer_bloques(nombre)
+        if self._huella is None:
+            from .cache import huella_archivo
+
+            self._huella = huella_archivo(self.ruta)
+        # El motor pandas entrega la hoja en un solo bloque: el tamaño no cambia lo guardado
+        tamano = None if self.motor == 'pandas' else self.tamano_bloque
+        guardados = self.cache.obtener(self._huella, self.motor, nombre, tamano)
+        if guardados is not None:
+            return guardados
+        return self.cache.guardar(self._huella, self.motor, nombre, self._leer_bloques(nombre), tamano)
+
+    def _leer_bloques(self, nombre):
+        libro = self._abrir()
+        if self.motor == 'pandas':
+            yield libro.parse(nombre)
+            return
+
+        hoja = libro.worksheets[nombre] if isinstance(nombre, int) else libro[nombre]
+        hoja.reset_dimensions()  # las dimensiones guardadas en el archivo no son confiables
+        filas = _sin_filas_vacias_finales(map(_convertir_fila, hoja.iter_rows()))
+        encabezado = next(filas, None)
+        if encabezado is None:
+            yield pd.DataFrame()
+            return
+
+        ancho = None
+        inicio = 0
+        while True:
+            datos = list(islice(filas, self.tamano_bloque))
+            if not datos and inicio:
+                return
+            if ancho is None:
+                # pandas usa el ancho de la fila más larga; aquí se toma del primer bloque
+                ancho = max([len(encabezado)] + [len(fila) for fila in datos])
+            encabezado_bloque = (encabezado + [''] * ancho)[:ancho]
+            datos = [(fila + [''] * ancho)[:ancho] for fila in datos]
+            bloque = TextParser([encabezado_bloque] + datos, header=0, dtype=object).read()
+            bloque = bloque.apply(_columna_numerica)
+            bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+            inicio += len(bloque)
+            yield bloque
+            if len(datos) < self.tamano_bloque:
+                return
+
+
+class LectorTabular:
+    """
+    Lector de EDP exportados como CSV o Parquet, con la misma interfaz que ``LectorExcel``.
+
+    ``ruta`` es un archivo (una sola hoja) o un directorio con un archivo por
+    hoja, nombrado como la hoja sin espacios finales (``EDP 001.csv``,
+    ``NOC-1.parquet``). El CSV se lee por bloques de ``tamano_bloque`` filas con
+    las columnas de texto tipadas como texto; admite ``,`` o ``;`` como
+    separador (con ``;`` la coma es el separador decimal). El Parquet se lee por
+    lotes y solo con las columnas pedidas; requiere ``pyarrow``.
+    """
+
+    def __init__(self, ruta, tamano_bloque: int = 5000):
+        if tamano_bloque < 1:
+            raise ValueError('tamano_bloque debe ser mayor que 0')
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(ruta)
+        self.ruta = str(ruta)
+        self.tamano_bloque = tamano_bloque
+        self._directorio = os.path.isdir(ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cerrar(self) -> None:
+        pass
+
+    @property
+    def hojas(self) -> list:
+        if not self._directorio:
+            return [os.path.splitext(os.path.basename(self.ruta))[0]]
+        return sorted(
+            os.path.splitext(archivo)[0] for archivo in os.listdir(self.ruta)
+            if archivo.lower().endswith(EXTENSIONES_TABULARES)
+        )
+
+    def _archivo(self, nombre) -> str:
+        if not self._directorio:
+            if nombre in (0, self.hojas[0]):
+                return self.ruta
+            raise ValueError(f"Hoja '{nombre}' no encontrada en {self.ruta}")
+        if isinstance(nombre, int):
+            nombre = self.hojas[nombre]
+        for extension in EXTENSIONES_TABULARES:
+            ruta = os.path.join(self.ruta, f'{nombre.strip()}{extension}')
+            if os.path.exists(ruta):
+                return ruta
+        raise ValueError(f"Hoja '{nombre}' no encontrada en {self.ruta}")
+
+    def hoja(self, nombre=0, columnas=None) -> pd.DataFrame:
+        """Hoja completa como un único DataFrame."""
+        bloques = list(self.bloques(nombre, columnas))
+        return pd.concat(bloques) if len(bloques) > 1 else bloques[0]
+
+    def bloques(self, nombre=0, columnas=None):
+        """Itera la hoja en DataFrames de a lo más ``tamano_bloque`` filas."""
+        ruta = self._archivo(nombre)
+        if ruta.lower().endswith('.parquet'):
+            yield from self._bloques_parquet(ruta, columnas)
+        else:
+            yield from self._bloques_csv(ruta, columnas)
+
+    def _bloques_csv(self, ruta, columnas):
+        with open(ruta, encoding='utf-8-sig') as archivo:
+            encabezado = archivo.readline()
+        separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+        yield from pd.read_csv(
+            ruta,
+            sep=separador,
+            decimal=',' if separador == ';' else '.',
+            encoding='utf-8-sig',
+            dtype={columna: str for columna in COLUMNAS_TEXTO},
+            usecols=columnas,
+            chunksize=self.tamano_bloque,
+        )
+
+    def _bloques_parquet(self, ruta, columnas):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError('Leer archivos Parquet requiere pyarrow (pip install pyarrow)') from e
+
+        archivo = pq.ParquetFile(ruta)
+        nombres = archivo.schema_arrow.names
+        proyeccion = [c for c in nombres if columnas(c)] if columnas else nombres
+        inicio = 0
+        for lote in archivo.iter_batches(batch_size=self.tamano_bloque, columns=proyeccion):
+            bloque = lote.to_pandas()
+            bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+            inicio += len(bloque)
+            yield bloque
+
+
+def _columna_numerica(columna: pd.Series) -> pd.Series:
+    """Convierte a float las columnas cuyas celdas no vacías son todas numéricas."""
+    valores = columna.dropna()
+    if len(valores) and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores
+    ):
+        return columna.astype(float)
+    return columna
+
+
+def _convertir_celda(celda):
+    """Misma conversión de celdas que el lector openpyxl de pandas."""
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if celda.value is None:
+        return ''
+    if celda.data_type == TYPE_ERROR:
+        return float('nan')
+    if celda.data_type == TYPE_NUMERIC:
+        entero = int(celda.value)
+        return entero if entero == celda.value else float(celda.value)
+    return celda.value
+
+
+def _convertir_fila(celdas) -> list:
+    fila = [_convertir_celda(celda) for celda in celdas]
+    while fila and fila[-1] == '':
+        fila.pop()
+    return fila
+
+
+def _sin_filas_vacias_finales(filas):
+    """Descarta las filas vacías del final de la hoja (como pandas) sin leerla entera."""
+    vacias = 0
+    for fila in filas:
+        if not fila:
+            vacias += 1
+            continue
+        for _ in range(vacias):
+            yield []
+        vacias = 0
+        yield fila
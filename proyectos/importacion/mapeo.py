@@ -0,0 +1,215 @@
+from dataclasses import dataclass, asdict
+from datetime import date
+import numpy as np
+import pandas as pd
+
+# Columnas que entrega derivar_actividades, en el orden de los registros normalizados
+CAMPOS = (
+    'item', 'descripcion', 'avance', 'estado', 'observaciones',
+    'unidad', 'cantidad', 'precio_unitario', 'cantidad_ejecutada', 'ods',
+)
+
+# Columnas de la hoja consolidada que usa derivar_actividades (más las ODS n)
+COLUMNAS_CONSOLIDADO = ('Nº', 'ITEM', 'U', 'Cantidad', 'PU', 'TOTALES')
+
+
+def columna_consolidado(nombre) -> bool:
+    """Indica si derivar_actividades usa la columna; sirve de proyección al leer."""
+    return nombre in COLUMNAS_CONSOLIDADO or (isinstance(nombre, str) and nombre.startswith('ODS'))
+
+
+def derivar_actividades(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mapeo de la hoja consolidada del EDP completo a actividades.
+
+    Calcula los CAMPOS de todas las filas con operaciones por columna (sin
+    iterrows) y devuelve solo las filas válidas. Unidad, cantidad, PU y TOTALES
+    quedan como columnas propias (None si la celda no es un número utilizable) y
+    ``ods`` es una tupla ``(columna, cantidad)`` con las ODS distintas de cero.
+    """
+    vacia = pd.Series(np.nan, index=df.index, dtype=object)
+
+    def columna(nombre):
+        return df[nombre] if nombre in df.columns else vacia
+
+    def texto(nombre):
+        serie = columna(nombre)
+        return serie.where(serie.isna(), serie.map(str).str.strip()).fillna('').astype(object)
+
+    def numero(nombre):
+        return pd.to_numeric(columna(nombre), errors='coerce').astype(float).fillna(0)
+
+    # Descripción desde ITEM; se omiten filas vacías o de encabezado
+    descripcion = texto('ITEM')
+    validas = (descripcion != '') & ~descripcion.str.lower().isin(['item', 'descripción', 'actividad'])
+
+    # Avance según columnas ODS (solo valores numéricos positivos)
+    ods_cols = [col for col in df.columns if isinstance(col, str) and col.startswith('ODS')]
+    total_ods = pd.Series(0.0, index=df.index)
+    cantidad_ods = pd.Series(0, index=df.index)
+    for col in ods_cols:  # acumulación en el mismo orden que la suma fila a fila
+        valores = pd.to_numeric(df[col], errors='coerce').astype(float)
+        positivos = valores > 0
+        total_ods = total_ods + valores.where(positivos, 0.0)
+        cantidad_ods = cantidad_ods + positivos.astype(int)
+
+    total_col = numero('TOTALES')
+    cantidad_planificada = numero('Cantidad')
+
+    # Avance: (total ejecutado / cantidad planificada) * 100, o promedio de ODS
+    avance = np.select(
+        [(cantidad_planificada > 0) & (total_col > 0), total_ods > 0],
+        [
+            ((total_col / cantidad_planificada) * 100).clip(upper=100),
+            (total_ods / cantidad_ods.clip(lower=1)).clip(upper=100),
+        ],
+        default=0.0,
+    )
+    estado = np.select([avance >= 100, avance > 0], ['completada', 'en_ejecucion'], default='pendiente')
+
+    filas = pd.DataFrame({
+        'item': texto('Nº'),
+        'descripcion': descripcion,
+        'avance': avance,
+        'estado': estado,
+        'observaciones': '',
+        'unidad': texto('U').str.slice(0, 20),
+        'cantidad': _decimal(columna('Cantidad'), 10),
+        'precio_unitario': _decimal(columna('PU'), 14),
+        'cantidad_ejecutada': _decimal(columna('TOTALES'), 10),
+        'ods': _ejecuciones_ods(df, ods_cols),
+    }, index=df.index)
+    return filas[validas]
+
+
+def _decimal(serie: pd.Series, enteros: int) -> pd.Series:
+    """Números como float y None donde no hay número o no cabe en la columna decimal."""
+    numeros = pd.to_numeric(serie, errors='coerce').astype(float)
+    return numeros.astype(object).where(numeros.abs() < 10 ** enteros, None)
+
+
+def _ejecuciones_ods(df: pd.DataFrame, ods_cols: list) -> pd.Series:
+    """Por fila, tupla de (columna ODS, cantidad) con las cantidades numéricas distintas de cero."""
+    ejecuciones = [[] for _ in range(len(df))]
+    if ods_cols:
+        valores = np.column_stack([pd.to_numeric(df[col], errors='coerce').astype(float) for col in ods_cols])
+        nombres = [col.strip()[:30] for col in ods_cols]
+        filas, columnas = np.nonzero(np.nan_to_num(valores, nan=0.0) != 0)
+        for fila, col in zip(filas.tolist(), columnas.tolist()):
+            if abs(valores[fila, col]) < 10 ** 10:
+                ejecuciones[fila].append((nombres[col], float(valores[fila, col])))
+    return pd.Series([tuple(e) for e in ejecuciones], index=df.index, dtype=object)
+
+
+@dataclass(frozen=True)
+class ErrorCelda:
+    """Celda que no se pudo convertir; ``fila`` es la fila de Excel (1 = encabezado)."""
+    hoja: str
+    fila: int
+    columna: str
+    valor: str
+    motivo: str
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _registrar_errores(errores: list, hoja: str, columna: str, valores: pd.Series, motivo: str) -> None:
+    errores.extend(
+        ErrorCelda(hoja, int(idx) + 2, columna, str(valor), motivo) for idx, valor in valores.items()
+    )
+
+
+def _celdas_vacias(serie: pd.Series) -> pd.Series:
+    return serie.isna() | (serie.astype(str).str.strip() == '')
+
+
+def convertir_fechas(df: pd.DataFrame, columna: str, hoja: str, errores: list) -> pd.Series:
+    """
+    Convierte una columna completa a ``date`` (None si está vacía o es inválida).
+
+    Se prueba por columna completa: primero ISO 8601 (incluye las celdas que
+    openpyxl ya entrega como fecha), luego día/mes/año con el formato que pandas
+    infiere, y solo lo que aún no calza se reintenta celda a celda
+    (``format='mixed'``). Las celdas con contenido que no son fecha se agregan a
+    ``errores``.
+    """
+    if columna not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    serie = df[columna]
+    vacias = _celdas_vacias(serie)
+    candidatas = ~vacias
+    if not pd.api.types.is_datetime64_any_dtype(serie):
+        # Un número suelto no es una fecha (pandas lo leería como nanosegundos desde 1970)
+        candidatas &= pd.to_numeric(serie, errors='coerce').isna()
+
+    # dayfirst=True interpretaría '2025-02-04' como 2 de abril, por eso ISO va primero
+    fechas = pd.to_datetime(serie.where(candidatas), errors='coerce', format='ISO8601')
+    for formato in ({}, {'format': 'mixed'}):
+        reintentar = candidatas & fechas.isna()
+        if not reintentar.any():
+            break
+        fechas[reintentar] = pd.to_datetime(serie[reintentar], errors='coerce', dayfirst=True, **formato)
+
+    _registrar_errores(errores, hoja, columna, serie[~vacias & fechas.isna()], 'fecha inválida')
+    return fechas.dt.date.astype(object).where(fechas.notna(), None)
+
+
+def _texto(df: pd.DataFrame, columna: str) -> pd.Series:
+    """Columna como texto, con '' para celdas vacías o columnas ausentes."""
+    if columna not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[columna].fillna('').astype(object)
+
+
+def derivar_actividades_edp(df: pd.DataFrame, hoja: str, errores: list) -> pd.DataFrame:
+    """Mapeo de la hoja de actividades del EDP (``EDP 001``) sin iterar fila a fila."""
+    if '% Avance' in df.columns:
+        avance_celdas = df['% Avance']
+        avance = pd.to_numeric(avance_celdas, errors='coerce')
+        invalidas = avance.isna() & ~_celdas_vacias(avance_celdas)
+        _registrar_errores(errores, hoja, '% Avance', avance_celdas[invalidas], 'número inválido')
+        avance = avance.astype(float).fillna(0)
+    else:
+        avance = pd.Series(0.0, index=df.index)
+
+    descripcion = _texto(df, 'Descripción')
+    descripcion = descripcion.where(descripcion.astype(bool), _texto(df, 'Actividad'))
+
+    return pd.DataFrame({
+        'item': _texto(df, 'Item').map(str),
+        'descripcion': descripcion,
+        'fecha_programada': convertir_fechas(df, 'Fecha Programada', hoja, errores),
+        'fecha_real': convertir_fechas(df, 'Fecha Real', hoja, errores),
+        'avance': avance,
+        'estado': np.select([avance >= 100, avance > 0], ['completada', 'en_ejecucion'], default='pendiente'),
+        'observaciones': _texto(df, 'Observaciones'),
+    }, index=df.index)
+
+
+def derivar_noc(df: pd.DataFrame, hoja: str, errores: list, hoy: date = None) -> pd.DataFrame:
+    """
+    Mapeo de la hoja de No Conformidades (``NOC-1``). El estado es ``cerrada`` si
+    hay fecha de cierre, ``en_proceso`` si la columna Estado dice "en proceso" y
+    ``abierta`` en otro caso; sin fecha detectada válida se usa ``hoy``.
+    """
+    hoy = hoy or date.today()
+    fecha_detectada = convertir_fechas(df, 'Fecha Detectada', hoja, errores)
+    fecha_cierre = convertir_fechas(df, 'Fecha Cierre', hoja, errores)
+    en_proceso = _texto(df, 'Estado').astype(str).str.strip().str.lower() == 'en proceso'
+
+    if 'Código' in df.columns:
+        codigo = _texto(df, 'Código')
+    else:
+        codigo = 'NOC-' + pd.Series(df.index + 1, index=df.index).astype(str)
+    return pd.DataFrame({
+        'codigo': codigo,
+        'descripcion': _texto(df, 'Descripción'),
+        'causa': _texto(df, 'Causa'),
+        'accion_correctiva': _texto(df, 'Acción Correctiva'),
+        'fecha_detectada': fecha_detectada.where(fecha_detectada.notna(), hoy),
+        'fecha_cierre': fecha_cierre,
+        'estado': np.select(
+            [fecha_cierre.notna(), en_proceso], ['cerrada', 'en_proceso'], default='abierta'
+        ),
+    }, index=df.index)
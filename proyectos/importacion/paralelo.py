@@ -0,0 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .lectura import abrir_lector
+from .mapeo import CAMPOS, columna_consolidado, derivar_actividades
+
+
+def normalizar_archivo(ruta, motor: str = 'pandas', tamano_bloque: int = 5000, cache=None) -> list:
+    """
+    Lee y mapea un EDP completo (Excel, CSV o Parquet). Se ejecuta en un proceso hijo, por lo
+    que no toca la base de datos: devuelve tuplas simples con el orden de CAMPOS.
+    """
+    registros = []
+    with abrir_lector(ruta, motor, tamano_bloque, cache) as lector:
+        for bloque in lector.bloques(0, columna_consolidado):
+            filas = derivar_actividades(bloque)
+            registros.extend(zip(*(filas[campo].tolist() for campo in CAMPOS)))
+    return registros
+
+
+def normalizar_en_paralelo(rutas, workers: int, motor: str = 'pandas', tamano_bloque: int = 5000, cache=None):
+    """
+    Reparte los archivos en un ProcessPoolExecutor y entrega ``(ruta, registros, error)``
+    a medida que cada archivo termina, para que el proceso padre escriba sin esperar al resto.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(normalizar_archivo, ruta, motor, tamano_bloque, cache): ruta for ruta in rutas}
+        for futuro in as_completed(futuros):
+            ruta = futuros.pop(futuro)
+            try:
+                yield ruta, futuro.result(), None
+            except Exception as e:
+                yield ruta, None, e
@@ -0,0 +1,185 @@
+import hashlib
+from collections import Counter, defaultdict
+from django.db import transaction
+from actividades.models import Actividad, EjecucionODS
+from proyectos.models import Proyecto
+
+# Campos de Actividad que provienen de la planilla
+CAMPOS_ACTIVIDAD = (
+    'item', 'descripcion', 'avance', 'estado', 'observaciones',
+    'unidad', 'cantidad', 'precio_unitario', 'cantidad_ejecutada', 'huella',
+)
+
+
+def _numero(valor, decimales: int) -> str:
+    return '' if valor is None else f'{valor:.{decimales}f}'
+
+
+def huella_registro(item, descripcion, avance, estado, observaciones,
+                    unidad='', cantidad=None, precio_unitario=None, cantidad_ejecutada=None, ods=()) -> str:
+    """SHA-256 de un registro normalizado; cambia solo si cambia el contenido de la fila."""
+    contenido = '\x1f'.join([
+        item, descripcion, f'{avance:.2f}', estado, observaciones,
+        unidad, _numero(cantidad, 4), _numero(precio_unitario, 2), _numero(cantidad_ejecutada, 4),
+        ';'.join(f'{nombre}={cantidad_ods:.4f}' for nombre, cantidad_ods in ods),
+    ])
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+class SincronizadorActividades:
+    """
+    Reimportación incremental de las actividades de un proyecto.
+
+    Cada actividad se identifica por (proyecto, item); si un item se repite en
+    la planilla se empareja por orden de aparición. Solo participan las
+    actividades importadas (con huella): las creadas a mano nunca se
+    sobrescriben aunque compartan el item. Las importadas antes de que
+    existiera la huella las marca la migración actividades 0007. Dentro de una transacción se bloquea
+    la fila del proyecto hasta confirmarla, así dos importaciones del mismo
+    proyecto no se emparejan contra el mismo estado. Se compara la huella de la
+    fila con la guardada y solo se insertan las filas nuevas y se actualizan las
+    que cambiaron, a través del ``EscritorLotes``: las filas sin cambios no
+    escriben nada. Las ejecuciones ODS de las filas insertadas o actualizadas se
+    reemplazan al terminar cada bloque. Con ``eliminar=True``, ``finalizar()`` borra las actividades
+    importadas que ya no vienen en la planilla (las creadas a mano se conservan).
+
+    Uso::
+
+        sincronizador = SincronizadorActividades(proyecto, responsable, escritor)
+        for bloque in bloques:
+            sincronizador.procesar(registros_del_bloque)
+        resumen = sincronizador.finalizar()
+    """
+
+    def __init__(self, proyecto, responsable, escritor, eliminar: bool = False):
+        self.proyecto = proyecto
+        self.responsable = responsable
+        self.escritor = escritor
+        self.eliminar = eliminar
+        self.sin_cambios = 0
+        self.eliminadas = 0
+        self._vistos = Counter()
+
+        if transaction.get_connection().in_atomic_block:
+            Proyecto.objects.select_for_update().filter(pk=proyecto.pk).values_list('pk').first()
+
+        # Índice de lo importado: una sola consulta con los campos mínimos
+        self._existentes = defaultdict(list)
+        for id_, item, huella in (
+            _importadas(proyecto).order_by('id').values_list('id', 'item', 'huella')
+        ):
+            self._existentes[item or ''].append((id_, huella))
+        self._emparejados = set()
+
+    def procesar(self, registros) -> None:
+        """Compara un bloque de registros (orden de CAMPOS de mapeo) con lo guardado."""
+        modificadas = {}  # id -> ejecuciones ODS
+        nuevas = []  # (item, ocurrencia, ejecuciones ODS)
+        for (item, descripcion, avance, estado, observaciones,
+             unidad, cantidad, precio_unitario, cantidad_ejecutada, ods) in registros:
+            item = item[:20] if item else ''
+            avance = round(avance, 2)
+            huella = huella_registro(
+                item, descripcion, avance, estado, observaciones,
+                unidad, cantidad, precio_unitario, cantidad_ejecutada, ods,
+            )
+            partida = {
+                'unidad': unidad,
+                'cantidad': _redondear(cantidad, 4),
+                'precio_unitario': _redondear(precio_unitario, 2),
+                'cantidad_ejecutada': _redondear(cantidad_ejecutada, 4),
+            }
+
+            ocurrencia = self._vistos[item]
+            self._vistos[item] += 1
+            guardadas = self._existentes.get(item, [])
+            if ocurrencia < len(guardadas):
+                id_, huella_guardada = guardadas[ocurrencia]
+                self._emparejados.add(id_)
+                if huella_guardada == huella:
+                    self.sin_cambios += 1
+                    continue
+                self.escritor.modificar(
+                    Actividad(
+                        id=id_, proyecto=self.proyecto, item=item, descripcion=descripcion,
+                        avance=avance, estado=estado, observaciones=observaciones, huella=huella, **partida,
+                    ),
+                    CAMPOS_ACTIVIDAD,
+                )
+                modificadas[id_] = ods
+            else:
+                self.escritor.agregar(Actividad(
+                    proyecto=self.proyecto,
+                    item=item,
+                    descripcion=descripcion,
+                    responsable=self.responsable,
+                    fecha_programada=None,  # No hay fechas en este formato
+                    fecha_real=None,
+                    avance=avance,
+                    observaciones=observaciones,
+                    estado=estado,
+                    huella=huella,
+                    **partida,
+                ))
+                if ods:
+                    nuevas.append((item, ocurrencia, ods))
+
+        if modificadas or nuevas:
+            self._escribir_ods(modificadas, nuevas)
+
+    def _escribir_ods(self, modificadas: dict, nuevas: list) -> None:
+        """
+        Reemplaza las ejecuciones ODS de las actividades del bloque. Las recién
+        insertadas se identifican igual que al emparejar: k-ésima ocurrencia del
+        item por orden de id (bulk_create no devuelve ids en MySQL).
+        """
+        self.escritor.vaciar()
+        ejecuciones = [(id_, ods) for id_, ods in modificadas.items() if ods]
+        if nuevas:
+            ids_por_item = defaultdict(list)
+            for id_, item in (
+                _importadas(self.proyecto).filter(item__in={item for item, _, _ in nuevas})
+                .order_by('id').values_list('id', 'item')
+            ):
+                ids_por_item[item or ''].append(id_)
+            ejecuciones.extend((ids_por_item[item][ocurrencia], ods) for item, ocurrencia, ods in nuevas)
+
+        ids = list(modificadas)
+        for inicio in range(0, len(ids), self.escritor.batch_size):
+            EjecucionODS.objects.filter(actividad_id__in=ids[inicio:inicio + self.escritor.batch_size]).delete()
+        for actividad_id, ods in ejecuciones:
+            for nombre, cantidad in ods:
+                self.escritor.agregar(EjecucionODS(actividad_id=actividad_id, ods=nombre, cantidad=round(cantidad, 4)))
+
+    def finalizar(self) -> dict:
+        """Escribe lo pendiente, borra las filas desaparecidas si corresponde y devuelve el resumen."""
+        self.escritor.vaciar()
+        if self.eliminar:
+            faltantes = [
+                id_
+                for guardadas in self._existentes.values()
+                for id_, _ in guardadas
+                if id_ not in self._emparejados
+            ]
+            for inicio in range(0, len(faltantes), self.escritor.batch_size):
+                bloque = faltantes[inicio:inicio + self.escritor.batch_size]
+                _, por_modelo = Actividad.objects.filter(id__in=bloque).delete()
+                self.eliminadas += por_modelo.get(Actividad._meta.label, 0)
+        return self.resumen()
+
+    def resumen(self) -> dict:
+        return {
+            'insertadas': self.escritor.total(Actividad),
+            'actualizadas': self.escritor.actualizados[Actividad],
+            'sin_cambios': self.sin_cambios,
+            'eliminadas': self.eliminadas,
+        }
+
+
+def _importadas(proyecto):
+    """Actividades del proyecto que vinieron de una planilla (las creadas a mano no tienen huella)."""
+    return Actividad.objects.filter(proyecto=proyecto).exclude(huella='')
+
+
+def _redondear(valor, decimales: int):
+    return None if valor is None else round(valor, decimales)
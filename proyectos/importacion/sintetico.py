@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timedelta
+import openpyxl
+
+FORMATOS = ('edp', 'completo')
+
+UNIDADES = ('HH', 'GL', 'UN', 'M2', 'M3', 'DIA', 'MES')
+PARTIDAS = (
+    'Ingeniero Geomensor', 'Topógrafo', 'Alarife', 'Batimetría', 'Detección de Interferencias',
+    'GPS Geodésico', 'Estación Total', 'Nivel de Ingeniero', 'Escáner Láser', 'Dron Multirotor',
+    'Servicios de Laboratorio', 'Vehículo Petrolero', 'Gastos Reembolsables',
+)
+# Fecha base fija: el mismo tamaño y semilla generan siempre el mismo libro
+FECHA_BASE = datetime(2025, 1, 1)
+
+
+def generar(ruta, formato: str, filas: int, semilla: int = 0, **opciones) -> None:
+    """Libro EDP sintético con el formato que espera cada importador."""
+    if formato not in FORMATOS:
+        raise ValueError(f'formato debe ser uno de {FORMATOS}')
+    if formato == 'edp':
+        generar_edp(ruta, filas, semilla, **opciones)
+    else:
+        generar_edp_completo(ruta, filas, semilla, **opciones)
+
+
+def generar_edp(ruta, filas: int, semilla: int = 0, noc: int = None) -> None:
+    """
+    Libro para ``import_edp``: hojas ``CARATULA EP ``, ``EDP 001`` y ``NOC-1``.
+
+    Incluye los casos que el importador debe tolerar: fechas escritas como
+    texto (dd/mm/aaaa), celdas vacías y algunos avances no numéricos.
+    """
+    azar = random.Random(semilla)
+    noc = max(1, filas // 10) if noc is None else noc
+    libro = openpyxl.Workbook(write_only=True)
+
+    caratula = libro.create_sheet('CARATULA EP ')
+    caratula.append(['Cliente', 'Código', 'Nombre Proyecto', 'Supervisor'])
+    caratula.append(['Cliente Sintético', f'SINT-{filas}', f'Proyecto sintético de {filas} filas', 'Supervisor'])
+
+    actividades = libro.create_sheet('EDP 001')
+    actividades.append([
+        'Item', 'Descripción', 'Actividad', 'Fecha Programada', 'Fecha Real', '% Avance', 'Observaciones',
+    ])
+    for n in range(filas):
+        programada = FECHA_BASE + timedelta(days=azar.randint(0, 720))
+        real = programada + timedelta(days=azar.randint(-10, 30)) if azar.random() < 0.6 else None
+        if real is not None and azar.random() < 0.1:
+            real = real.strftime('%d/%m/%Y')
+        avance = azar.choice((0, 0, 25, 50, 75, 100, 100, round(azar.uniform(0, 100), 2)))
+        if azar.random() < 0.01:
+            avance = 'N/A'
+        actividades.append([
+            f'{n // 20 + 1}.{n % 20 + 1}',
+            azar.choice(PARTIDAS) if azar.random() < 0.9 else '',
+            f'Actividad {n + 1}',
+            programada,
+            real,
+            avance,
+            azar.choice(('', '', 'Revisar con ITO', 'Pendiente de aprobación')),
+        ])
+
+    nocs = libro.create_sheet('NOC-1')
+    nocs.append(['Código', 'Descripción', 'Causa', 'Acción Correctiva', 'Fecha Detectada', 'Fecha Cierre', 'Estado'])
+    for n in range(noc):
+        detectada = FECHA_BASE + timedelta(days=azar.randint(0, 720))
+        cierre = detectada + timedelta(days=azar.randint(1, 60)) if azar.random() < 0.4 else None
+        nocs.append([
+            f'NOC-{n + 1:04d}',
+            f'No conformidad {n + 1}',
+            azar.choice(('Material fuera de especificación', 'Error de replanteo', 'Falta de registro')),
+            azar.choice(('Reemplazo', 'Re-ejecución', 'Capacitación')),
+            detectada,
+            cierre,
+            '' if cierre else azar.choice(('Abierta', 'En proceso')),
+        ])
+
+    libro.save(ruta)
+
+
+def generar_edp_completo(ruta, filas: int, semilla: int = 0, ods: int = 12) -> None:
+    """
+    Libro para ``importar_edp_completo``: una hoja consolidada con ``Nº``, ``ITEM``,
+    ``U``, ``Cantidad``, ``PU``, columnas ``ODS n`` y ``TOTALES``, con una fila de
+    sección cada 10 partidas como en los EDP reales.
+    """
+    azar = random.Random(semilla)
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('EDP completo')
+    hoja.append(['Nº', 'ITEM', 'U', 'Cantidad', 'PU'] + [f'ODS {n}' for n in range(1, ods + 1)] + ['TOTALES'])
+
+    seccion = 0
+    for n in range(filas):
+        if n % 11 == 0:
+            seccion += 1
+            hoja.append([f'{seccion}.', f'Sección {seccion}'])
+            continue
+        cantidad = azar.randint(1, 500)
+        ejecutado = [
+            azar.randint(0, max(1, cantidad // ods)) if azar.random() < 0.5 else 0 for _ in range(ods)
+        ]
+        hoja.append(
+            [f'{seccion}.{n % 11}.', azar.choice(PARTIDAS), azar.choice(UNIDADES), cantidad,
+             round(azar.uniform(1_000, 500_000), 0)]
+            + ejecutado
+            + [sum(ejecutado)]
+        )
+
+    libro.save(ruta)
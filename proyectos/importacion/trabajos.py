@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils import timezone
+from proyectos.models import TrabajoImportacion
+
+# Comando de importación que ejecuta cada tipo de trabajo
+COMANDOS = {
+    'edp': 'import_edp',
+    'edp_completo': 'importar_edp_completo',
+}
+
+# Errores de celdas que se guardan en el trabajo (el total va en el mensaje)
+MAX_ERRORES_GUARDADOS = 200
+
+
+def cerrar_vencidos(timeout=None) -> int:
+    """
+    Marca con error los trabajos en proceso sin avance en ``timeout`` segundos
+    (EDP_IMPORTACION_TIMEOUT por defecto): su worker se cayó y nadie los
+    terminará. No se vuelven a encolar, porque un archivo que tumba al worker
+    lo tumbaría de nuevo; la importación es atómica y basta con subirlo otra vez.
+    """
+    timeout = settings.EDP_IMPORTACION_TIMEOUT if timeout is None else timeout
+    ahora = timezone.now()
+    return TrabajoImportacion.objects.filter(
+        estado='en_proceso', fecha_actualizacion__lt=ahora - timedelta(seconds=timeout),
+    ).update(
+        estado='error', fecha_fin=ahora, fecha_actualizacion=ahora,
+        mensaje=f'Sin avance en {timeout} s: el worker se detuvo. Vuelva a subir el archivo.',
+    )
+
+
+def tomar_siguiente():
+    """
+    Reserva el trabajo pendiente más antiguo y lo devuelve (None si no hay).
+
+    La reserva es un UPDATE condicionado al estado, así dos workers nunca
+    toman el mismo trabajo aunque lean la misma fila. Antes se cierran los
+    trabajos en proceso que quedaron abandonados (ver ``cerrar_vencidos``).
+    """
+    cerrar_vencidos()
+    while True:
+        trabajo = TrabajoImportacion.objects.filter(estado='pendiente').order_by('id').first()
+        if trabajo is None:
+            return None
+        ahora = timezone.now()
+        reservado = TrabajoImportacion.objects.filter(id=trabajo.id, estado='pendiente').update(
+            estado='en_proceso', fecha_inicio=ahora, fecha_actualizacion=ahora,
+        )
+        if reservado:
+            trabajo.refresh_from_db()
+            return trabajo
+
+
+class RegistroProgreso:
+    """
+    Guarda las filas procesadas del trabajo mientras la importación corre.
+
+    La importación puede ir en una sola transacción, así que el avance se
+    escribe por una conexión propia en autocommit para que el endpoint de
+    progreso lo vea de inmediato. SQLite admite un solo escritor a la vez: ahí
+    se usa la conexión normal y el avance queda visible al confirmar.
+    """
+
+    def __init__(self, trabajo):
+        self.trabajo = trabajo
+        self._conexion = None
+        if connection.vendor != 'sqlite':
+            self._conexion = connections.create_connection(DEFAULT_DB_ALIAS)
+
+    def __call__(self, filas: int) -> None:
+        self.trabajo.filas_procesadas = filas
+        if self._conexion is None:
+            TrabajoImportacion.objects.filter(id=self.trabajo.id).update(
+                filas_procesadas=filas, fecha_actualizacion=timezone.now(),
+            )
+            return
+        ops = self._conexion.ops
+        with self._conexion.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {ops.quote_name(TrabajoImportacion._meta.db_table)} '
+                f'SET {ops.quote_name("filas_procesadas")} = %s, {ops.quote_name("fecha_actualizacion")} = %s '
+                f'WHERE {ops.quote_name("id")} = %s',
+                [filas, ops.adapt_datetimefield_value(timezone.now()), self.trabajo.id],
+            )
+
+    def cerrar(self) -> None:
+        if self._conexion is not None:
+            self._conexion.close()
+
+
+def ejecutar(trabajo, motor: str = 'streaming', tamano_bloque: int = 1000) -> TrabajoImportacion:
+    """Corre la importación de un trabajo ya reservado y deja registrado el resultado."""
+    salida, errores_salida = StringIO(), StringIO()
+    errores_celdas = []
+    progreso = RegistroProgreso(trabajo)
+    opciones = {'motor': motor, 'tamano_bloque': tamano_bloque, 'progreso': progreso}
+    if trabajo.tipo == 'edp':
+        opciones['errores_celdas'] = errores_celdas
+    elif trabajo.codigo:
+        opciones['codigo'] = trabajo.codigo
+
+    try:
+        call_command(
+            COMANDOS[trabajo.tipo], trabajo.archivo.path, stdout=salida, stderr=errores_salida, **opciones
+        )
+        fallo = errores_salida.getvalue().strip()
+    except CommandError as e:
+        fallo = str(e)
+    except Exception as e:
+        fallo = f'{type(e).__name__}: {e}'
+    finally:
+        progreso.cerrar()
+
+    trabajo.estado = 'error' if fallo else 'completado'
+    trabajo.mensaje = fallo or salida.getvalue().strip()
+    if errores_celdas:
+        trabajo.mensaje += f'\n{len(errores_celdas)} celdas con errores'
+    trabajo.errores = [error.as_dict() for error in errores_celdas[:MAX_ERRORES_GUARDADOS]]
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=['estado', 'mensaje', 'errores', 'filas_procesadas', 'fecha_fin', 'fecha_actualizacion'])
+    return trabajo
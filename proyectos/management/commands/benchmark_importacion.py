@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from empresas.models import Empresa
+from proyectos.models import Proyecto, CuadroControl
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from proyectos.importacion.escritura import EscritorLotes
+from proyectos.importacion.lectura import LectorExcel, MOTORES
+from proyectos.importacion.mapeo import CAMPOS, derivar_actividades, derivar_actividades_edp, derivar_noc
+from proyectos.importacion.sincronizacion import SincronizadorActividades
+from proyectos.importacion.sintetico import generar
+from datetime import date, datetime
+import json
+import openpyxl
+import os
+import pandas as pd
+import platform
+import subprocess
+import tempfile
+import time
+
+# Importador medido -> formato del libro sintético que consume
+IMPORTADORES = {
+    'import_edp': 'edp',
+    'importar_edp_completo': 'completo',
+}
+ETAPAS = ('lectura', 'transformacion', 'escritura')
+
+
+class Command(BaseCommand):
+    help = "Mide lectura, transformación y escritura de los importadores EDP con libros sintéticos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas', type=int, nargs='+', default=[1000, 10000, 100000], help='Tamaños a medir'
+        )
+        parser.add_argument(
+            '--importador', choices=list(IMPORTADORES), action='append',
+            help='Importador a medir (por defecto ambos)'
+        )
+        parser.add_argument('--motor', choices=MOTORES, default='pandas', help='Motor de lectura')
+        parser.add_argument('--tamano-bloque', type=int, default=5000, help='Filas por bloque en modo streaming')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote de bulk_create')
+        parser.add_argument('--repeticiones', type=int, default=1, help='Se informa el mejor tiempo de cada etapa')
+        parser.add_argument('--semilla', type=int, default=0, help='Semilla de los libros sintéticos')
+        parser.add_argument(
+            '--directorio', type=str,
+            help='Dónde guardar los libros generados; si ya existen se reutilizan entre corridas'
+        )
+        parser.add_argument('--salida', type=str, default='benchmark_importacion.json', help='Archivo JSON de resultados')
+
+    def handle(self, *args, **options):
+        importadores = options['importador'] or list(IMPORTADORES)
+        temporal = None
+        directorio = options['directorio']
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        else:
+            temporal = tempfile.TemporaryDirectory()
+            directorio = temporal.name
+
+        resultados = []
+        try:
+            for importador in importadores:
+                for filas in options['filas']:
+                    ruta = self._libro(directorio, IMPORTADORES[importador], filas, options['semilla'])
+                    tiempos = {etapa: [] for etapa in ETAPAS}
+                    for _ in range(options['repeticiones']):
+                        for etapa, segundos in self._medir(importador, ruta, options).items():
+                            tiempos[etapa].append(segundos)
+                    resultado = {'importador': importador, 'filas': filas}
+                    resultado.update({f'{etapa}_s': round(min(tiempos[etapa]), 4) for etapa in ETAPAS})
+                    resultado['total_s'] = round(sum(resultado[f'{etapa}_s'] for etapa in ETAPAS), 4)
+                    resultado['filas_por_s'] = round(filas / resultado['total_s']) if resultado['total_s'] else 0
+                    resultados.append(resultado)
+                    self.stdout.write(
+                        f"{importador:<22} {filas:>7} filas  "
+                        + '  '.join(f"{etapa} {resultado[f'{etapa}_s']:.3f}s" for etapa in ETAPAS)
+                        + f"  ({resultado['filas_por_s']} filas/s)"
+                    )
+        finally:
+            if temporal is not None:
+                temporal.cleanup()
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump({'entorno': self._entorno(options), 'resultados': resultados}, archivo, indent=2)
+
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+
+    def _libro(self, directorio, formato, filas, semilla) -> str:
+        ruta = os.path.join(directorio, f'{formato}-{filas}-s{semilla}.xlsx')
+        if not os.path.exists(ruta):
+            self.stdout.write(f'Generando {os.path.basename(ruta)}...')
+            generar(ruta, formato, filas, semilla)
+        return ruta
+
+    def _medir(self, importador, ruta, options) -> dict:
+        """Ejecuta las tres etapas del importador; la escritura se revierte al terminar."""
+        tiempos = {}
+
+        inicio = time.perf_counter()
+        with LectorExcel(ruta, options['motor'], options['tamano_bloque']) as lector:
+            if importador == 'import_edp':
+                hojas = {nombre: list(lector.bloques(nombre)) for nombre in ('CARATULA EP ', 'EDP 001', 'NOC-1')}
+            else:
+                hojas = {0: list(lector.bloques(0))}
+        tiempos['lectura'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        errores = []
+        if importador == 'import_edp':
+            actividades = [derivar_actividades_edp(bloque, 'EDP 001', errores) for bloque in hojas['EDP 001']]
+            nocs = [derivar_noc(bloque, 'NOC-1', errores) for bloque in hojas['NOC-1']]
+        else:
+            actividades = [derivar_actividades(bloque) for bloque in hojas[0]]
+        tiempos['transformacion'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            empresa = Empresa.objects.create(nombre='Benchmark importación')
+            proyecto = Proyecto.objects.create(
+                codigo=f'BENCH-{time.time_ns()}', nombre='Benchmark', cliente=empresa, fecha_inicio=date.today(),
+            )
+            with EscritorLotes(options['batch_size']) as escritor:
+                if importador == 'import_edp':
+                    self._escribir_edp(escritor, proyecto, actividades, nocs)
+                else:
+                    sincronizador = SincronizadorActividades(proyecto, None, escritor)
+                    for filas in actividades:
+                        sincronizador.procesar(zip(*(filas[campo].tolist() for campo in CAMPOS)))
+                    sincronizador.finalizar()
+            CuadroControl.objects.create(proyecto=proyecto).actualizar()
+            transaction.set_rollback(True)
+        tiempos['escritura'] = time.perf_counter() - inicio
+        return tiempos
+
+    def _escribir_edp(self, escritor, proyecto, actividades, nocs) -> None:
+        """Misma construcción de instancias que import_edp."""
+        for filas in actividades:
+            for fila in filas.itertuples(index=False):
+                escritor.agregar(Actividad(
+                    proyecto=proyecto, item=fila.item, descripcion=fila.descripcion,
+                    fecha_programada=fila.fecha_programada, fecha_real=fila.fecha_real,
+                    avance=fila.avance, observaciones=fila.observaciones, estado=fila.estado,
+                ))
+        for filas in nocs:
+            for fila in filas.itertuples(index=False):
+                escritor.agregar(NoConformidad(
+                    proyecto=proyecto, codigo=fila.codigo, descripcion=fila.descripcion, causa=fila.causa,
+                    accion_correctiva=fila.accion_correctiva, fecha_detectada=fila.fecha_detectada,
+                    fecha_cierre=fila.fecha_cierre, estado=fila.estado,
+                ))
+
+    def _entorno(self, options) -> dict:
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'openpyxl': openpyxl.__version__,
+            'base_de_datos': connection.vendor,
+            'motor': options['motor'],
+            'tamano_bloque': options['tamano_bloque'],
+            'batch_size': options['batch_size'],
+            'repeticiones': options['repeticiones'],
+            'semilla': options['semilla'],
+        }
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from proyectos.models import CuadroControl, HistorialControl
+
+
+class Command(BaseCommand):
+    help = 'Guarda la foto diaria de todos los cuadros de control (un solo INSERT ... SELECT)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=str, help='Fecha de la foto (AAAA-MM-DD); por defecto hoy')
+        parser.add_argument(
+            '--recalcular', action='store_true',
+            help='Recalcula los cuadros de control en bloque antes de capturar'
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = parse_date(options['fecha'])
+            except ValueError:  # bien formada pero inexistente, p. ej. 2025-02-30
+                fecha = None
+            if fecha is None:
+                raise CommandError(f"Fecha inválida: {options['fecha']}")
+
+        inicio = time.monotonic()
+        if options['recalcular']:
+            CuadroControl.recalcular_en_bloque()
+        insertadas = HistorialControl.capturar(fecha)
+        duracion = time.monotonic() - inicio
+
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+        self.stdout.write(self.style.SUCCESS(f'Fotos de cuadros de control guardadas: {insertadas}'))
+        self.stdout.write(self.style.SUCCESS(f'Tiempo: {duracion:.2f}s'))
+        self.stdout.write(self.style.SUCCESS('=' * 50))
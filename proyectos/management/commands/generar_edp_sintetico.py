@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from proyectos.importacion.sintetico import FORMATOS, generar
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = "Genera un libro EDP sintético del tamaño indicado para pruebas de rendimiento"
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', type=str, help='Ruta del archivo .xlsx a crear')
+        parser.add_argument(
+            '--formato', choices=FORMATOS, default='edp',
+            help='edp: CARATULA EP / EDP 001 / NOC-1 (import_edp); completo: hoja consolidada (importar_edp_completo)'
+        )
+        parser.add_argument('--filas', type=int, default=1000, help='Filas de actividades')
+        parser.add_argument('--noc', type=int, help='Filas de NOC en formato edp (por defecto filas / 10)')
+        parser.add_argument('--ods', type=int, default=12, help='Columnas ODS en formato completo')
+        parser.add_argument('--semilla', type=int, default=0, help='Semilla aleatoria (mismo valor, mismo libro)')
+
+    def handle(self, *args, **options):
+        opciones = {'noc': options['noc']} if options['formato'] == 'edp' else {'ods': options['ods']}
+        inicio = time.perf_counter()
+        generar(options['salida'], options['formato'], options['filas'], options['semilla'], **opciones)
+        tamano = os.path.getsize(options['salida']) / 1024 / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"Libro {options['formato']} de {options['filas']} filas creado en {options['salida']} "
+            f"({tamano:.1f} MB, {time.perf_counter() - inicio:.1f}s)"
+        ))
@@ -1,169 +1,169 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from empresas.models import Empresa
 from proyectos.models import Proyecto, CuadroControl
 from actividades.models import Actividad
 from noc.models import NoConformidad
 from users.models import User
 from datetime import datetime
+from django.db import DatabaseError
 from django.utils.dateparse import parse_date
+from empresas.resumen import ajustar_proyecto, conteos_proyecto
+from actividades.estadisticas import invalidar as invalidar_estadisticas
+from busqueda.indice import indexar_proyecto
+from proyectos.versiones import subir as subir_version
+from proyectos.importacion.escritura import EscritorLotes, MODOS_TRANSACCION
+from proyectos.importacion.cache import CacheHojas
+from proyectos.importacion.lectura import abrir_lector, MOTORES
+from proyectos.importacion.mapeo import derivar_actividades_edp, derivar_noc
+import json
+
+# Errores de celdas que se muestran en consola (el reporte JSON los incluye todos)
+MAX_ERRORES_MOSTRADOS = 20
 
 
 class Command(BaseCommand):
     help = 'Importa datos desde un archivo Excel EDP'
+    # progreso: callable que recibe las filas procesadas tras cada bloque;
+    # errores_celdas: lista donde se agregan los ErrorCelda (ambos los usa procesar_importaciones)
+    stealth_options = ('progreso', 'errores_celdas')
 
     def add_arguments(self, parser):
-        parser.add_argument('excel_file', type=str, help='Ruta al archivo Excel')
+        parser.add_argument('excel_file', type=str, help='Ruta al archivo Excel, CSV/Parquet o directorio con un archivo por hoja')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote de bulk_create')
+        parser.add_argument(
+            '--transaccion', choices=MODOS_TRANSACCION, default='archivo',
+            help='Una transacción por archivo (revierte todo ante un error) o por lote'
+        )
+        parser.add_argument(
+            '--motor', choices=MOTORES, default='pandas',
+            help='pandas carga cada hoja completa; streaming la lee por bloques con memoria acotada'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=5000, help='Filas por bloque en modo streaming')
+        parser.add_argument('--reporte-errores', type=str, help='Ruta de un JSON con las celdas que no se pudieron convertir')
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Lee siempre el Excel, sin usar ni guardar la caché de hojas'
+        )
 
     def handle(self, *args, **options):
         excel_file = options['excel_file']
+        excel = None
+        errores = options.get('errores_celdas', [])
+        progreso = options.get('progreso') or (lambda filas: None)
         
         try:
-            excel = pd.ExcelFile(excel_file)
+            cache = None if options['no_cache'] else CacheHojas.desde_settings()
+            excel = abrir_lector(excel_file, options['motor'], options['tamano_bloque'], cache)
             self.stdout.write(self.style.SUCCESS(f'Archivo {excel_file} cargado correctamente'))
             
-            # 1️⃣ Crear empresa y proyecto
-            caratula = excel.parse('CARATULA EP ').fillna('')
-            cliente_nombre = caratula.iloc[0].get('Cliente', 'Cliente genérico')
-            empresa, created = Empresa.objects.get_or_create(nombre=cliente_nombre)
+            with EscritorLotes(options['batch_size'], options['transaccion']) as escritor:
+                # 1️⃣ Crear empresa y proyecto
+                caratula = excel.hoja('CARATULA EP ').fillna('')
+                cliente_nombre = caratula.iloc[0].get('Cliente', 'Cliente genérico')
+                empresa, created = Empresa.objects.get_or_create(nombre=cliente_nombre)
             
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Empresa creada: {empresa.nombre}'))
-            else:
-                self.stdout.write(f'Empresa existente: {empresa.nombre}')
+                if created:
+                    self.stdout.write(self.style.SUCCESS(f'Empresa creada: {empresa.nombre}'))
+                else:
+                    self.stdout.write(f'Empresa existente: {empresa.nombre}')
             
-            # Obtener responsable
-            responsable = User.objects.filter(is_superuser=True).first()
-            if not responsable:
-                self.stdout.write(self.style.ERROR('No hay superusuarios. Crea uno primero.'))
-                return
+                # Obtener responsable
+                responsable = User.objects.filter(is_superuser=True).first()
+                if not responsable:
+                    raise CommandError('No hay superusuarios. Crea uno primero.')
             
-            # Crear proyecto
-            codigo_proyecto = caratula.iloc[0].get('Código', 'EDP001')
-            nombre_proyecto = caratula.iloc[0].get('Nombre Proyecto', 'Proyecto sin nombre')
+                # Crear proyecto
+                codigo_proyecto = caratula.iloc[0].get('Código', 'EDP001')
+                nombre_proyecto = caratula.iloc[0].get('Nombre Proyecto', 'Proyecto sin nombre')
             
-            proyecto, created = Proyecto.objects.get_or_create(
-                codigo=codigo_proyecto,
-                defaults={
-                    'nombre': nombre_proyecto,
-                    'cliente': empresa,
-                    'responsable': responsable,
-                    'supervisor': caratula.iloc[0].get('Supervisor', ''),
-                    'fecha_inicio': datetime.today(),
-                    'estado': 'en_ejecucion'
-                }
-            )
+                proyecto, created = Proyecto.objects.get_or_create(
+                    codigo=codigo_proyecto,
+                    defaults={
+                        'nombre': nombre_proyecto,
+                        'cliente': empresa,
+                        'responsable': responsable,
+                        'supervisor': caratula.iloc[0].get('Supervisor', ''),
+                        'fecha_inicio': datetime.today(),
+                        'estado': 'en_ejecucion'
+                    }
+                )
             
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Proyecto creado: {proyecto.codigo}'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Proyecto ya existe: {proyecto.codigo}'))
+                if created:
+                    self.stdout.write(self.style.SUCCESS(f'Proyecto creado: {proyecto.codigo}'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'Proyecto ya existe: {proyecto.codigo}'))
+                # Al final se suma al resumen de la empresa solo la diferencia
+                conteos_previos = conteos_proyecto(proyecto.id)
             
-            # 2️⃣ Importar actividades desde "EDP 001"
-            try:
-                df_actividades = excel.parse('EDP 001').fillna('')
-                actividades_creadas = 0
+                # 2️⃣ Importar actividades desde "EDP 001"
+                try:
+                    actividades_creadas = 0
                 
-                for idx, row in df_actividades.iterrows():
-                    # Parsear fechas
-                    fecha_programada = None
-                    fecha_real = None
-                    
-                    if 'Fecha Programada' in row and row.get('Fecha Programada'):
-                        try:
-                            fecha_programada = pd.to_datetime(row['Fecha Programada']).date()
-                        except:
-                            pass
-                    
-                    if 'Fecha Real' in row and row.get('Fecha Real'):
-                        try:
-                            fecha_real = pd.to_datetime(row['Fecha Real']).date()
-                        except:
-                            pass
-                    
-                    # Obtener avance
-                    avance = 0
-                    if '% Avance' in row:
-                        try:
-                            avance = float(row['% Avance'])
-                        except:
-                            avance = 0
-                    
-                    # Determinar estado
-                    estado = 'pendiente'
-                    if avance >= 100:
-                        estado = 'completada'
-                    elif avance > 0:
-                        estado = 'en_ejecucion'
-                    
-                    Actividad.objects.create(
-                        proyecto=proyecto,
-                        item=str(row.get('Item', '')),
-                        descripcion=row.get('Descripción', '') or row.get('Actividad', ''),
-                        responsable=responsable,
-                        fecha_programada=fecha_programada,
-                        fecha_real=fecha_real,
-                        avance=avance,
-                        observaciones=row.get('Observaciones', ''),
-                        estado=estado
-                    )
-                    actividades_creadas += 1
+                    for bloque in excel.bloques('EDP 001'):
+                        filas = derivar_actividades_edp(bloque, 'EDP 001', errores)
+                        for fila in filas.itertuples(index=False):
+                            escritor.agregar(Actividad(
+                                proyecto=proyecto,
+                                item=fila.item,
+                                descripcion=fila.descripcion,
+                                responsable=responsable,
+                                fecha_programada=fila.fecha_programada,
+                                fecha_real=fila.fecha_real,
+                                avance=fila.avance,
+                                observaciones=fila.observaciones,
+                                estado=fila.estado
+                            ))
+                        actividades_creadas += len(filas)
+                        progreso(actividades_creadas)
                 
-                self.stdout.write(self.style.SUCCESS(f'{actividades_creadas} actividades importadas'))
+                    self.stdout.write(self.style.SUCCESS(f'{actividades_creadas} actividades importadas'))
                 
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Error al importar actividades: {e}'))
+                except DatabaseError:
+                    raise
+                except Exception as e:
+                    # Sin sus actividades el EDP no sirve: se revierte el archivo
+                    raise CommandError(f'Error al importar actividades: {e}') from e
             
-            # 3️⃣ Generar cuadro de control
-            control, created = CuadroControl.objects.get_or_create(proyecto=proyecto)
-            control.actualizar()
-            self.stdout.write(self.style.SUCCESS(f'Cuadro de control actualizado: {control.avance_global}%'))
+                # 3️⃣ Generar cuadro de control
+                escritor.vaciar()
+                control, created = CuadroControl.objects.get_or_create(proyecto=proyecto)
+                control.actualizar()
+                self.stdout.write(self.style.SUCCESS(f'Cuadro de control actualizado: {control.avance_global}%'))
             
-            # 4️⃣ Importar No Conformidades (NOC-1)
-            try:
-                df_noc = excel.parse('NOC-1').fillna('')
-                noc_creadas = 0
+                # 4️⃣ Importar No Conformidades (NOC-1)
+                try:
+                    noc_creadas = 0
                 
-                for idx, row in df_noc.iterrows():
-                    # Parsear fechas
-                    fecha_detectada = datetime.today().date()
-                    if 'Fecha Detectada' in row and row.get('Fecha Detectada'):
-                        try:
-                            fecha_detectada = pd.to_datetime(row['Fecha Detectada']).date()
-                        except:
-                            pass
-                    
-                    fecha_cierre = None
-                    if 'Fecha Cierre' in row and row.get('Fecha Cierre'):
-                        try:
-                            fecha_cierre = pd.to_datetime(row['Fecha Cierre']).date()
-                        except:
-                            pass
-                    
-                    # Determinar estado
-                    estado = 'abierta'
-                    if fecha_cierre:
-                        estado = 'cerrada'
-                    elif row.get('Estado', '').lower() == 'en proceso':
-                        estado = 'en_proceso'
-                    
-                    NoConformidad.objects.create(
-                        proyecto=proyecto,
-                        codigo=row.get('Código', f"NOC-{idx+1}"),
-                        descripcion=row.get('Descripción', ''),
-                        causa=row.get('Causa', ''),
-                        accion_correctiva=row.get('Acción Correctiva', ''),
-                        responsable=responsable,
-                        fecha_detectada=fecha_detectada,
-                        fecha_cierre=fecha_cierre,
-                        estado=estado
-                    )
-                    noc_creadas += 1
+                    for bloque in excel.bloques('NOC-1'):
+                        filas = derivar_noc(bloque, 'NOC-1', errores)
+                        for fila in filas.itertuples(index=False):
+                            escritor.agregar(NoConformidad(
+                                proyecto=proyecto,
+                                codigo=fila.codigo,
+                                descripcion=fila.descripcion,
+                                causa=fila.causa,
+                                accion_correctiva=fila.accion_correctiva,
+                                responsable=responsable,
+                                fecha_detectada=fila.fecha_detectada,
+                                fecha_cierre=fila.fecha_cierre,
+                                estado=fila.estado
+                            ))
+                        noc_creadas += len(filas)
+                        progreso(actividades_creadas + noc_creadas)
                 
-                self.stdout.write(self.style.SUCCESS(f'{noc_creadas} No Conformidades importadas'))
+                    self.stdout.write(self.style.SUCCESS(f'{noc_creadas} No Conformidades importadas'))
                 
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'No se cargaron NOC: {e}'))
+                except DatabaseError:
+                    raise
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'No se cargaron NOC: {e}'))
+
+                escritor.vaciar()
+                ajustar_proyecto(proyecto.id, conteos_previos)
+                invalidar_estadisticas()  # bulk_create no emite señales
+                indexar_proyecto(proyecto.id)
+                # Después del último lote: con --transaccion lote las NOC se confirman tras control.actualizar()
+                subir_version(proyecto_ids=[proyecto.id])
             
             # Resumen final
             self.stdout.write(self.style.SUCCESS('='*50))
@@ -171,11 +171,27 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f'Total actividades: {proyecto.actividades.count()}'))
             self.stdout.write(self.style.SUCCESS(f'Total NOC: {proyecto.noc.count()}'))
             self.stdout.write(self.style.SUCCESS(f'Avance global: {control.avance_global}%'))
+            if errores:
+                self.stdout.write(self.style.WARNING(f'Celdas con errores (se importaron vacías): {len(errores)}'))
+                for error in errores[:MAX_ERRORES_MOSTRADOS]:
+                    self.stdout.write(self.style.WARNING(
+                        f"  {error.hoja} fila {error.fila}, {error.columna}: {error.motivo} ({error.valor!r})"
+                    ))
+                if len(errores) > MAX_ERRORES_MOSTRADOS:
+                    self.stdout.write(self.style.WARNING(f'  ... y {len(errores) - MAX_ERRORES_MOSTRADOS} más'))
             self.stdout.write(self.style.SUCCESS('='*50))
             
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'Archivo no encontrado: {excel_file}'))
+        except CommandError:
+            raise
+        except FileNotFoundError as e:
+            raise CommandError(f'Archivo no encontrado: {excel_file}') from e
+        except DatabaseError as e:
+            raise CommandError(f'Error de base de datos, se revirtió la transacción en curso: {e}') from e
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error general: {e}'))
-            import traceback
-            traceback.print_exc()
+            raise CommandError(f'Error general: {e}') from e
+        finally:
+            if excel is not None:
+                excel.cerrar()
+            if options['reporte_errores']:
+                with open(options['reporte_errores'], 'w', encoding='utf-8') as archivo:
+                    json.dump([error.as_dict() for error in errores], archivo, ensure_ascii=False, indent=2)
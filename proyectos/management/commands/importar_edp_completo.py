@@ -1,34 +1,63 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from empresas.models import Empresa
 from proyectos.models import Proyecto, CuadroControl
-from actividades.models import Actividad
 from users.models import User
+from empresas.resumen import ajustar_proyecto, conteos_proyecto, en_pausa
+from actividades.estadisticas import invalidar as invalidar_estadisticas
+from busqueda.indice import indexar_proyecto
+from proyectos.versiones import subir as subir_version
+from proyectos.importacion.escritura import EscritorLotes, MODOS_TRANSACCION
+from proyectos.importacion.cache import CacheHojas
+from proyectos.importacion.lectura import abrir_lector, MOTORES
+from proyectos.importacion.mapeo import CAMPOS, columna_consolidado, derivar_actividades
+from proyectos.importacion.sincronizacion import SincronizadorActividades
 from datetime import datetime
-import pandas as pd
+from itertools import chain
 import os
 
 class Command(BaseCommand):
     help = "Importa datos desde Ejemplo EDP completo.xlsx (una sola hoja consolidada)"
+    # progreso: callable que recibe las filas procesadas tras cada bloque (lo usa procesar_importaciones)
+    stealth_options = ('progreso',)
 
     def add_arguments(self, parser):
-        parser.add_argument('archivo', type=str, help='Ruta al archivo Excel EDP completo')
+        parser.add_argument('archivo', type=str, help='Ruta al EDP completo (Excel, CSV o Parquet)')
         parser.add_argument('--codigo', type=str, default='EDP_COMPLETO', help='Código del proyecto')
         parser.add_argument('--nombre', type=str, default='Proyecto consolidado EDP completo', help='Nombre del proyecto')
+        parser.add_argument(
+            '--eliminar-faltantes', action='store_true',
+            help='Elimina las actividades importadas antes que ya no vienen en el archivo'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote de bulk_create')
+        parser.add_argument(
+            '--transaccion', choices=MODOS_TRANSACCION, default='archivo',
+            help='Una transacción por archivo (revierte todo ante un error) o por lote'
+        )
+        parser.add_argument(
+            '--motor', choices=MOTORES, default='pandas',
+            help='pandas carga la hoja completa; streaming la lee por bloques con memoria acotada'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=5000, help='Filas por bloque en modo streaming')
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Lee siempre el Excel, sin usar ni guardar la caché de hojas'
+        )
 
     def handle(self, *args, **options):
         ruta = options['archivo']
 
         if not os.path.exists(ruta):
-            self.stderr.write(self.style.ERROR(f'No se encontró el archivo: {ruta}'))
-            return
+            raise CommandError(f'No se encontró el archivo: {ruta}')
 
         self.stdout.write(self.style.SUCCESS(f'Leyendo archivo: {ruta}'))
         
         try:
-            df = pd.read_excel(ruta, sheet_name=0)
+            cache = None if options['no_cache'] else CacheHojas.desde_settings()
+            lector = abrir_lector(ruta, options['motor'], options['tamano_bloque'], cache)
+            bloques = lector.bloques(0, columna_consolidado)
+            df = next(bloques)  # primer bloque (la hoja completa con el motor pandas)
         except Exception as e:
-            self.stderr.write(self.style.ERROR(f'Error al leer el archivo: {e}'))
-            return
+            raise CommandError(f'Error al leer el archivo: {e}') from e
 
         # Detectar columnas automáticamente
         columnas = list(df.columns)
@@ -45,8 +74,8 @@ class Command(BaseCommand):
         
         responsable = User.objects.filter(is_superuser=True).first()
         if not responsable:
-            self.stderr.write(self.style.ERROR('No se encontró un usuario superusuario. Crea uno primero.'))
-            return
+            lector.cerrar()
+            raise CommandError('No se encontró un usuario superusuario. Crea uno primero.')
 
         # Crear proyecto base
         codigo_proyecto = options['codigo']
@@ -66,121 +95,55 @@ class Command(BaseCommand):
         if created:
             self.stdout.write(self.style.SUCCESS(f'Proyecto creado: {codigo_proyecto}'))
         else:
-            self.stdout.write(self.style.WARNING(f'Proyecto existente: {codigo_proyecto}. Se agregarán actividades.'))
-
-        total = 0
-        errores = 0
-        
-        for idx, fila in df.iterrows():
-            try:
-                # Obtener descripción de la columna ITEM
-                descripcion = ''
-                if 'ITEM' in fila and pd.notna(fila['ITEM']):
-                    descripcion = str(fila['ITEM']).strip()
-                
-                # Saltar filas sin descripción o filas de encabezado
-                if not descripcion or descripcion.lower() in ['item', 'descripción', 'actividad']:
-                    continue
-
-                # Obtener número de item (Nº)
-                item = ''
-                if 'Nº' in fila and pd.notna(fila['Nº']):
-                    item = str(fila['Nº']).strip()
+            self.stdout.write(self.style.WARNING(f'Proyecto existente: {codigo_proyecto}. Se sincronizarán actividades.'))
+        # Al final se suma al resumen de la empresa solo la diferencia
+        conteos_previos = conteos_proyecto(proyecto.id)
 
-                # Calcular avance basado en las columnas ODS (sumar valores numéricos)
-                avance = 0
-                total_ods = 0
-                cantidad_ods = 0
-                
-                # Buscar columnas ODS
-                ods_cols = [col for col in df.columns if col.startswith('ODS')]
-                for col in ods_cols:
-                    if col in fila and pd.notna(fila[col]):
-                        try:
-                            val = float(fila[col])
-                            if val > 0:
-                                total_ods += val
-                                cantidad_ods += 1
-                        except:
-                            pass
-                
-                # Obtener total si existe
-                total_col = 0
-                if 'TOTALES' in fila and pd.notna(fila['TOTALES']):
-                    try:
-                        total_col = float(fila['TOTALES'])
-                    except:
-                        pass
-                
-                # Obtener cantidad planificada
-                cantidad_planificada = 0
-                if 'Cantidad' in fila and pd.notna(fila['Cantidad']):
-                    try:
-                        cantidad_planificada = float(fila['Cantidad'])
-                    except:
-                        pass
-                
-                # Calcular avance: (total ejecutado / cantidad planificada) * 100
-                if cantidad_planificada > 0 and total_col > 0:
-                    avance = min((total_col / cantidad_planificada) * 100, 100)
-                elif total_ods > 0:
-                    # Si no hay cantidad planificada, usar promedio de ODS
-                    avance = min(total_ods / max(cantidad_ods, 1), 100)
-                else:
-                    avance = 0
+        resumen = {'insertadas': 0, 'actualizadas': 0, 'sin_cambios': 0, 'eliminadas': 0}
+        sincronizador = None
 
-                # Determinar estado basado en avance
-                if avance >= 100:
-                    estado = 'completada'
-                elif avance > 0:
-                    estado = 'en_ejecucion'
-                else:
-                    estado = 'pendiente'
-
-                # Construir observaciones con datos adicionales
-                observaciones_parts = []
-                if 'U' in fila and pd.notna(fila['U']):
-                    observaciones_parts.append(f"Unidad: {fila['U']}")
-                if cantidad_planificada > 0:
-                    observaciones_parts.append(f"Cantidad: {cantidad_planificada}")
-                if 'PU' in fila and pd.notna(fila['PU']):
-                    observaciones_parts.append(f"PU: {fila['PU']}")
-                if total_col > 0:
-                    observaciones_parts.append(f"Total: {total_col}")
-                
-                observaciones = ' | '.join(observaciones_parts)
-
-                # Crear actividad
-                Actividad.objects.create(
-                    proyecto=proyecto,
-                    item=item[:20] if item else '',
-                    descripcion=descripcion,
-                    responsable=responsable,
-                    fecha_programada=None,  # No hay fechas en este formato
-                    fecha_real=None,
-                    avance=round(avance, 2),
-                    observaciones=observaciones,
-                    estado=estado
-                )
-                total += 1
-
-            except Exception as e:
-                errores += 1
-                self.stderr.write(self.style.WARNING(f'Error en fila {idx + 2}: {e}'))
-
-        # Actualizar cuadro de control
         try:
-            control, _ = CuadroControl.objects.get_or_create(proyecto=proyecto)
-            control.actualizar()
+            with EscritorLotes(options['batch_size'], options['transaccion']) as escritor:
+                sincronizador = SincronizadorActividades(
+                    proyecto, responsable, escritor, eliminar=options['eliminar_faltantes']
+                )
+                procesadas = 0
+                for bloque in chain([df], bloques):
+                    filas = derivar_actividades(bloque)
+                    sincronizador.procesar(zip(*(filas[campo].tolist() for campo in CAMPOS)))
+                    procesadas += len(filas)
+                    if options.get('progreso'):
+                        options['progreso'](procesadas)
+                with en_pausa():  # los borrados entran en ajustar_proyecto
+                    resumen = sincronizador.finalizar()
+
+                # Actualizar cuadro de control
+                control, _ = CuadroControl.objects.get_or_create(proyecto=proyecto)
+                control.actualizar()
+                ajustar_proyecto(proyecto.id, conteos_previos)
+                invalidar_estadisticas()  # bulk_create/bulk_update no emiten señales
+                indexar_proyecto(proyecto.id)
+                subir_version(proyecto_ids=[proyecto.id])
             self.stdout.write(self.style.SUCCESS(f'Cuadro de control actualizado: {control.avance_global}%'))
         except Exception as e:
-            self.stderr.write(self.style.WARNING(f'Error al actualizar cuadro de control: {e}'))
+            mensaje = f'Error durante la importación, se revirtió la transacción en curso: {e}'
+            if options['transaccion'] == 'lote' and sincronizador is not None:
+                parcial = sincronizador.resumen()
+                mensaje += (
+                    f" (quedaron confirmados los lotes anteriores: {parcial['insertadas']} nuevas, "
+                    f"{parcial['actualizadas']} actualizadas)"
+                )
+            raise CommandError(mensaje) from e
+        finally:
+            lector.cerrar()
 
         # Resumen
         self.stdout.write(self.style.SUCCESS('=' * 50))
         self.stdout.write(self.style.SUCCESS(f'Importación completada'))
         self.stdout.write(self.style.SUCCESS(f'Proyecto: {proyecto.codigo} - {proyecto.nombre}'))
-        self.stdout.write(self.style.SUCCESS(f'Actividades importadas: {total}'))
-        if errores > 0:
-            self.stdout.write(self.style.WARNING(f'Errores encontrados: {errores}'))
+        self.stdout.write(self.style.SUCCESS(f"Actividades nuevas: {resumen['insertadas']}"))
+        self.stdout.write(self.style.SUCCESS(f"Actividades actualizadas: {resumen['actualizadas']}"))
+        self.stdout.write(self.style.SUCCESS(f"Actividades sin cambios: {resumen['sin_cambios']}"))
+        if options['eliminar_faltantes']:
+            self.stdout.write(self.style.SUCCESS(f"Actividades eliminadas: {resumen['eliminadas']}"))
         self.stdout.write(self.style.SUCCESS('=' * 50))
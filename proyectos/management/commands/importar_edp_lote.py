@@ -0,0 +1,151 @@
+from django.core.management.base import BaseCommand, CommandError
+from empresas.models import Empresa
+from proyectos.models import Proyecto, CuadroControl
+from users.models import User
+from empresas.resumen import ajustar_proyecto, conteos_proyecto, en_pausa
+from actividades.estadisticas import invalidar as invalidar_estadisticas
+from busqueda.indice import indexar_proyecto
+from proyectos.versiones import subir as subir_version
+from proyectos.importacion.escritura import EscritorLotes
+from proyectos.importacion.cache import CacheHojas
+from proyectos.importacion.lectura import EXTENSIONES_ARCHIVO, MOTORES
+from proyectos.importacion.paralelo import normalizar_en_paralelo
+from proyectos.importacion.sincronizacion import SincronizadorActividades
+from datetime import datetime
+import glob
+import json
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = "Importa en paralelo varios libros EDP completos (un proyecto por archivo)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('origen', type=str, help='Directorio con archivos .xlsx, .csv o .parquet, o patrón glob')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos de lectura en paralelo')
+        parser.add_argument(
+            '--eliminar-faltantes', action='store_true',
+            help='Elimina las actividades importadas antes que ya no vienen en cada archivo'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote de bulk_create')
+        parser.add_argument(
+            '--motor', choices=MOTORES, default='pandas',
+            help='pandas carga la hoja completa; streaming la lee por bloques con memoria acotada'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=5000, help='Filas por bloque en modo streaming')
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Lee siempre el Excel, sin usar ni guardar la caché de hojas'
+        )
+        parser.add_argument('--reporte', type=str, help='Ruta de un JSON con el resultado por archivo')
+
+    def handle(self, *args, **options):
+        rutas = self._resolver_archivos(options['origen'])
+        if not rutas:
+            raise CommandError(f"No se encontraron archivos en: {options['origen']}")
+        if options['workers'] < 1:
+            raise CommandError('--workers debe ser mayor que 0')
+
+        responsable = User.objects.filter(is_superuser=True).first()
+        if not responsable:
+            raise CommandError('No se encontró un usuario superusuario. Crea uno primero.')
+        empresa, _ = Empresa.objects.get_or_create(nombre='Cliente Genérico')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Importando {len(rutas)} archivos con {options['workers']} procesos"
+        ))
+
+        inicio = time.perf_counter()
+        resultados = []
+        proyecto_ids = []
+        total_filas = 0
+
+        cache = None if options['no_cache'] else CacheHojas.desde_settings()
+        for ruta, registros, error in normalizar_en_paralelo(
+            rutas, options['workers'], options['motor'], options['tamano_bloque'], cache
+        ):
+            if error is None:
+                try:
+                    proyecto, resumen = self._escribir(
+                        ruta, registros, empresa, responsable, options['batch_size'], options['eliminar_faltantes']
+                    )
+                except Exception as e:
+                    error = e
+                else:
+                    proyecto_ids.append(proyecto.id)
+                    total_filas += len(registros)
+
+            if error is None:
+                resultados.append({'archivo': ruta, 'proyecto': proyecto.codigo, 'filas': len(registros), **resumen})
+                self.stdout.write(
+                    f"  {os.path.basename(ruta)}: {len(registros)} actividades "
+                    f"({resumen['insertadas']} nuevas, {resumen['actualizadas']} actualizadas)"
+                )
+            else:
+                resultados.append({'archivo': ruta, 'error': f'{type(error).__name__}: {error}'})
+                self.stderr.write(self.style.WARNING(f'  {os.path.basename(ruta)}: {error}'))
+
+        if proyecto_ids:
+            CuadroControl.recalcular_en_bloque(Proyecto.objects.filter(id__in=proyecto_ids))
+            invalidar_estadisticas()  # bulk_create/bulk_update no emiten señales
+            for proyecto_id in proyecto_ids:
+                indexar_proyecto(proyecto_id)
+            subir_version(proyecto_ids=proyecto_ids)
+
+        segundos = max(time.perf_counter() - inicio, 1e-9)
+        fallidos = [r for r in resultados if 'error' in r]
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+
+        # Resumen
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+        self.stdout.write(self.style.SUCCESS('Importación en lote completada'))
+        self.stdout.write(self.style.SUCCESS(f'Archivos importados: {len(resultados) - len(fallidos)}/{len(resultados)}'))
+        self.stdout.write(self.style.SUCCESS(f'Actividades procesadas: {total_filas}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Tiempo: {segundos:.2f}s ({len(resultados) / segundos:.2f} archivos/s, {total_filas / segundos:.0f} filas/s)'
+        ))
+        if fallidos:
+            self.stdout.write(self.style.WARNING(f'Archivos con errores: {len(fallidos)}'))
+            for resultado in fallidos:
+                self.stdout.write(self.style.WARNING(f"  {resultado['archivo']}: {resultado['error']}"))
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+
+    def _resolver_archivos(self, origen: str) -> list:
+        if os.path.isdir(origen):
+            rutas = [
+                ruta for extension in EXTENSIONES_ARCHIVO
+                for ruta in glob.glob(os.path.join(origen, f'*{extension}'))
+            ]
+        else:
+            rutas = glob.glob(origen)
+        # Se omiten los archivos de bloqueo que deja Excel (~$archivo.xlsx)
+        return sorted(
+            ruta for ruta in rutas
+            if os.path.isfile(ruta) and not os.path.basename(ruta).startswith('~$')
+        )
+
+    def _escribir(self, ruta, registros, empresa, responsable, batch_size, eliminar) -> tuple:
+        """Crea o reutiliza el proyecto del archivo y sincroniza sus actividades en una sola transacción."""
+        codigo = os.path.splitext(os.path.basename(ruta))[0][:50]
+        with EscritorLotes(batch_size) as escritor:
+            proyecto, _ = Proyecto.objects.get_or_create(
+                codigo=codigo,
+                defaults={
+                    'nombre': codigo,
+                    'cliente': empresa,
+                    'responsable': responsable,
+                    'fecha_inicio': datetime.today(),
+                    'estado': 'en_ejecucion'
+                }
+            )
+            conteos_previos = conteos_proyecto(proyecto.id)
+            sincronizador = SincronizadorActividades(proyecto, responsable, escritor, eliminar=eliminar)
+            sincronizador.procesar(registros)
+            with en_pausa():  # los borrados entran en ajustar_proyecto
+                resumen = sincronizador.finalizar()
+            ajustar_proyecto(proyecto.id, conteos_previos)
+        return proyecto, resumen
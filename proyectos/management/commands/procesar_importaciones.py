@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from proyectos.importacion import trabajos
+from proyectos.importacion.lectura import MOTORES
+import time
+
+
+class Command(BaseCommand):
+    help = "Worker que ejecuta las importaciones EDP subidas desde el dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa los trabajos pendientes y termina')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument(
+            '--motor', choices=MOTORES, default='streaming',
+            help='Motor de lectura; streaming mantiene acotada la memoria del worker'
+        )
+        parser.add_argument(
+            '--tamano-bloque', type=int, default=1000,
+            help='Filas por bloque; el progreso se informa después de cada bloque'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Esperando trabajos de importación...'))
+        procesados = 0
+
+        while True:
+            close_old_connections()  # el worker vive mucho: no reutilizar conexiones caídas
+            trabajo = trabajos.tomar_siguiente()
+            if trabajo is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            self.stdout.write(f'Trabajo {trabajo.id}: {trabajo.archivo.name}')
+            trabajo = trabajos.ejecutar(trabajo, options['motor'], options['tamano_bloque'])
+            procesados += 1
+            estilo = self.style.SUCCESS if trabajo.estado == 'completado' else self.style.ERROR
+            self.stdout.write(estilo(
+                f'Trabajo {trabajo.id} {trabajo.get_estado_display().lower()}: '
+                f'{trabajo.filas_procesadas} filas ({trabajo.filas_por_segundo} filas/s)'
+            ))
+
+        self.stdout.write(self.style.SUCCESS(f'Trabajos procesados: {procesados}'))
@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from proyectos.models import Proyecto, CuadroControl
+
+
+class Command(BaseCommand):
+    help = 'Recalcula en bloque los cuadros de control (una consulta GROUP BY + bulk_update)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proyecto', type=str, action='append', help='Código de proyecto (se puede repetir)')
+        parser.add_argument('--empresa', type=int, action='append', help='ID de empresa cliente (se puede repetir)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Proyectos por lote de escritura')
+
+    def handle(self, *args, **options):
+        proyectos = None
+        if options['proyecto'] or options['empresa']:
+            proyectos = Proyecto.objects.all()
+            if options['proyecto']:
+                proyectos = proyectos.filter(codigo__in=options['proyecto'])
+            if options['empresa']:
+                proyectos = proyectos.filter(cliente_id__in=options['empresa'])
+
+        inicio = time.monotonic()
+        actualizados, creados = CuadroControl.recalcular_en_bloque(proyectos, chunk_size=options['chunk_size'])
+        duracion = time.monotonic() - inicio
+
+        total = actualizados + creados
+        velocidad = total / duracion if duracion else 0
+        self.stdout.write(self.style.SUCCESS('=' * 50))
+        self.stdout.write(self.style.SUCCESS(f'Cuadros de control actualizados: {actualizados}'))
+        self.stdout.write(self.style.SUCCESS(f'Cuadros de control creados: {creados}'))
+        self.stdout.write(self.style.SUCCESS(f'Tiempo: {duracion:.2f}s ({velocidad:.0f} proyectos/s)'))
+        self.stdout.write(self.style.SUCCESS('=' * 50))
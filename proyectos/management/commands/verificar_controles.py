@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from proyectos.models import CuadroControl
+
+
+class Command(BaseCommand):
+    help = 'Detecta cuadros de control desalineados con sus actividades y opcionalmente los repara'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help='Corregir los controles desalineados')
+        parser.add_argument('--batch-size', type=int, default=500, help='Tamaño de lote para bulk_update')
+
+    def handle(self, *args, **options):
+        desalineados = CuadroControl.desalineados().select_related('proyecto')
+        total = 0
+        for control in desalineados:
+            total += 1
+            self.stdout.write(
+                f'{control.proyecto.codigo}: guardado {control.completadas}/{control.total_actividades}, '
+                f'real {control.completadas_reales}/{control.total_real}; '
+                f'valor guardado {control.valor_contratado} ({control.avance_ponderado}%), '
+                f'real {control.valor_real}'
+            )
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Todos los cuadros de control están consistentes'))
+            return
+
+        if options['reparar']:
+            reparados = CuadroControl.reparar_desalineados(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{reparados} cuadros de control reparados'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{total} cuadros de control desalineados (use --reparar)'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0003_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuadrocontrol',
+            name='avance_ponderado',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='cuadrocontrol',
+            name='valor_contratado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+    ]
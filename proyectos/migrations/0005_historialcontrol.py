@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0002_resumenempresa'),
+        ('proyectos', '0004_control_avance_ponderado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialControl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('total_actividades', models.PositiveIntegerField(default=0)),
+                ('completadas', models.PositiveIntegerField(default=0)),
+                ('avance_global', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('valor_contratado', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('avance_ponderado', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_controles', to='empresas.empresa')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='proyectos.proyecto')),
+            ],
+            options={
+                'verbose_name': 'Historial de Control',
+                'verbose_name_plural': 'Historial de Controles',
+                'ordering': ['proyecto', 'fecha'],
+                'indexes': [models.Index(fields=['empresa', 'fecha'], name='historial_empresa_fecha_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='historialcontrol',
+            constraint=models.UniqueConstraint(fields=('proyecto', 'fecha'), name='historial_proyecto_fecha_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+
+def calcular_valor_avance(apps, schema_editor):
+    """Σ(avance × cantidad × PU) de cada proyecto, con un GROUP BY, para los controles existentes."""
+    Actividad = apps.get_model('actividades', 'Actividad')
+    CuadroControl = apps.get_model('proyectos', 'CuadroControl')
+    avance_valorizado = ExpressionWrapper(
+        F('avance') * F('cantidad') * F('precio_unitario'), output_field=DecimalField(max_digits=34, decimal_places=8)
+    )
+    sumas = dict(
+        Actividad.objects.order_by().values('proyecto_id').annotate(s=Sum(avance_valorizado))
+        .filter(s__isnull=False).values_list('proyecto_id', 's')
+    )
+    controles = list(CuadroControl.objects.filter(proyecto_id__in=sumas).only('id', 'proyecto_id'))
+    for control in controles:
+        control.valor_avance = sumas[control.proyecto_id]
+    CuadroControl.objects.bulk_update(controles, ['valor_avance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0007_versiondatos'),
+        ('actividades', '0006_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuadrocontrol',
+            name='valor_avance',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=34),
+        ),
+        migrations.RunPython(calcular_valor_avance, migrations.RunPython.noop),
+    ]
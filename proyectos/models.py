@@ -1,5 +1,10 @@
-from django.db import models
+from decimal import Decimal
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.db.models.lookups import GreaterThan
 from django.conf import settings
+from django.utils import timezone
 from empresas.models import Empresa
 
 
@@ -33,6 +38,10 @@ class Proyecto(models.Model):
         verbose_name = "Proyecto"
         verbose_name_plural = "Proyectos"
         ordering = ['-fecha_inicio']
+        indexes = [
+            # Autocompletar por prefijo (el código ya tiene índice único)
+            models.Index(fields=['nombre'], name='proyecto_nombre_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.codigo} - {self.nombre}"
@@ -43,21 +52,351 @@ class CuadroControl(models.Model):
     total_actividades = models.PositiveIntegerField(default=0)
     completadas = models.PositiveIntegerField(default=0)
     avance_global = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # Σ cantidad × PU de las partidas y Σ(avance × cantidad × PU) / Σ(cantidad × PU);
+    # avance_ponderado es None si ninguna actividad tiene cantidad y PU. valor_avance
+    # guarda Σ(avance × cantidad × PU) exacto para ajustar el ponderado con deltas
+    valor_contratado = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    valor_avance = models.DecimalField(max_digits=34, decimal_places=8, default=0)
+    avance_ponderado = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Cuadro de Control"
         verbose_name_plural = "Cuadros de Control"
 
-    def actualizar(self) -> None:
-        """Actualiza el avance global del proyecto basado en las actividades."""
-        total = self.proyecto.actividades.count()
-        completadas = self.proyecto.actividades.filter(estado='completada').count()
-        avance = (completadas / total * 100) if total else 0
+    @staticmethod
+    def _avance(total, completadas):
+        """Expresión SQL del avance global (%) a partir de total y completadas."""
+        return Case(
+            When(GreaterThan(total, 0), then=Round(completadas * Value(100.0) / total, 2)),
+            default=Value(0),
+            output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        )
+
+    @staticmethod
+    def _ponderado(valor, valor_avance):
+        """Expresión SQL del avance ponderado (%); NULL si el valor contratado es cero."""
+        return Round(valor_avance / NullIf(valor, Value(Decimal(0))), 2)
+
+    @staticmethod
+    def _sumas():
+        """Agregados de actividades que alimentan el control (para aggregate o GROUP BY)."""
+        from actividades.models import AVANCE_VALORIZADO, MONTO_CONTRATADO
+
+        return {
+            'total': Count('id'),
+            'completadas': Count('id', filter=models.Q(estado='completada')),
+            'valor': Sum(MONTO_CONTRATADO),
+            'valor_avance': Sum(AVANCE_VALORIZADO),
+        }
+
+    def _asignar(self, total, completadas, valor, valor_avance) -> None:
         self.total_actividades = total
         self.completadas = completadas
-        self.avance_global = avance
+        self.avance_global = round(Decimal(completadas * 100) / total, 2) if total else Decimal(0)
+        self.valor_contratado = round(valor or 0, 2)
+        self.valor_avance = valor_avance or 0
+        self.avance_ponderado = round(valor_avance / valor, 2) if valor else None
+
+    @property
+    def avance(self):
+        """Avance que se muestra: el ponderado con EDP_AVANCE_PONDERADO (si hay montos), si no el de actividades."""
+        if settings.EDP_AVANCE_PONDERADO and self.avance_ponderado is not None:
+            return self.avance_ponderado
+        return self.avance_global
+
+    @classmethod
+    def registrar_cambio(cls, proyecto_id, estado_anterior=None, estado_nuevo=None,
+                         montos_anteriores=None, montos_nuevos=None) -> int:
+        """
+        Aplica de forma incremental el alta, baja o cambio de una actividad.
+
+        ``estado_anterior`` es None para altas y ``estado_nuevo`` es None para bajas.
+        ``montos_anteriores`` y ``montos_nuevos`` son los de ``Actividad.montos()``
+        antes y después del cambio, para el avance ponderado. El ajuste se hace en
+        un único UPDATE con expresiones F, sin recorrer las actividades.
+        """
+        delta_total = (estado_nuevo is not None) - (estado_anterior is not None)
+        delta_completadas = (estado_nuevo == 'completada') - (estado_anterior == 'completada')
+        monto_anterior, avance_anterior = montos_anteriores or (0, 0)
+        monto_nuevo, avance_nuevo = montos_nuevos or (0, 0)
+        delta_valor = monto_nuevo - monto_anterior
+        delta_valor_avance = avance_nuevo - avance_anterior
+        if not (delta_total or delta_completadas or delta_valor or delta_valor_avance):
+            return 0
+        from .versiones import subir
+
+        # Los campos derivados van primero: MySQL evalúa el SET de izquierda a derecha
+        derivados, contadores = {}, {}
+        if delta_total or delta_completadas:
+            total = F('total_actividades') + delta_total
+            completadas = F('completadas') + delta_completadas
+            derivados['avance_global'] = cls._avance(total, completadas)
+            contadores.update(total_actividades=total, completadas=completadas)
+        if delta_valor or delta_valor_avance:
+            valor = F('valor_contratado') + Value(Decimal(delta_valor))
+            valor_avance = F('valor_avance') + Value(Decimal(delta_valor_avance))
+            derivados['avance_ponderado'] = cls._ponderado(valor, valor_avance)
+            contadores.update(valor_contratado=valor, valor_avance=valor_avance)
+        actualizados = cls.objects.filter(proyecto_id=proyecto_id).update(
+            **derivados, **contadores, fecha_actualizacion=timezone.now(),
+        )
+        subir(proyecto_ids=[proyecto_id])  # update() no emite señales
+        return actualizados
+
+    @classmethod
+    def desalineados(cls):
+        """Controles cuyos contadores o montos no coinciden con las actividades reales."""
+        from actividades.models import Actividad, AVANCE_VALORIZADO, MONTO_CONTRATADO
+
+        def suma(agregado, **filtros):
+            return Coalesce(Subquery(
+                Actividad.objects.filter(proyecto=OuterRef('proyecto_id'), **filtros)
+                .order_by().values('proyecto').annotate(s=agregado).values('s')
+            ), 0)
+
+        def decimal(expresion, decimales):
+            return Cast(expresion, models.DecimalField(max_digits=34, decimal_places=decimales))
+
+        # -1 en lugar de NULL para comparar el ponderado de proyectos sin montos
+        sin_ponderado = Value(Decimal(-1))
+        controles = cls.objects.annotate(
+            total_real=suma(Count('id')),
+            completadas_reales=suma(Count('id'), estado='completada'),
+            valor_real=decimal(Round(suma(Sum(MONTO_CONTRATADO)), 2), 2),
+            valor_avance_real=decimal(suma(Sum(AVANCE_VALORIZADO)), 8),
+        ).annotate(
+            ponderado_real=Coalesce(cls._ponderado(F('valor_real'), F('valor_avance_real')), sin_ponderado),
+            ponderado_guardado=Coalesce(F('avance_ponderado'), sin_ponderado),
+            # Al centavo: en bases sin DECIMAL exacto (SQLite) la suma puede diferir en el último decimal
+            valor_avance_guardado_redondo=Round(F('valor_avance'), 2),
+            valor_avance_real_redondo=Round(F('valor_avance_real'), 2),
+        )
+        return controles.exclude(
+            total_actividades=F('total_real'), completadas=F('completadas_reales'),
+            valor_contratado=F('valor_real'), ponderado_guardado=F('ponderado_real'),
+            valor_avance_guardado_redondo=F('valor_avance_real_redondo'),
+        )
+
+    @classmethod
+    def reparar_desalineados(cls, batch_size: int = 500) -> int:
+        """Corrige en bloque los controles desalineados; devuelve cuántos se repararon."""
+        from .versiones import subir
+
+        ahora = timezone.now()
+        controles = list(cls.desalineados())
+        for control in controles:
+            control._asignar(
+                control.total_real, control.completadas_reales, control.valor_real, control.valor_avance_real,
+            )
+            control.fecha_actualizacion = ahora
+        with transaction.atomic():
+            cls.objects.bulk_update(
+                controles,
+                ['total_actividades', 'completadas', 'avance_global', 'valor_contratado', 'valor_avance',
+                 'avance_ponderado', 'fecha_actualizacion'],
+                batch_size=batch_size,
+            )
+            subir(proyecto_ids=[control.proyecto_id for control in controles])
+        return len(controles)
+
+    @classmethod
+    def recalcular_en_bloque(cls, proyectos=None, chunk_size: int = 500) -> tuple:
+        """
+        Recalcula los controles de muchos proyectos con una sola consulta GROUP BY.
+
+        ``proyectos`` es un queryset de Proyecto (todos si es None). Los controles
+        faltantes se crean con bulk_create. Devuelve (actualizados, creados).
+        """
+        from actividades.models import Actividad
+        from .versiones import subir
+
+        actividades = Actividad.objects.all()
+        if proyectos is None:
+            proyectos = Proyecto.objects.all()
+        else:
+            actividades = actividades.filter(proyecto__in=proyectos)
+        conteos = {
+            fila['proyecto_id']: (fila['total'], fila['completadas'], fila['valor'], fila['valor_avance'])
+            for fila in actividades.order_by().values('proyecto_id').annotate(**cls._sumas())
+        }
+
+        ids = list(proyectos.order_by('id').values_list('id', flat=True))
+        ahora = timezone.now()
+        actualizados = creados = 0
+        for inicio in range(0, len(ids), chunk_size):
+            bloque = ids[inicio:inicio + chunk_size]
+            existentes = {c.proyecto_id: c for c in cls.objects.filter(proyecto_id__in=bloque)}
+            actualizar, crear = [], []
+            for proyecto_id in bloque:
+                control = existentes.get(proyecto_id) or cls(proyecto_id=proyecto_id)
+                control._asignar(*conteos.get(proyecto_id, (0, 0, None, None)))
+                control.fecha_actualizacion = ahora
+                (actualizar if control.pk else crear).append(control)
+            with transaction.atomic():
+                cls.objects.bulk_update(
+                    actualizar,
+                    ['total_actividades', 'completadas', 'avance_global', 'valor_contratado', 'valor_avance',
+                     'avance_ponderado', 'fecha_actualizacion'],
+                    batch_size=chunk_size,
+                )
+                cls.objects.bulk_create(crear, batch_size=chunk_size)
+                subir(proyecto_ids=bloque)
+            actualizados += len(actualizar)
+            creados += len(crear)
+        return actualizados, creados
+
+    def actualizar(self) -> None:
+        """Recalcula por completo el avance global y el ponderado con una sola consulta de agregados."""
+        sumas = self.proyecto.actividades.aggregate(**self._sumas())
+        self._asignar(sumas['total'], sumas['completadas'], sumas['valor'], sumas['valor_avance'])
         self.save()
 
     def __str__(self) -> str:
         return f"Control {self.proyecto.codigo} ({self.avance_global}%)"
+
+
+class HistorialControl(models.Model):
+    """
+    Foto diaria de un cuadro de control, para graficar el avance en el tiempo.
+
+    Solo se agregan filas (una por proyecto y día) con ``capturar``; la empresa
+    se copia del proyecto para consultar rangos por empresa sin joins.
+    """
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='historial')
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='historial_controles')
+    fecha = models.DateField()
+    total_actividades = models.PositiveIntegerField(default=0)
+    completadas = models.PositiveIntegerField(default=0)
+    avance_global = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    valor_contratado = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    avance_ponderado = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Historial de Control"
+        verbose_name_plural = "Historial de Controles"
+        ordering = ['proyecto', 'fecha']
+        constraints = [
+            # También es el índice de las consultas por proyecto y rango de fechas
+            models.UniqueConstraint(fields=['proyecto', 'fecha'], name='historial_proyecto_fecha_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['empresa', 'fecha'], name='historial_empresa_fecha_idx'),
+        ]
+
+    @classmethod
+    def capturar(cls, fecha=None) -> int:
+        """
+        Copia el estado actual de todos los cuadros de control con un solo
+        INSERT ... SELECT. Los proyectos que ya tienen foto de ``fecha`` (hoy por
+        defecto) se omiten, así que repetirlo el mismo día no duplica filas.
+        Devuelve las filas insertadas.
+        """
+        fecha = fecha or timezone.localdate()
+        ops = connection.ops
+        historial = ops.quote_name(cls._meta.db_table)
+        control = ops.quote_name(CuadroControl._meta.db_table)
+        proyecto = ops.quote_name(Proyecto._meta.db_table)
+        columnas = ('total_actividades', 'completadas', 'avance_global', 'valor_contratado', 'avance_ponderado')
+        destino = ', '.join(ops.quote_name(c) for c in ('proyecto_id', 'empresa_id', 'fecha') + columnas)
+        origen = ', '.join(f'c.{ops.quote_name(c)}' for c in columnas)
+        fecha_sql = ops.adapt_datefield_value(fecha)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {historial} ({destino}) '
+                f'SELECT c.{ops.quote_name("proyecto_id")}, p.{ops.quote_name("cliente_id")}, %s, {origen} '
+                f'FROM {control} c INNER JOIN {proyecto} p ON p.{ops.quote_name("id")} = c.{ops.quote_name("proyecto_id")} '
+                f'WHERE NOT EXISTS (SELECT 1 FROM {historial} h '
+                f'WHERE h.{ops.quote_name("proyecto_id")} = c.{ops.quote_name("proyecto_id")} '
+                f'AND h.{ops.quote_name("fecha")} = %s)',
+                [fecha_sql, fecha_sql],
+            )
+            return cursor.rowcount
+
+    def __str__(self) -> str:
+        return f"{self.proyecto_id} {self.fecha} ({self.avance_global}%)"
+
+
+class TrabajoImportacion(models.Model):
+    """Importación EDP subida desde el dashboard; la ejecuta ``procesar_importaciones``."""
+    TIPO_CHOICES = [
+        ('edp', 'EDP (CARATULA EP / EDP 001 / NOC-1)'),
+        ('edp_completo', 'EDP completo (hoja consolidada)'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    archivo = models.FileField(upload_to='importaciones/%Y/%m/')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='edp')
+    codigo = models.CharField(max_length=50, blank=True, help_text='Código del proyecto (solo EDP completo)')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    errores = models.JSONField(default=list, blank=True)
+    mensaje = models.TextField(blank=True)
+    creado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='importaciones'
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Trabajo de importación"
+        verbose_name_plural = "Trabajos de importación"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'id'], name='trabajo_estado_id_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Importación {self.id} ({self.get_estado_display()})"
+
+    @property
+    def filas_por_segundo(self) -> float:
+        if not self.fecha_inicio:
+            return 0.0
+        segundos = ((self.fecha_fin or timezone.now()) - self.fecha_inicio).total_seconds()
+        return round(self.filas_procesadas / segundos, 1) if segundos > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        """Estado del trabajo para el endpoint de progreso."""
+        return {
+            'id': self.id,
+            'archivo': self.archivo.name,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'filas_procesadas': self.filas_procesadas,
+            'filas_por_segundo': self.filas_por_segundo,
+            'errores': self.errores,
+            'mensaje': self.mensaje,
+            'fecha_creacion': self.fecha_creacion,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+        }
+
+
+class VersionDatos(models.Model):
+    """
+    Contador que sube con cada escritura en proyectos, actividades, NOC o cuadros
+    de control: uno global y uno por proyecto (ver proyectos.versiones). Las
+    vistas lo usan como ETag/Last-Modified para responder 304 sin consultar nada más.
+    """
+    clave = models.CharField(max_length=40, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    fecha_modificacion = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Versión de datos"
+        verbose_name_plural = "Versiones de datos"
+
+    def __str__(self):
+        return f"{self.clave} v{self.version}"
@@ -8,17 +8,25 @@ class ProyectoSerializer(serializers.ModelSerializer):
     cliente = EmpresaSerializer(read_only=True)
     responsable = UsuarioSerializer(read_only=True)
     avance_global = serializers.SerializerMethodField()
+    avance_ponderado = serializers.SerializerMethodField()
 
     class Meta:
         model = Proyecto
         fields = [
             'id', 'codigo', 'nombre', 'cliente', 'responsable', 'supervisor',
-            'fecha_inicio', 'fecha_termino', 'estado', 'avance_global'
+            'fecha_inicio', 'fecha_termino', 'estado', 'avance_global', 'avance_ponderado'
         ]
 
     def get_avance_global(self, obj: Proyecto) -> float:
+        """Avance principal: ponderado por monto si EDP_AVANCE_PONDERADO está activo y hay montos."""
         control = getattr(obj, 'control', None)
-        return float(control.avance_global) if control else 0.0
+        return float(control.avance) if control else 0.0
+
+    def get_avance_ponderado(self, obj: Proyecto):
+        control = getattr(obj, 'control', None)
+        if control is None or control.avance_ponderado is None:
+            return None
+        return float(control.avance_ponderado)
 
 
 class CuadroControlSerializer(serializers.ModelSerializer):
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from empresas.models import Empresa
+from actividades.models import Actividad
+from noc.models import NoConformidad
+from .models import Proyecto, CuadroControl
+from .versiones import subir
+
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_delete, sender=Proyecto)
+def version_por_proyecto(sender, instance, **kwargs):
+    subir(proyecto_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Actividad)
+@receiver(post_delete, sender=Actividad)
+@receiver(post_save, sender=NoConformidad)
+@receiver(post_delete, sender=NoConformidad)
+@receiver(post_save, sender=CuadroControl)
+@receiver(post_delete, sender=CuadroControl)
+def version_por_detalle(sender, instance, **kwargs):
+    subir(proyecto_ids=[instance.proyecto_id])
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def version_por_empresa(sender, instance, **kwargs):
+    # El nombre del cliente aparece en el detalle de sus proyectos
+    subir(empresa_ids=[instance.pk])
+
+
+# Datos del usuario que muestran el dashboard y la API (ver UsuarioSerializer)
+CAMPOS_USUARIO_VISIBLES = ('username', 'first_name', 'last_name', 'email')
+
+
+def proyectos_de_usuario(usuario_id) -> set:
+    """Proyectos donde el usuario es responsable del proyecto, de una actividad o de una NOC."""
+    ids = set(Proyecto.objects.filter(responsable_id=usuario_id).values_list('id', flat=True))
+    for modelo in (Actividad, NoConformidad):
+        ids.update(
+            modelo.objects.filter(responsable_id=usuario_id).order_by()
+            .values_list('proyecto_id', flat=True).distinct()
+        )
+    return ids
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def guardar_usuario_anterior(sender, instance, update_fields=None, **kwargs):
+    visibles = update_fields is None or set(update_fields) & set(CAMPOS_USUARIO_VISIBLES)
+    instance._visibles_anteriores = (
+        sender.objects.filter(pk=instance.pk).values_list(*CAMPOS_USUARIO_VISIBLES).first()
+        if instance.pk and visibles else None
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def version_por_usuario(sender, instance, created, **kwargs):
+    # Un usuario nuevo aún no aparece en ningún proyecto y un login solo cambia last_login
+    anterior = getattr(instance, '_visibles_anteriores', None)
+    actual = tuple(getattr(instance, campo) for campo in CAMPOS_USUARIO_VISIBLES)
+    if not created and anterior is not None and anterior != actual:
+        subir(proyecto_ids=proyectos_de_usuario(instance.pk))
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def version_por_usuario_borrado(sender, instance, **kwargs):
+    # Después del borrado las referencias ya quedan en NULL (SET_NULL sin señales)
+    subir(proyecto_ids=proyectos_de_usuario(instance.pk))
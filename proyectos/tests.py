@@ -1,3 +1,767 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from empresas.models import Empresa
+from actividades.models import Actividad
+from users.models import User
+from .importacion.cache import CacheHojas, escribir_bloque, huella_archivo, leer_bloque
+from .importacion.escritura import EscritorLotes
+from .importacion.lectura import LectorExcel, LectorTabular, abrir_lector
+from .importacion.mapeo import columna_consolidado, derivar_actividades, derivar_noc
+from .importacion.sincronizacion import SincronizadorActividades
+from .models import Proyecto, CuadroControl, HistorialControl
+from .versiones import CLAVE_PENDIENTE, obtener
 
-# Create your tests here.
+
+class CuadroControlIncrementalTests(TestCase):
+    def setUp(self):
+        empresa = Empresa.objects.create(nombre='Cliente')
+        self.proyecto = Proyecto.objects.create(
+            codigo='P1', nombre='P1', cliente=empresa, fecha_inicio=date(2025, 1, 1),
+        )
+        self.control = CuadroControl.objects.create(proyecto=self.proyecto)
+
+    def test_deltas_equivalen_a_recalculo(self):
+        with self.assertNumQueries(1):
+            CuadroControl.registrar_cambio(self.proyecto.id, estado_nuevo='completada')
+        CuadroControl.registrar_cambio(self.proyecto.id, estado_nuevo='pendiente')
+        CuadroControl.registrar_cambio(self.proyecto.id, estado_nuevo='pendiente')
+        CuadroControl.registrar_cambio(self.proyecto.id, 'pendiente', 'completada')
+        CuadroControl.registrar_cambio(self.proyecto.id, estado_anterior='pendiente')
+        self.control.refresh_from_db()
+        self.assertEqual((self.control.total_actividades, self.control.completadas), (2, 2))
+        self.assertEqual(self.control.avance_global, Decimal('100.00'))
+
+        CuadroControl.registrar_cambio(self.proyecto.id, estado_nuevo='pendiente')
+        self.control.refresh_from_db()
+        self.assertEqual(self.control.avance_global, Decimal('66.67'))
+
+    def test_reparar_desalineados(self):
+        Actividad.objects.create(proyecto=self.proyecto, descripcion='A', estado='completada')
+        Actividad.objects.create(proyecto=self.proyecto, descripcion='B')
+        self.assertEqual(CuadroControl.desalineados().count(), 1)
+        self.assertEqual(CuadroControl.reparar_desalineados(), 1)
+        self.control.refresh_from_db()
+        self.assertEqual((self.control.total_actividades, self.control.completadas), (2, 1))
+        self.assertEqual(self.control.avance_global, Decimal('50.00'))
+        self.assertFalse(CuadroControl.desalineados().exists())
+
+
+class RecalcularEnBloqueTests(TestCase):
+    def test_crea_y_actualiza_controles(self):
+        empresa = Empresa.objects.create(nombre='Cliente')
+        proyectos = [
+            Proyecto.objects.create(codigo=f'P{i}', nombre='P', cliente=empresa, fecha_inicio=date(2025, 1, 1))
+            for i in range(3)
+        ]
+        CuadroControl.objects.create(proyecto=proyectos[0], total_actividades=99)
+        Actividad.objects.create(proyecto=proyectos[1], descripcion='A', estado='completada')
+        Actividad.objects.create(proyecto=proyectos[1], descripcion='B')
+
+        actualizados, creados = CuadroControl.recalcular_en_bloque(chunk_size=2)
+        self.assertEqual((actualizados, creados), (1, 2))
+        self.assertEqual(CuadroControl.objects.get(proyecto=proyectos[0]).total_actividades, 0)
+        self.assertEqual(CuadroControl.objects.get(proyecto=proyectos[1]).avance_global, Decimal('50.00'))
+        self.assertFalse(CuadroControl.desalineados().exists())
+
+
+class AvancePonderadoTests(TestCase):
+    def setUp(self):
+        empresa = Empresa.objects.create(nombre='Cliente')
+        self.proyecto = Proyecto.objects.create(
+            codigo='P1', nombre='P1', cliente=empresa, fecha_inicio=date(2025, 1, 1),
+        )
+        # 1.000 x 90 = 90.000 al 100% y 100 x 100 = 10.000 al 0%: 90% ponderado, 50% por actividades
+        Actividad.objects.create(
+            proyecto=self.proyecto, descripcion='A', estado='completada', avance=100, cantidad=1000, precio_unitario=90,
+        )
+        Actividad.objects.create(proyecto=self.proyecto, descripcion='B', cantidad=100, precio_unitario=100)
+        Actividad.objects.create(proyecto=self.proyecto, descripcion='Sin monto', avance=50)
+
+    def test_actualizar_en_una_consulta(self):
+        control = CuadroControl.objects.create(proyecto=self.proyecto)
+        with self.assertNumQueries(2):  # agregados + UPDATE
+            control.actualizar()
+        self.assertEqual(control.avance_global, Decimal('33.33'))
+        self.assertEqual(control.valor_contratado, Decimal('100000'))
+        self.assertEqual(control.avance_ponderado, Decimal('90'))
+
+    def test_bloque_y_update_coinciden(self):
+        CuadroControl.recalcular_en_bloque()
+        control = CuadroControl.objects.get(proyecto=self.proyecto)
+        self.assertEqual(control.avance_ponderado, Decimal('90.00'))
+
+        # B pasa a 50%: el delta sube el ponderado sin recorrer las actividades
+        actividad = Actividad.objects.get(descripcion='B')
+        montos_anteriores = actividad.montos()
+        actividad.avance = 50
+        actividad.save()
+        with self.assertNumQueries(1):
+            CuadroControl.registrar_cambio(
+                self.proyecto.id, 'pendiente', 'pendiente', montos_anteriores, actividad.montos(),
+            )
+        control.refresh_from_db()
+        self.assertEqual(control.avance_ponderado, Decimal('95.00'))
+        self.assertEqual(control.valor_contratado, Decimal('100000.00'))
+        self.assertFalse(CuadroControl.desalineados().exists())
+
+        # Baja de A (90.000 al 100%): quedan 10.000 al 50%
+        a = Actividad.objects.get(descripcion='A')
+        CuadroControl.registrar_cambio(self.proyecto.id, estado_anterior='completada', montos_anteriores=a.montos())
+        a.delete()
+        control.refresh_from_db()
+        self.assertEqual((control.valor_contratado, control.avance_ponderado), (Decimal('10000.00'), Decimal('50.00')))
+        self.assertEqual((control.total_actividades, control.completadas), (2, 0))
+        self.assertFalse(CuadroControl.desalineados().exists())
+
+        with self.settings(EDP_AVANCE_PONDERADO=True):
+            self.assertEqual(control.avance, Decimal('50.00'))
+        self.assertEqual(control.avance, control.avance_global)
+
+    def test_reparar_montos_desalineados(self):
+        CuadroControl.recalcular_en_bloque()
+        self.assertFalse(CuadroControl.desalineados().exists())
+        Actividad.objects.filter(descripcion='B').update(avance=100)
+        self.assertEqual(CuadroControl.desalineados().count(), 1)
+        CuadroControl.objects.update(valor_contratado=1)
+        self.assertEqual(CuadroControl.reparar_desalineados(), 1)
+        control = CuadroControl.objects.get(proyecto=self.proyecto)
+        self.assertEqual((control.valor_contratado, control.avance_ponderado), (Decimal('100000.00'), Decimal('100.00')))
+        self.assertFalse(CuadroControl.desalineados().exists())
+
+        # Proyecto sin montos: el ponderado NULL también se compara y se repara
+        Actividad.objects.update(cantidad=None)
+        self.assertEqual(CuadroControl.reparar_desalineados(), 1)
+        self.assertIsNone(CuadroControl.objects.get(proyecto=self.proyecto).avance_ponderado)
+        self.assertFalse(CuadroControl.desalineados().exists())
+
+    def test_sin_montos_queda_vacio(self):
+        Actividad.objects.update(cantidad=None)
+        CuadroControl.recalcular_en_bloque()
+        control = CuadroControl.objects.get(proyecto=self.proyecto)
+        self.assertIsNone(control.avance_ponderado)
+        with self.settings(EDP_AVANCE_PONDERADO=True):
+            self.assertEqual(control.avance, control.avance_global)
+
+
+class HistorialControlTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Cliente')
+        self.proyectos = [
+            Proyecto.objects.create(codigo=f'P{i}', nombre='P', cliente=self.empresa, fecha_inicio=date(2025, 1, 1))
+            for i in range(2)
+        ]
+        for proyecto, completadas in zip(self.proyectos, (1, 3)):
+            CuadroControl.objects.create(
+                proyecto=proyecto, total_actividades=4, completadas=completadas, avance_global=completadas * 25,
+            )
+
+    def test_capturar_una_vez_por_dia(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(HistorialControl.capturar(date(2025, 3, 1)), 2)
+        self.assertEqual(HistorialControl.capturar(date(2025, 3, 1)), 0)
+        foto = HistorialControl.objects.get(proyecto=self.proyectos[1])
+        self.assertEqual((foto.empresa, foto.completadas, foto.avance_global), (self.empresa, 3, Decimal('75.00')))
+
+    def test_api_serie_reducida(self):
+        from datetime import timedelta
+
+        for dia in range(100):
+            CuadroControl.objects.filter(proyecto=self.proyectos[0]).update(completadas=dia % 5)
+            HistorialControl.capturar(date(2025, 1, 1) + timedelta(days=dia))
+
+        respuesta = self.client.get('/api/historial/', {'proyecto': self.proyectos[0].id, 'puntos': 10})
+        datos = respuesta.json()
+        self.assertEqual(datos['fotos'], 100)
+        self.assertEqual(len(datos['serie']), 10)
+        self.assertEqual(datos['serie'][-1]['fecha'], '2025-04-10')
+
+        respuesta = self.client.get('/api/historial/', {
+            'empresa': self.empresa.id, 'desde': '2025-01-01', 'hasta': '2025-01-01',
+        })
+        self.assertEqual(respuesta.json()['serie'], [{
+            'fecha': '2025-01-01', 'total_actividades': 8, 'completadas': 3,
+            'avance_global': 37.5, 'avance_ponderado': None,
+        }])
+        self.assertEqual(self.client.get('/api/historial/').status_code, 400)
+        self.assertEqual(self.client.get('/api/historial/', {'proyecto': 1, 'desde': 'ayer'}).status_code, 400)
+
+    def test_fecha_bien_formada_pero_inexistente(self):
+        from django.core.management.base import CommandError
+
+        respuesta = self.client.get('/api/historial/', {'proyecto': self.proyectos[0].id, 'hasta': '2025-02-30'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('2025-02-30', respuesta.json()['detail'])
+        with self.assertRaisesMessage(CommandError, 'Fecha inválida: 2025-02-30'):
+            call_command('capturar_historial', fecha='2025-02-30', stdout=StringIO())
+
+
+class VersionDatosTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa = Empresa.objects.create(nombre='Cliente')
+            self.proyectos = [
+                Proyecto.objects.create(
+                    codigo=f'P{i}', nombre='P', cliente=self.empresa, fecha_inicio=date(2025, 1, 1),
+                    responsable=User.objects.get_or_create(username='responsable')[0],
+                )
+                for i in range(2)
+            ]
+        self.url = f'/dashboard/proyectos/{self.proyectos[0].id}/'
+
+    def test_sube_al_confirmar_una_vez_por_transaccion(self):
+        _, global_antes, _ = obtener()
+        _, otro_antes, _ = obtener(self.proyectos[1].id)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Actividad.objects.create(proyecto=self.proyectos[0], descripcion='A')
+            Actividad.objects.create(proyecto=self.proyectos[0], descripcion='B')
+            self.assertEqual(obtener()[1], global_antes)  # aún sin confirmar
+        self.assertEqual(len([c for c in callbacks if getattr(c, 'clave', None) == CLAVE_PENDIENTE]), 1)
+        self.assertEqual(obtener()[1], global_antes + 1)
+        self.assertEqual(obtener(self.proyectos[1].id)[1], otro_antes)
+
+    def test_304_antes_de_consultar(self):
+        respuesta = self.client.get(self.url)
+        etag, modificado = respuesta['ETag'], respuesta['Last-Modified']
+        with self.assertNumQueries(1):  # solo la versión del proyecto
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modificado).status_code, 304)
+
+        # Cambiar otro proyecto no invalida este detalle, pero sí el dashboard y la API
+        dashboard = self.client.get('/dashboard/')['ETag']
+        api = self.client.get('/api/actividades/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            CuadroControl.registrar_cambio(self.proyectos[1].id, estado_nuevo='pendiente')
+            Actividad.objects.bulk_create([Actividad(proyecto=self.proyectos[1], descripcion='C')])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/dashboard/', HTTP_IF_NONE_MATCH=dashboard).status_code, 200)
+        self.assertEqual(self.client.get('/api/actividades/', HTTP_IF_NONE_MATCH=api).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa.nombre = 'Cliente renombrado'
+            self.empresa.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_editar_responsable_invalida_sus_proyectos(self):
+        responsable = self.proyectos[0].responsable
+        otro = User.objects.create(username='otro')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyectos[1].responsable = otro
+            self.proyectos[1].save()
+        antes, otro_antes = obtener(self.proyectos[0].id)[1], obtener(self.proyectos[1].id)[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            responsable.save(update_fields=['last_login'])
+        self.assertEqual(obtener(self.proyectos[0].id)[1], antes)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            responsable.first_name = 'Renombrado'
+            responsable.save()
+        self.assertEqual(obtener(self.proyectos[0].id)[1], antes + 1)
+        self.assertEqual(obtener(self.proyectos[1].id)[1], otro_antes)
+        self.assertContains(self.client.get(self.url), 'Renombrado')
+
+    def test_etag_incluye_version_del_codigo(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.settings(EDP_VERSION_CODIGO='release-2'):
+            respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('release-2', respuesta['ETag'])
+
+
+class VersionImportadoresTests(TestCase):
+    def test_import_edp_sube_la_version_despues_del_ultimo_lote(self):
+        from unittest import mock
+        from noc.models import NoConformidad
+        from .importacion.sintetico import generar
+        from .versiones import subir
+
+        User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        noc_al_subir = []
+
+        def registrar(proyecto_ids=(), **kwargs):
+            noc_al_subir.append(NoConformidad.objects.filter(proyecto_id__in=proyecto_ids).count())
+            subir(proyecto_ids, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'EDP.xlsx')
+            generar(ruta, 'edp', 30, noc=5)
+            with mock.patch('proyectos.management.commands.import_edp.subir_version', side_effect=registrar):
+                call_command('import_edp', ruta, transaccion='lote', batch_size=4, no_cache=True, stdout=StringIO())
+        self.assertEqual(noc_al_subir, [5])
+
+
+class EjecutarTrabajoTests(TestCase):
+    def setUp(self):
+        from .importacion.sintetico import generar
+
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.directorio.name, EDP_CACHE_DIR=os.path.join(self.directorio.name, 'cache'))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.ruta = os.path.join(self.directorio.name, 'EDP.xlsx')
+        generar(self.ruta, 'edp', 10, noc=2)
+
+    def _trabajo(self, tipo):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .models import TrabajoImportacion
+
+        with open(self.ruta, 'rb') as archivo:
+            return TrabajoImportacion.objects.create(
+                tipo=tipo, estado='en_proceso', archivo=SimpleUploadedFile('EDP.xlsx', archivo.read()),
+            )
+
+    def test_importacion_correcta_queda_completada(self):
+        from .importacion.trabajos import ejecutar
+
+        trabajo = ejecutar(self._trabajo('edp'))
+        self.assertEqual(trabajo.estado, 'completado', trabajo.mensaje)
+        self.assertEqual(Actividad.objects.count(), 10)
+
+    def test_fallo_al_importar_actividades_queda_con_error(self):
+        from unittest import mock
+        from .importacion.trabajos import ejecutar
+
+        with mock.patch(
+            'proyectos.management.commands.import_edp.derivar_actividades_edp', side_effect=ValueError('hoja dañada'),
+        ):
+            trabajo = ejecutar(self._trabajo('edp'))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertEqual(trabajo.mensaje, 'Error al importar actividades: hoja dañada')
+        self.assertFalse(Proyecto.objects.exists())
+
+    def test_sin_superusuario_queda_con_error(self):
+        from .importacion.trabajos import ejecutar
+
+        User.objects.filter(is_superuser=True).delete()
+        trabajo = ejecutar(self._trabajo('edp_completo'))
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertIn('superusuario', trabajo.mensaje)
+
+
+class EscritorLotesTests(TestCase):
+    def setUp(self):
+        empresa = Empresa.objects.create(nombre='Cliente')
+        self.proyecto = Proyecto.objects.create(
+            codigo='P1', nombre='P1', cliente=empresa, fecha_inicio=date(2025, 1, 1),
+        )
+
+    def test_inserta_en_lotes(self):
+        with self.assertNumQueries(4):  # savepoint + 2 lotes + release
+            with EscritorLotes(batch_size=3) as escritor:
+                for i in range(5):
+                    escritor.agregar(Actividad(proyecto=self.proyecto, descripcion=str(i)))
+        self.assertEqual(escritor.total(Actividad), 5)
+        self.assertEqual(self.proyecto.actividades.count(), 5)
+
+    def test_error_revierte_archivo(self):
+        with self.assertRaises(RuntimeError):
+            with EscritorLotes(batch_size=2) as escritor:
+                for i in range(3):
+                    escritor.agregar(Actividad(proyecto=self.proyecto, descripcion=str(i)))
+                raise RuntimeError('fila inválida')
+        self.assertEqual(self.proyecto.actividades.count(), 0)
+        self.assertEqual(escritor.total(Actividad), 0)
+
+
+class LectorExcelTests(TestCase):
+    def test_streaming_equivale_a_pandas(self):
+        import openpyxl
+        import pandas as pd
+
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['Nº', 'ITEM', 'U', 'Cantidad', None, 'ODS 1'])
+        hoja.append(['1.', 'Sección', None, None, None, 'Total'])
+        for i in range(1, 12):
+            hoja.append([f'1.{i}', f'Partida {i}', 'HH', i * 10, None, i])
+        hoja.append([])
+        hoja.append(['2.', 'Otra sección'])
+        hoja.append(['TOTAL', None, None, 660])
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as archivo:
+            libro.save(archivo.name)
+            esperado = LectorExcel(archivo.name, 'pandas').hoja(0)
+            with LectorExcel(archivo.name, 'streaming', tamano_bloque=4) as lector:
+                bloques = list(lector.bloques(0))
+
+        self.assertEqual([len(b) for b in bloques], [4, 4, 4, 3])
+        pd.testing.assert_frame_equal(pd.concat(bloques), esperado, check_dtype=False)
+
+
+class LectorTabularTests(TestCase):
+    def test_csv_equivale_a_excel(self):
+        import pandas as pd
+        from .importacion.sintetico import generar
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'EDP.xlsx')
+            generar(ruta, 'completo', 60)
+            hoja = LectorExcel(ruta).hoja(0)
+            esperado = derivar_actividades(hoja)
+            # Exportación con separador ';' y coma decimal, como la entrega Excel en español
+            hoja.to_csv(os.path.join(directorio, 'EDP.csv'), index=False, sep=';', decimal=',')
+
+            lector = abrir_lector(os.path.join(directorio, 'EDP.csv'), tamano_bloque=25)
+            self.assertIsInstance(lector, LectorTabular)
+            bloques = list(lector.bloques(0, columna_consolidado))
+
+        self.assertEqual([len(b) for b in bloques], [25, 25, 10])
+        pd.testing.assert_frame_equal(pd.concat([derivar_actividades(b) for b in bloques]), esperado)
+
+    def test_directorio_con_una_hoja_por_archivo(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            with open(os.path.join(directorio, 'EDP 001.csv'), 'w', encoding='utf-8') as archivo:
+                archivo.write('Item,Descripción,% Avance\n1.10,Replanteo,50\n')
+            lector = abrir_lector(directorio)
+            df = lector.hoja('EDP 001 ')
+            self.assertEqual(lector.hojas, ['EDP 001'])
+            with self.assertRaises(ValueError):
+                lector.hoja('NOC-1')
+
+        self.assertEqual(df.iloc[0]['Item'], '1.10')  # columna de texto: no se convierte a 1.1
+
+
+class ImportarEdpLoteTests(TestCase):
+    def test_importa_archivos_y_reporta_fallidos(self):
+        import openpyxl
+
+        User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        with tempfile.TemporaryDirectory() as directorio:
+            for nombre, filas in (('EDP-A', 3), ('EDP-B', 5)):
+                libro = openpyxl.Workbook()
+                libro.active.append(['Nº', 'ITEM', 'Cantidad', 'TOTALES'])
+                for i in range(filas):
+                    libro.active.append([f'1.{i}', f'Partida {i}', 10, 10 if i % 2 else 0])
+                libro.save(os.path.join(directorio, f'{nombre}.xlsx'))
+            with open(os.path.join(directorio, 'EDP-roto.xlsx'), 'w') as archivo:
+                archivo.write('no es un libro')
+
+            salida = StringIO()
+            with override_settings(EDP_CACHE_DIR=os.path.join(directorio, 'cache')):
+                call_command('importar_edp_lote', directorio, workers=2, stdout=salida, stderr=StringIO())
+
+        self.assertEqual(Actividad.objects.filter(proyecto__codigo='EDP-A').count(), 3)
+        self.assertEqual(Actividad.objects.filter(proyecto__codigo='EDP-B').count(), 5)
+        self.assertEqual(CuadroControl.objects.get(proyecto__codigo='EDP-B').completadas, 2)
+        self.assertIn('Archivos importados: 2/3', salida.getvalue())
+
+
+# unidad, cantidad, precio unitario, cantidad ejecutada y ejecuciones ODS vacías
+SIN_PARTIDA = ('', None, None, None, ())
+
+
+class SincronizadorActividadesTests(TestCase):
+    def setUp(self):
+        empresa = Empresa.objects.create(nombre='Cliente')
+        self.proyecto = Proyecto.objects.create(
+            codigo='P1', nombre='P1', cliente=empresa, fecha_inicio=date(2025, 1, 1),
+        )
+        self.registros = [
+            ('1.1', 'Topografía', 50.0, 'en_ejecucion', '') + SIN_PARTIDA,
+            ('1.2', 'Batimetría', 0.0, 'pendiente', '') + SIN_PARTIDA,
+            ('1.3', 'Laboratorio', 100.0, 'completada', '') + SIN_PARTIDA,
+        ]
+        self._sincronizar(self.registros)
+
+    def _sincronizar(self, registros, eliminar=False):
+        with EscritorLotes() as escritor:
+            sincronizador = SincronizadorActividades(self.proyecto, None, escritor, eliminar=eliminar)
+            sincronizador.procesar(registros)
+            return sincronizador.finalizar()
+
+    def test_reimportar_sin_cambios_no_escribe(self):
+        with self.assertNumQueries(4):  # savepoint + bloqueo del proyecto + lectura de huellas + release
+            resumen = self._sincronizar(self.registros)
+        self.assertEqual(resumen['sin_cambios'], 3)
+        self.assertEqual(self.proyecto.actividades.count(), 3)
+
+    def test_inserta_actualiza_y_elimina(self):
+        manual = Actividad.objects.create(proyecto=self.proyecto, item='9.9', descripcion='Manual')
+        resumen = self._sincronizar([
+            ('1.1', 'Topografía', 75.0, 'en_ejecucion', '') + SIN_PARTIDA,
+            ('1.3', 'Laboratorio', 100.0, 'completada', '') + SIN_PARTIDA,
+            ('1.4', 'Drones', 0.0, 'pendiente', '') + SIN_PARTIDA,
+        ], eliminar=True)
+        self.assertEqual(
+            resumen, {'insertadas': 1, 'actualizadas': 1, 'sin_cambios': 1, 'eliminadas': 1}
+        )
+        self.assertEqual(
+            sorted(self.proyecto.actividades.values_list('item', flat=True)), ['1.1', '1.3', '1.4', '9.9']
+        )
+        self.assertEqual(self.proyecto.actividades.get(item='1.1').avance, Decimal('75.00'))
+        self.assertTrue(Actividad.objects.filter(pk=manual.pk).exists())
+
+    def test_reimporta_actividades_importadas_antes_de_la_huella(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        migracion = import_module('actividades.migrations.0007_huella_importadas_antes')
+        proyecto = Proyecto.objects.create(
+            codigo='P2', nombre='P2', cliente=self.proyecto.cliente, fecha_inicio=date(2025, 1, 1),
+        )
+        # Como las dejaba el importador anterior (partida separada por 0005) y una creada a mano
+        legado = Actividad.objects.create(
+            proyecto=proyecto, item='1.1', descripcion='Topografía', unidad='HH', cantidad=Decimal('20'),
+        )
+        manual = Actividad.objects.create(proyecto=proyecto, item='1.1', descripcion='Ajuste manual')
+        migracion.marcar_importadas(apps, None)
+
+        self.proyecto = proyecto
+        resumen = self._sincronizar([('1.1', 'Topografía', 50.0, 'en_ejecucion', '', 'HH', 20.0, None, None, ())])
+        self.assertEqual(resumen, {'insertadas': 0, 'actualizadas': 1, 'sin_cambios': 0, 'eliminadas': 0})
+        self.assertEqual(proyecto.actividades.count(), 2)
+        legado.refresh_from_db()
+        manual.refresh_from_db()
+        self.assertEqual((legado.avance, len(legado.huella)), (Decimal('50.00'), 64))
+        self.assertEqual(manual.huella, '')
+
+    def test_no_empareja_actividades_creadas_a_mano(self):
+        from actividades.models import EjecucionODS
+
+        # Creadas a mano antes de reimportar, con items que también trae la planilla
+        manual = Actividad.objects.create(proyecto=self.proyecto, item='1.1', descripcion='Ajuste manual')
+        otra = Actividad.objects.create(proyecto=self.proyecto, item='1.4', descripcion='Drones a mano')
+        resumen = self._sincronizar(self.registros[1:] + [
+            ('1.1', 'Topografía', 75.0, 'en_ejecucion', '') + SIN_PARTIDA,
+            ('1.4', 'Drones', 0.0, 'pendiente', '', '', None, None, None, (('ODS 1', 2.0),)),
+        ], eliminar=True)
+        self.assertEqual(resumen, {'insertadas': 1, 'actualizadas': 1, 'sin_cambios': 2, 'eliminadas': 0})
+        manual.refresh_from_db()
+        otra.refresh_from_db()
+        self.assertEqual((manual.descripcion, manual.avance), ('Ajuste manual', Decimal('0')))
+        self.assertEqual(otra.descripcion, 'Drones a mano')
+        self.assertFalse(EjecucionODS.objects.filter(actividad=otra).exists())
+        self.assertEqual(EjecucionODS.objects.get().actividad.descripcion, 'Drones')
+
+    def test_partidas_y_ejecuciones_ods(self):
+        from django.db.models import Sum
+        from actividades.models import EjecucionODS, MONTO_CONTRATADO, MONTO_EJECUTADO
+
+        ods = (('ODS 1', 4.0), ('ODS 2', 6.0))
+        self._sincronizar([
+            ('1.1', 'Topografía', 50.0, 'en_ejecucion', '', 'HH', 20.0, 1500.0, 10.0, ods),
+            ('1.4', 'Drones', 100.0, 'completada', '', 'GL', 1.0, 30000.0, 1.0, (('ODS 2', 1.0),)),
+        ])
+        self.assertEqual(EjecucionODS.objects.filter(actividad__item='1.1').count(), 2)
+        self.assertEqual(EjecucionODS.objects.get(actividad__item='1.4').ods, 'ODS 2')
+
+        montos = self.proyecto.actividades.aggregate(valor=Sum(MONTO_CONTRATADO), ejecutado=Sum(MONTO_EJECUTADO))
+        self.assertEqual(montos['valor'], Decimal('60000'))
+        self.assertEqual(montos['ejecutado'], Decimal('45000'))
+
+        # Cambiar el desglose reemplaza las filas ODS de la actividad
+        self._sincronizar([('1.1', 'Topografía', 50.0, 'en_ejecucion', '', 'HH', 20.0, 1500.0, 10.0, (('ODS 3', 10.0),))])
+        self.assertEqual(
+            list(EjecucionODS.objects.filter(actividad__item='1.1').values_list('ods', flat=True)), ['ODS 3']
+        )
+
+
+class CacheHojasTests(TestCase):
+    def setUp(self):
+        import openpyxl
+
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.ruta = os.path.join(self.directorio.name, 'edp.xlsx')
+        libro = openpyxl.Workbook()
+        libro.active.title = 'EDP 001'
+        libro.active.append(['Nº', 'ITEM'])
+        libro.active.append(['1.1', 'Topografía'])
+        libro.create_sheet('NOC-1').append(['Código'])
+        libro.save(self.ruta)
+        self.cache = CacheHojas(os.path.join(self.directorio.name, 'cache'), max_bytes=10 ** 6)
+
+    def test_acierto_no_abre_el_excel(self):
+        esperado = LectorExcel(self.ruta, cache=self.cache).hoja('EDP 001')
+        lector = LectorExcel(self.ruta, cache=self.cache)
+        hoja = lector.hoja('EDP 001')
+        self.assertIsNone(lector._libro)
+        self.assertEqual(hoja.to_dict('records'), esperado.to_dict('records'))
+
+    def test_desaloja_la_entrada_menos_usada(self):
+        LectorExcel(self.ruta, cache=self.cache).hoja('EDP 001')
+        tamano = sum(
+            os.path.getsize(os.path.join(raiz, archivo))
+            for raiz, _, archivos in os.walk(self.cache.directorio) for archivo in archivos
+        )
+        huella = huella_archivo(self.ruta)
+        os.utime(self.cache._ruta(huella, 'pandas', 'EDP 001'), (1, 1))
+        self.cache.max_bytes = tamano
+        LectorExcel(self.ruta, cache=self.cache).hoja('NOC-1')
+        self.assertIsNone(self.cache.obtener(huella, 'pandas', 'EDP 001'))
+        self.assertIsNotNone(self.cache.obtener(huella, 'pandas', 'NOC-1'))
+
+    def test_bloque_conserva_tipos_sin_pickle(self):
+        import datetime
+        import pandas as pd
+
+        bloque = pd.DataFrame({
+            'Nº': ['1.1', None, 3],
+            'CANTIDAD': [1.5, float('nan'), 2.0],
+            'FECHA': pd.to_datetime(['2025-01-01', None, '2025-03-01']),
+            'CELDA': [datetime.datetime(2025, 1, 2, 3, 4), datetime.time(8, 30), 'texto'],
+        }, index=range(5000, 5003))
+        bloque[7] = [True, False, True]
+        ruta = os.path.join(self.directorio.name, 'bloque.json')
+        escribir_bloque(bloque, ruta)
+        pd.testing.assert_frame_equal(leer_bloque(ruta), bloque)
+
+    def test_ignora_archivos_que_no_son_json(self):
+        LectorExcel(self.ruta, cache=self.cache).hoja('EDP 001')
+        entrada = self.cache._ruta(huella_archivo(self.ruta), 'pandas', 'EDP 001')
+        with open(os.path.join(entrada, '000000.pkl'), 'wb') as archivo:
+            archivo.write(b'no debe leerse')
+        hoja = LectorExcel(self.ruta, cache=self.cache).hoja('EDP 001')
+        self.assertEqual(hoja.to_dict('records'), [{'Nº': 1.1, 'ITEM': 'Topografía'}])
+
+    def test_otro_tamano_de_bloque_no_reutiliza_la_entrada(self):
+        import openpyxl
+
+        libro = openpyxl.Workbook()
+        libro.active.title = 'EDP 001'
+        libro.active.append(['Nº', 'ITEM'])
+        for i in range(5):
+            libro.active.append([f'1.{i}', f'Partida {i}'])
+        libro.save(self.ruta)
+
+        def tamanos(tamano_bloque):
+            lector = LectorExcel(self.ruta, motor='streaming', tamano_bloque=tamano_bloque, cache=self.cache)
+            return [len(bloque) for bloque in lector.bloques('EDP 001')]
+
+        self.assertEqual(tamanos(2), [2, 2, 1])
+        self.assertEqual(tamanos(5), [5])
+        self.assertEqual(tamanos(2), [2, 2, 1])
+
+
+def _actividades_con_iterrows(df) -> list:
+    """Mapeo fila a fila que tenía importar_edp_completo antes de derivar_actividades."""
+    import pandas as pd
+
+    actividades = []
+    for _, fila in df.iterrows():
+        descripcion = ''
+        if 'ITEM' in fila and pd.notna(fila['ITEM']):
+            descripcion = str(fila['ITEM']).strip()
+        if not descripcion or descripcion.lower() in ['item', 'descripción', 'actividad']:
+            continue
+        item = ''
+        if 'Nº' in fila and pd.notna(fila['Nº']):
+            item = str(fila['Nº']).strip()
+
+        total_ods = 0
+        cantidad_ods = 0
+        for col in [col for col in df.columns if col.startswith('ODS')]:
+            if col in fila and pd.notna(fila[col]):
+                try:
+                    val = float(fila[col])
+                    if val > 0:
+                        total_ods += val
+                        cantidad_ods += 1
+                except (TypeError, ValueError):
+                    pass
+        total_col = 0
+        if 'TOTALES' in fila and pd.notna(fila['TOTALES']):
+            try:
+                total_col = float(fila['TOTALES'])
+            except (TypeError, ValueError):
+                pass
+        cantidad_planificada = 0
+        if 'Cantidad' in fila and pd.notna(fila['Cantidad']):
+            try:
+                cantidad_planificada = float(fila['Cantidad'])
+            except (TypeError, ValueError):
+                pass
+
+        if cantidad_planificada > 0 and total_col > 0:
+            avance = min((total_col / cantidad_planificada) * 100, 100)
+        elif total_ods > 0:
+            avance = min(total_ods / max(cantidad_ods, 1), 100)
+        else:
+            avance = 0
+        if avance >= 100:
+            estado = 'completada'
+        elif avance > 0:
+            estado = 'en_ejecucion'
+        else:
+            estado = 'pendiente'
+        actividades.append({
+            'item': item[:20], 'descripcion': descripcion, 'avance': round(avance, 2), 'estado': estado,
+        })
+    return actividades
+
+
+class DerivarActividadesTests(TestCase):
+    def test_coincide_con_el_mapeo_fila_a_fila(self):
+        import pandas as pd
+
+        # Celdas como llegan de una planilla real: encabezados repetidos,
+        # ITEM vacío o en blanco, y texto en columnas numéricas
+        hoja = pd.DataFrame({
+            'Nº': ['1.1', 'Nº', None, '1.3', 'x', 2, 1.5, None, '1.9', '  1.10  '],
+            'ITEM': ['Topografía', 'ITEM', None, '   ', 'Descripción', 'Excavación', 123, 'Hormigón', 'actividad', ' Moldaje '],
+            'U': ['m2', 'U', None, 'm3', None, 'gl', 'kg', None, None, 'm2'],
+            'Cantidad': [10, 'Cantidad', None, 5, None, 0, 'abc', 4, 1, '8'],
+            'PU': [1000, 'PU', None, 'n/a', None, 50.5, 2, None, 1, 3],
+            'TOTALES': [5, 'TOTALES', None, '-', None, 3, 20, 'N/A', 2, '4'],
+            'ODS 1': [1, 'ODS 1', None, 'x', 2, -1, ' 5 ', 150, None, '2'],
+            'ODS 2': ['abc', None, 3, 0, 4, 2, 1e12, 30, '-', None],
+            'ODS 3': [None, None, None, 7.5, None, None, 'N/A', 0, None, 1],
+        }, dtype=object)
+
+        derivadas = derivar_actividades(hoja)
+        obtenidas = [
+            {
+                'item': fila.item[:20], 'descripcion': fila.descripcion,
+                'avance': round(float(fila.avance), 2), 'estado': fila.estado,
+            }
+            for fila in derivadas.itertuples()
+        ]
+        self.assertEqual(obtenidas, _actividades_con_iterrows(hoja))
+        self.assertEqual(len(obtenidas), 5)
+
+
+class MapeoNocTests(TestCase):
+    def test_fechas_estado_y_errores(self):
+        import pandas as pd
+
+        hoja = pd.DataFrame({
+            'Fecha Detectada': ['2025-02-04', '15/03/2025', 'ayer', None],
+            'Fecha Cierre': [None, '20/03/2025', None, 12],
+            'Estado': ['En proceso', 'abierta', 'en proceso', None],
+        })
+        errores = []
+        filas = derivar_noc(hoja, 'NOC-1', errores, hoy=date(2025, 6, 1))
+
+        self.assertEqual(
+            filas['fecha_detectada'].tolist(),
+            [date(2025, 2, 4), date(2025, 3, 15), date(2025, 6, 1), date(2025, 6, 1)],
+        )
+        self.assertEqual(filas['estado'].tolist(), ['en_proceso', 'cerrada', 'en_proceso', 'abierta'])
+        self.assertEqual(filas['codigo'].tolist(), ['NOC-1', 'NOC-2', 'NOC-3', 'NOC-4'])
+        self.assertEqual(
+            [(e.fila, e.columna, e.valor) for e in errores],
+            [(4, 'Fecha Detectada', 'ayer'), (5, 'Fecha Cierre', '12')],
+        )
+
+
+class BenchmarkImportacionTests(TestCase):
+    def test_mide_etapas_sin_dejar_datos(self):
+        import json
+
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'bench.json')
+            call_command(
+                'benchmark_importacion', filas=[40], directorio=directorio, salida=salida, stdout=StringIO()
+            )
+            with open(salida) as archivo:
+                resultados = json.load(archivo)['resultados']
+
+        self.assertEqual([r['importador'] for r in resultados], ['import_edp', 'importar_edp_completo'])
+        self.assertTrue(all(r['total_s'] > 0 for r in resultados))
+        self.assertFalse(Proyecto.objects.exists())
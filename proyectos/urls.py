@@ -1,8 +1,11 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ProyectoViewSet, CuadroControlViewSet
+from .views import ProyectoViewSet, CuadroControlViewSet, historial_controles
 
 router = DefaultRouter()
 router.register(r'proyectos', ProyectoViewSet)
 router.register(r'controles', CuadroControlViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('historial/', historial_controles, name='historial_controles'),
+] + router.urls
@@ -0,0 +1,114 @@
+from calendar import timegm
+from functools import wraps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from edp_project.transacciones import al_confirmar
+from .models import Proyecto, VersionDatos
+
+CLAVE_GLOBAL = 'global'
+CLAVE_PENDIENTE = 'proyectos:versiones'
+
+
+def clave_proyecto(proyecto_id) -> str:
+    return f'proyecto:{proyecto_id}'
+
+
+def obtener(proyecto_id=None) -> tuple:
+    """(clave, versión, fecha de modificación) del contador global o de un proyecto."""
+    clave = clave_proyecto(proyecto_id) if proyecto_id else CLAVE_GLOBAL
+    fila = VersionDatos.objects.filter(clave=clave).values_list('version', 'fecha_modificacion').first()
+    return (clave, *fila) if fila else (clave, 0, None)
+
+
+def etiqueta(clave: str, version) -> str:
+    """Valor del ETag: la versión de datos más la del código desplegado (EDP_VERSION_CODIGO)."""
+    codigo = settings.EDP_VERSION_CODIGO
+    return f'{clave}-{version}-{codigo}' if codigo else f'{clave}-{version}'
+
+
+def subir_ahora(proyecto_ids=(), empresa_ids=(), batch_size: int = 1000) -> None:
+    """Sube el contador global y los de los proyectos indicados (y de los proyectos de las empresas)."""
+    proyecto_ids = set(proyecto_ids)
+    if empresa_ids:
+        proyecto_ids.update(Proyecto.objects.filter(cliente_id__in=empresa_ids).values_list('id', flat=True))
+    claves = [CLAVE_GLOBAL, *(clave_proyecto(i) for i in sorted(proyecto_ids))]
+    ahora = timezone.now()
+    # Los contadores nuevos parten del reloj y no de 1: si se pierde la tabla no
+    # se repiten ETag que los clientes ya tienen guardados
+    inicial = int(ahora.timestamp() * 1000)
+    with transaction.atomic():
+        for inicio in range(0, len(claves), batch_size):
+            tramo = claves[inicio:inicio + batch_size]
+            actualizadas = VersionDatos.objects.filter(clave__in=tramo).update(
+                version=F('version') + 1, fecha_modificacion=ahora,
+            )
+            if actualizadas < len(tramo):
+                existentes = set(VersionDatos.objects.filter(clave__in=tramo).values_list('clave', flat=True))
+                VersionDatos.objects.bulk_create(
+                    [VersionDatos(clave=c, version=inicial, fecha_modificacion=ahora) for c in tramo if c not in existentes],
+                    ignore_conflicts=True,
+                )
+
+
+class _VersionPendiente:
+    """Proyectos y empresas cuya versión se sube al confirmar la transacción en curso."""
+
+    def __init__(self):
+        self.proyectos = set()
+        self.empresas = set()
+
+    def __call__(self) -> None:
+        subir_ahora(self.proyectos, self.empresas)
+
+
+def subir(proyecto_ids=(), empresa_ids=()) -> None:
+    """
+    Marca datos modificados. Dentro de una transacción los contadores suben una
+    sola vez al confirmarla (no antes, o una lectura concurrente devolvería los
+    datos viejos con la versión nueva y el cliente los conservaría con 304).
+    """
+    proyecto_ids = [i for i in proyecto_ids if i]
+    empresa_ids = [i for i in empresa_ids if i]
+
+    def agregar(pendiente):
+        pendiente.proyectos.update(proyecto_ids)
+        pendiente.empresas.update(empresa_ids)
+
+    al_confirmar(CLAVE_PENDIENTE, _VersionPendiente, agregar)
+
+
+def condicional(parametro_proyecto: str = None):
+    """
+    Decorador de vistas GET: responde 304 según If-None-Match/If-Modified-Since
+    con el contador global (o el del proyecto en el argumento ``parametro_proyecto``)
+    antes de ejecutar la vista, y agrega ETag y Last-Modified a la respuesta.
+    Last-Modified no cambia con un despliegue: los clientes que envían ETag
+    (If-None-Match tiene prioridad) no reciben 304 de la versión anterior.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+            clave, version, fecha = obtener(kwargs.get(parametro_proyecto) if parametro_proyecto else None)
+            # La vista puede usar la versión en sus claves de caché sin volver a consultarla
+            request.version_datos = version
+            etag = quote_etag(etiqueta(clave, version))
+            ultima = timegm(fecha.utctimetuple()) if fecha else None
+            respuesta = get_conditional_response(request, etag=etag, last_modified=ultima)
+            if respuesta is None:
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta['ETag'] = etag
+            if ultima is not None:
+                respuesta['Last-Modified'] = http_date(ultima)
+            # El navegador guarda la respuesta pero la revalida en cada uso
+            patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return envoltura
+    return decorador
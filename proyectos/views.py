@@ -1,13 +1,63 @@
+from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from .historial import MAX_PUNTOS, PUNTOS_POR_DEFECTO, reducir, serie_empresa, serie_proyecto
 from .models import Proyecto, CuadroControl
 from .serializers import ProyectoSerializer, CuadroControlSerializer
+from .versiones import condicional
 
 
+@method_decorator(condicional(), name='list')
 class ProyectoViewSet(viewsets.ModelViewSet):
     queryset = Proyecto.objects.all()
     serializer_class = ProyectoSerializer
 
 
+@method_decorator(condicional(), name='list')
 class CuadroControlViewSet(viewsets.ModelViewSet):
     queryset = CuadroControl.objects.all()
     serializer_class = CuadroControlSerializer
+
+
+@api_view(['GET'])
+def historial_controles(request):
+    """
+    Serie diaria del avance de un proyecto (``?proyecto=<id>``) o de una empresa
+    (``?empresa=<id>``), acotada con ``desde``/``hasta`` (AAAA-MM-DD) y reducida a
+    lo más ``puntos`` puntos.
+    """
+    proyecto, empresa = request.query_params.get('proyecto'), request.query_params.get('empresa')
+    if bool(proyecto) == bool(empresa):
+        return Response({'detail': 'Indique proyecto o empresa.'}, status=400)
+    if not (proyecto or empresa).isdigit():
+        return Response({'detail': 'El id debe ser un número.'}, status=400)
+
+    fechas = {}
+    for parametro in ('desde', 'hasta'):
+        valor = request.query_params.get(parametro)
+        try:
+            # None si no tiene formato de fecha; ValueError si lo tiene pero no existe (2025-02-30)
+            fechas[parametro] = parse_date(valor) if valor else None
+        except ValueError:
+            fechas[parametro] = None
+        if valor and fechas[parametro] is None:
+            return Response({'detail': f'Fecha inválida en {parametro}: {valor}'}, status=400)
+
+    try:
+        puntos = int(request.query_params.get('puntos', PUNTOS_POR_DEFECTO))
+    except ValueError:
+        return Response({'detail': 'puntos debe ser un número.'}, status=400)
+    puntos = min(max(puntos, 2), MAX_PUNTOS)
+
+    if proyecto:
+        serie = serie_proyecto(int(proyecto), **fechas)
+    else:
+        serie = serie_empresa(int(empresa), **fechas)
+    return Response({
+        'proyecto': int(proyecto) if proyecto else None,
+        'empresa': int(empresa) if empresa else None,
+        'fotos': len(serie),
+        'serie': [punto.as_dict() for punto in reducir(serie, puntos)],
+    })
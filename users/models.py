@@ -7,7 +7,13 @@ class User(AbstractUser):
     Custom user model. Aunque no se personaliza ahora,
     es mejor práctica definirlo desde el inicio.
     """
-    pass
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Autocompletar por prefijo (username ya tiene índice único)
+            models.Index(fields=['first_name'], name='usuario_nombre_idx'),
+            models.Index(fields=['last_name'], name='usuario_apellido_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.username